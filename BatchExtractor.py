@@ -0,0 +1,373 @@
+import fnmatch
+import glob
+import json
+import logging
+import os
+import time
+
+from ExtractorFactory import ExtractorFactory
+from RunMetrics import StageTimer, merge_run_metrics, write_prometheus_textfile
+
+
+class BatchExtractor:
+    """
+    批量提取：把一个目录（或通配符匹配到）的所有PDF报关单放进同一个OCR进程池处理。
+
+    所有文档的页面按顺序进入同一条流水线，短文档结束后进程不会空闲等待下一个文档，
+    整个批次期间所有核心都保持忙碌。每个文档完成后立即解析字段并写出该文档的结果，
+    全部完成后写出批次汇总 batch_summary.json。某个文档的页面处理出错时只把该文档记为失败，
+    其余文档继续处理；批次被中断时同样写出汇总。
+    每个文档的运行指标写在其结果文件旁（<PDF名>_extracted_fields.metrics.json），
+    整个批次的合并指标写入批次汇总的 'metrics'，并可写为 Prometheus textfile。
+
+    模板映射中的模板写为 'auto' 时，按首页的文本层和表格线自动识别模板（见 TemplateFingerprint），
+    置信度低于 min_confidence 的文档跳过，不会浪费一次完整的OCR。自动识别需要传入学习过参考指纹的
+    classifier：内置进口模板共用同一套表格网格，只靠网格缓存无法区分，而且网格缓存要到提取时才会填充。
+    """
+    SUMMARY_FILENAME = "batch_summary.json"
+    AUTO_TEMPLATE = 'auto'
+
+    def __init__(self, template_mapping, output_dir: str = None, lang: str = 'en', max_workers: int = None,
+                 ocr_pool=None, color_threshold: int = 10, output_formats=None,
+                 dataset_dir: str = None, classifier=None, min_confidence: float = None, metrics_textfile: str = None):
+        """
+        :param template_mapping: 模板映射，(文件名通配符, '类型/模板') 的列表或字典，按顺序取第一个匹配项，
+                                 例如 {'*OLC*.pdf': 'import/OLC', '*': 'import/TianShi'}；'auto' 表示自动识别。
+        :param output_dir: 批次输出目录。每个文档的结果写入其中以文档名命名的子目录；为None时写在各PDF旁边。
+        :param lang: OCR语言。
+        :param max_workers: OCR进程数，使用共享进程池时忽略。
+        :param ocr_pool: 可选的共享 OcrWorkerPool。
+        :param color_threshold: 颜色过滤阈值。
+        :param output_formats: 每个文档的结果文件格式 ('json', 'ndjson', 'csv', 'xlsx', 'parquet')，为None时使用提取器的默认格式。
+        :param dataset_dir: Parquet数据集根目录。指定后所有文档的Parquet文件按 类型/模板/日期 分区追加到同一个数据集。
+        :param classifier: 自动识别模板使用的 TemplateClassifier（需要已学习参考指纹），模板映射中有 'auto' 时必须指定。
+        :param min_confidence: 自动识别的最低置信度，默认为 TemplateFingerprint.MIN_CONFIDENCE。
+        :param metrics_textfile: 批次合并指标的 Prometheus textfile 路径（.prom），每个批次覆盖。
+        """
+        if isinstance(template_mapping, dict):
+            template_mapping = list(template_mapping.items())
+        self.template_mapping = [(pattern, self._parse_template(spec)) for pattern, spec in template_mapping]
+        if classifier is None and self.uses_auto_template(self.template_mapping):
+            raise ValueError("自动识别模板 ('auto') 需要参考指纹：请指定 classifier（命令行为 --references）。")
+        self.output_dir = output_dir
+        self.lang = lang
+        self.max_workers = max_workers
+        self.ocr_pool = ocr_pool
+        self.color_threshold = color_threshold
+        self.output_formats = output_formats
+        self.dataset_dir = dataset_dir
+        self.classifier = classifier
+        self.min_confidence = min_confidence
+        self.metrics_textfile = metrics_textfile
+        self.workers = 0  # 当前批次使用的OCR进程数，用于计算进程利用率
+        self.logger = logging.getLogger("BatchExtractor")
+        self.progress_queue = None  # 用于向UI报告进度（已完成文档的百分比）
+
+    @staticmethod
+    def _parse_template(spec: str):
+        """把 '类型/模板'（例如 'import/TianShi'）拆分为 (类型, 模板)，省略类型时视为进口。'auto' 原样返回。"""
+        if spec == BatchExtractor.AUTO_TEMPLATE:
+            return spec
+        if '/' in spec:
+            doc_type, template_type = spec.split('/', 1)
+        else:
+            doc_type, template_type = 'import', spec
+        return doc_type, template_type
+
+    @staticmethod
+    def uses_auto_template(template_mapping) -> bool:
+        """模板映射中是否有需要自动识别的模板。"""
+        return any(template == BatchExtractor.AUTO_TEMPLATE for _, template in template_mapping)
+
+    @staticmethod
+    def find_pdfs(source: str, recursive: bool = False) -> list:
+        """source 为目录时返回其中的所有PDF，否则按通配符匹配。结果按路径排序。"""
+        if os.path.isdir(source):
+            pattern = os.path.join(source, '**', '*.pdf') if recursive else os.path.join(source, '*.pdf')
+        else:
+            pattern = source
+        return sorted(path for path in glob.glob(pattern, recursive=recursive)
+                      if os.path.isfile(path) and path.lower().endswith('.pdf'))
+
+    def resolve_template(self, pdf_path: str):
+        """返回PDF对应的 (类型, 模板)，没有匹配项时返回None。"""
+        name = os.path.basename(pdf_path)
+        for pattern, template in self.template_mapping:
+            if fnmatch.fnmatch(name, pattern):
+                return template
+        return None
+
+    def detect_template(self, pdf_path: str, record: dict):
+        """
+        自动识别PDF的模板，识别结果记录在 record['detected'] 中。
+        返回 (类型, 模板)，无法识别或置信度不足时返回None。
+        """
+        from TemplateFingerprint import MIN_CONFIDENCE
+        min_confidence = MIN_CONFIDENCE if self.min_confidence is None else self.min_confidence
+        try:
+            match = self.classifier.classify(pdf_path)
+        except Exception as e:
+            record['error'] = f"自动识别模板时出错: {e}"
+            return None
+        record['detected'] = {'doc_type': match.doc_type, 'template': match.template,
+                              'confidence': round(match.confidence, 3), 'score': round(match.score, 3)}
+        if match.template is None or match.confidence < min_confidence:
+            record['error'] = f"无法自动识别模板 (置信度 {match.confidence:.2f})"
+            return None
+        return match.doc_type, match.template
+
+    def _document_output_dir(self, pdf_path: str):
+        if self.output_dir is None:
+            return None
+        return os.path.join(self.output_dir, os.path.splitext(os.path.basename(pdf_path))[0])
+
+    def run(self, pdf_paths: list) -> dict:
+        """处理所有文档，返回批次汇总。"""
+        start_time = time.perf_counter()
+        cpu_start = time.process_time()
+        documents = []
+        for pdf_path in pdf_paths:
+            record = {'pdf_path': pdf_path, 'status': 'pending', 'pages': 0, 'items': 0, 'outputs': []}
+            documents.append(record)
+            template = self.resolve_template(pdf_path)
+            if template == self.AUTO_TEMPLATE:
+                template = self.detect_template(pdf_path, record)
+            if template is None:
+                record['status'] = 'skipped'
+                record.setdefault('error', "没有匹配的模板")
+                continue
+            doc_type, template_type = template
+            record['template'] = f"{doc_type}/{template_type}"
+            try:
+                extractor = ExtractorFactory.create_extractor(
+                    template_type, pdf_path, output_dir=self._document_output_dir(pdf_path),
+                    lang=self.lang, type=doc_type, ocr_pool=self.ocr_pool, output_formats=self.output_formats,
+                    dataset_dir=self.dataset_dir
+                )
+            except ValueError as e:
+                record['status'] = 'skipped'
+                record['error'] = str(e)
+                continue
+            if extractor is None:
+                # 未知的文档类型不会抛出异常，而是返回None；不能让它进入共享的流水线
+                record['status'] = 'skipped'
+                record['error'] = f"未知的模板类型: {doc_type}"
+                continue
+            record['extractor'] = extractor
+        active = [record for record in documents if 'extractor' in record]
+        self.logger.info(f"批量提取: {len(pdf_paths)} 个文档, 其中 {len(active)} 个匹配到模板。")
+
+        from OcrParser import OcrParser, OcrWorkerPool
+        owned_pools = []
+        self.workers = 0
+        def get_pool():
+            if self.ocr_pool is None and not owned_pools:
+                owned_pools.append(OcrWorkerPool(max_workers=self.max_workers, langs=(self.lang,)))
+            pool = self.ocr_pool if self.ocr_pool is not None else owned_pools[0]
+            self.workers = pool.max_workers
+            return pool
+
+        # 驱动整条流水线的解析器，只使用它的流水线设置（各文档的任务仍由各自的解析器准备）
+        driver = OcrParser(lang=self.lang)
+        try:
+            try:
+                for doc_idx, result in driver._run_pipelined(self._iter_batch_tasks(active), get_pool, tagged=True):
+                    record = active[doc_idx]
+                    record['received'] += 1
+                    if isinstance(result, Exception):
+                        # 单个页面出错只让所在的文档失败，流水线继续处理其余文档
+                        self.logger.error(f"处理文档 {record['pdf_path']} 的页面时出错: {result}")
+                        if record['status'] != 'failed':
+                            record['status'] = 'failed'
+                            record['error'] = str(result)
+                    else:
+                        page_num, page_groups, page_stats = result
+                        OcrParser._accumulate_page_stats(record['stats'], page_stats)
+                        if page_groups:
+                            record['groups'][page_num] = page_groups
+                    self._finish_completed(active)
+                # 没有任何页面任务的文档在这里收尾
+                self._finish_completed(active)
+            except Exception as e:
+                self.logger.error(f"批量提取中断: {e}")
+                self._fail_unfinished(active, f"批量提取中断: {e}")
+        finally:
+            for pool in owned_pools:
+                pool.shutdown()
+            # 批次被中断（包括 KeyboardInterrupt）时同样写出汇总，未完成的文档记为失败
+            self._fail_unfinished(active, "批量提取中断")
+            summary = self._write_summary(documents, pdf_paths, start_time, cpu_start,
+                                          self.ocr_pool or (owned_pools[0] if owned_pools else None))
+        return summary
+
+    def _fail_unfinished(self, active: list, error: str):
+        """把尚未收尾的文档标记为失败。"""
+        for record in active:
+            if 'seconds' in record:
+                continue
+            record['pages'] = record.get('received', 0)
+            started = record.pop('started', None)
+            record['seconds'] = time.perf_counter() - started if started is not None else 0.0
+            if record['status'] != 'failed':
+                record['status'] = 'failed'
+                record['error'] = error
+
+    def _write_summary(self, documents: list, pdf_paths: list, start_time: float, cpu_start: float, pool) -> dict:
+        """汇总批次结果和运行指标并写出 batch_summary.json，返回批次汇总。"""
+        wall_seconds = time.perf_counter() - start_time
+        summary = {
+            'documents': [
+                {key: value for key, value in record.items()
+                 if key not in ('extractor', 'groups', 'submitted', 'received', 'produced', 'metrics', 'started')}
+                for record in documents
+            ],
+            'total_documents': len(documents),
+            'succeeded': sum(1 for record in documents if record['status'] == 'done'),
+            'failed': sum(1 for record in documents if record['status'] == 'failed'),
+            'skipped': sum(1 for record in documents if record['status'] == 'skipped'),
+            'pages': sum(record['pages'] for record in documents),
+            'items': sum(record['items'] for record in documents),
+            'wall_seconds': wall_seconds,
+        }
+        summary['pages_per_second'] = summary['pages'] / wall_seconds if wall_seconds > 0 else 0.0
+        if pool is not None:
+            summary['pool'] = pool.stats()
+        # 文档在同一条流水线中重叠处理，批次的运行时间和进程利用率按整个批次计算
+        summary['metrics'] = merge_run_metrics(
+            [record['metrics'] for record in documents if 'metrics' in record],
+            labels={'scope': 'batch'}, wall_seconds=wall_seconds, workers=self.workers
+        )
+        summary['metrics']['cpu_seconds'] = time.process_time() - cpu_start
+        if self.metrics_textfile:
+            try:
+                write_prometheus_textfile(summary['metrics'], self.metrics_textfile)
+            except OSError as e:
+                self.logger.error(f"写出批次运行指标时出错: {e}")
+        self._save_summary(summary, pdf_paths)
+        self.logger.info(
+            f"批量提取完成: 成功 {summary['succeeded']} 个, 失败 {summary['failed']} 个, 跳过 {summary['skipped']} 个; "
+            f"共 {summary['pages']} 页 {summary['items']} 个项目, 用时 {wall_seconds:.1f}s。"
+        )
+        return summary
+
+    def _iter_batch_tasks(self, active: list):
+        """依次产出所有文档的页面任务 (文档序号, 任务)。单个文档准备失败不会中断整个批次。"""
+        for doc_idx, record in enumerate(active):
+            extractor = record['extractor']
+            record.update(status='running', submitted=0, received=0, produced=False, groups={}, stats={},
+                          started=time.perf_counter())
+            try:
+                for task in extractor.ocr_parser._iter_page_tasks(
+                        record['pdf_path'], None, extractor.GROUP_SIZE, self.lang, self.color_threshold):
+                    record['submitted'] += 1
+                    yield doc_idx, task
+            except Exception as e:
+                self.logger.error(f"准备文档 {record['pdf_path']} 时出错: {e}")
+                record['status'] = 'failed'
+                record['error'] = str(e)
+            finally:
+                record['produced'] = True
+
+    def _finish_completed(self, active: list):
+        """收尾所有任务已全部准备并且结果已全部返回的文档。"""
+        for record in active:
+            if record.get('produced') and 'seconds' not in record and record['received'] == record['submitted']:
+                self._finish_document(record)
+                if self.progress_queue:
+                    finished = sum(1 for r in active if 'seconds' in r)
+                    self.progress_queue.put(int(finished / len(active) * 100))
+
+    def _finish_document(self, record: dict):
+        """解析一个文档的全部分组并写出结果。"""
+        extractor = record['extractor']
+        record['pages'] = record['received']
+        record['seconds'] = time.perf_counter() - record.pop('started')
+        if record['status'] == 'failed':
+            return
+        try:
+            all_pages_groups = record['groups']
+            if extractor.save_json and all_pages_groups:
+                record['outputs'].append(extractor.ocr_parser.save_groups_json(all_pages_groups, extractor.output_dir))
+            # 项目边解析边写出，不在内存中保留整个文档的项目列表
+            timer = StageTimer()
+            item_count, saved_files = extractor.write_items(extractor.iter_built_items(all_pages_groups, timer), timer)
+            record['items'] = item_count
+            record['outputs'].extend(saved_files)
+            record['status'] = 'done'
+            # 文档的运行统计：工作进程回传的页面统计 + 该文档的解析器在父进程中准备页面的阶段耗时
+            run_stats = dict(record['stats'], pages=record['pages'], wall_seconds=record['seconds'],
+                             workers=self.workers, stages=extractor.ocr_parser.stage_timer.summary())
+            record['metrics'] = extractor.record_metrics(run_stats, timer, item_count)
+            self.logger.info(f"{os.path.basename(record['pdf_path'])}: {record['pages']} 页, {item_count} 个项目。")
+        except Exception as e:
+            self.logger.error(f"处理文档 {record['pdf_path']} 的结果时出错: {e}")
+            record['status'] = 'failed'
+            record['error'] = str(e)
+
+    def _save_summary(self, summary: dict, pdf_paths: list):
+        """把批次汇总写入输出目录（未指定输出目录时写在第一个PDF所在目录）。"""
+        if self.output_dir is not None:
+            summary_dir = self.output_dir
+        elif pdf_paths:
+            summary_dir = os.path.dirname(os.path.abspath(pdf_paths[0]))
+        else:
+            return
+        os.makedirs(summary_dir, exist_ok=True)
+        summary_path = os.path.join(summary_dir, self.SUMMARY_FILENAME)
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        self.logger.info(f"批次汇总已保存到: {summary_path}")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="批量提取一个目录（或通配符）中的所有PDF报关单，共用一个OCR进程池。")
+    parser.add_argument("source", help="PDF所在目录，或通配符 (例如 'in/*.pdf')。")
+    parser.add_argument("-o", "--output", help="批次输出目录。默认为各PDF旁边的新建文件夹。")
+    parser.add_argument("-t", "--template", help="所有文档使用的模板，格式为 '类型/模板'，例如 'import/TianShi'；'auto' 表示按首页自动识别。")
+    parser.add_argument("-m", "--mapping", help="模板映射JSON文件: {\"文件名通配符\": \"类型/模板\", ...}，按顺序取第一个匹配项。")
+    parser.add_argument("--recursive", action="store_true", help="递归查找子目录中的PDF。")
+    parser.add_argument("--lang", default="en", help="OCR识别语言。默认: 'en'。")
+    parser.add_argument("--processes", type=int, default=None, help="工作进程数 (默认: CPU核心数，最多8个)。")
+    parser.add_argument("--color-threshold", type=int, default=10, help="颜色过滤的亮度阈值 (0-255)。默认: 10。")
+    parser.add_argument("--formats", help="结果文件格式，逗号分隔 (json, ndjson, csv, xlsx, parquet)。默认使用各模板的默认格式。")
+    parser.add_argument("--dataset-dir", help="Parquet数据集根目录，所有文档按 类型/模板/日期 分区追加写入。")
+    parser.add_argument("--references", help="自动识别模板使用的参考指纹JSON文件 (见 TemplateFingerprint.py --learn)，使用 auto 模板时必须指定。")
+    parser.add_argument("--grid-cache", help="表格网格缓存JSON文件。指定后开启网格缓存，在多次运行之间复用网格。")
+    parser.add_argument("--min-confidence", type=float, default=None, help="自动识别模板的最低置信度。默认: 0.2。")
+    parser.add_argument("--metrics-textfile", help="把批次的运行指标写为 Prometheus textfile（例如 node_exporter 的 textfile 目录中的 customs_batch.prom）。")
+    args = parser.parse_args()
+
+    if args.grid_cache:
+        ExtractorFactory.use_grid_cache_file(args.grid_cache)
+    classifier = None
+    if args.references:
+        if not os.path.isfile(args.references):
+            parser.error(f"参考指纹文件不存在: {args.references}")
+        from TemplateFingerprint import TemplateClassifier
+        classifier = TemplateClassifier(args.references, grid_cache=ExtractorFactory.grid_cache)
+
+    mapping = []
+    if args.mapping:
+        with open(args.mapping, 'r', encoding='utf-8') as f:
+            mapping.extend(json.load(f).items())
+    if args.template:
+        mapping.append(('*', args.template))
+    if not mapping:
+        parser.error("需要指定 --template 或 --mapping。")
+    if BatchExtractor.uses_auto_template(mapping) and classifier is None:
+        # 内置进口模板共用同一套表格网格，没有参考指纹时所有文档都会因置信度不足被跳过
+        parser.error("自动识别模板 ('auto') 需要 --references 参考指纹文件 (见 TemplateFingerprint.py --learn)。")
+
+    pdf_paths = BatchExtractor.find_pdfs(args.source, recursive=args.recursive)
+    if not pdf_paths:
+        parser.error(f"没有找到PDF文件: {args.source}")
+
+    batch = BatchExtractor(mapping, output_dir=args.output, lang=args.lang, max_workers=args.processes,
+                           color_threshold=args.color_threshold,
+                           output_formats=args.formats.split(',') if args.formats else None,
+                           dataset_dir=args.dataset_dir, classifier=classifier, min_confidence=args.min_confidence,
+                           metrics_textfile=args.metrics_textfile)
+    summary = batch.run(pdf_paths)
+    print(f"完成: {summary['succeeded']}/{summary['total_documents']} 个文档, "
+          f"{summary['pages']} 页, {summary['items']} 个项目, {summary['pages_per_second']:.2f} 页/秒")
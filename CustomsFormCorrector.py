@@ -5,6 +5,9 @@ from difflib import SequenceMatcher
 from PIL import Image
 import io
 import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from PageLayout import PageLayout
 # import pytesseract
 
 # pytesseract.pytesseract.tesseract_cmd = r"D:\Program Files\Tesseract-OCR\tesseract.exe"
@@ -19,43 +22,112 @@ class CustomsFormCorrector:
     2. 使用 fitz 获取包含可修正字符的文本内容（好砖）。
     3. 通过坐标定位，用"好砖"替换掉"地基"中对应的"坏砖"，
        从而实现对PDF表格的精确、最小化修正。
+
+    "好砖"可以用 prefetch() 在一个后台进程中按页序分批预取：后台进程打开自己的文档，
+    与调用方逐页准备表格（find_tables 等）并行地提取后面页面的文本块。
+    correct() 处理某页时，该页的预取结果已就绪就直接使用，否则立即在当前进程中提取，
+    不会等待后台进程，因此第一页的修正不会被预取拖慢。每页的预取结果使用一次后即释放。
+    用完后调用 close() 或使用 with 语句，确保文档被关闭、后台进程退出。
     """
-    def __init__(self, pdf_path, char_to_find='\x15', char_to_replace='2'):
+    # 页数达到此值时 prefetch() 才启动后台进程，页数少时进程启动开销得不偿失
+    PREFETCH_MIN_PAGES = 8
+    # 后台进程每批提取的页数
+    PREFETCH_CHUNK_PAGES = 8
+
+    def __init__(self, pdf_path, char_to_find='\x15', char_to_replace='2', fitz_doc=None):
         """
         初始化修正器。
         :param pdf_path: 要处理的PDF文件路径。
         :param char_to_find: 在fitz提取的文本中要查找的特殊字符。
         :param char_to_replace: 用于替换特殊字符的正确字符。
+        :param fitz_doc: 可选的已打开的 PyMuPDF 文档（例如 PyMuPDF 后端的文档）。
+                         提供时直接复用，不再重复打开PDF，关闭由调用方负责。
         """
         # print("[INFO] 初始化 CustomsFormCorrector...")
         self.pdf_path = pdf_path
         self.char_to_find = char_to_find
         self.char_to_replace = char_to_replace
 
-        self.fitz_doc = fitz.open(self.pdf_path)
-        self.fitz_page = self.fitz_doc[0]
+        # PyMuPDF 文档在第一次需要时才打开，由 close() 关闭
+        self.fitz_doc = fitz_doc
+        self._owns_doc = fitz_doc is None
+        self.fitz_page = None
+        # 后台预取：页码 -> 包含该页的批次 Future
+        self._prefetch_executor = None
+        self._prefetch_futures = {}
+        self.prefetch_hits = 0  # 直接使用预取结果的页数
 
         self.correction_count = 0
         print("[INFO] 初始化完成。")
 
+    @staticmethod
+    def _page_blocks(fitz_page, char_to_find, char_to_replace):
+        """从一个 PyMuPDF 页面提取修正后的文本块。"""
+        blocks_data = []
+        for block in fitz_page.get_text("blocks"):
+            x0, y0, x1, y1, text, _, _ = block
+            corrected_text = text.strip().replace(char_to_find, char_to_replace)
+            if corrected_text:
+                blocks_data.append({"text": corrected_text, "bbox": (x0, y0, x1, y1)})
+        return blocks_data
+
+    @staticmethod
+    def _extract_blocks_worker(args):
+        """
+        后台进程：打开文档，提取一批页面的"好砖"后立即关闭文档。
+        这是一个静态方法，以便可以传递给进程池。
+        """
+        pdf_path, page_numbers, char_to_find, char_to_replace = args
+        with fitz.open(pdf_path) as doc:
+            return {
+                page_num: CustomsFormCorrector._page_blocks(doc[page_num], char_to_find, char_to_replace)
+                for page_num in page_numbers
+            }
+
+    def prefetch(self, page_numbers):
+        """
+        在后台进程中按给定顺序分批预取页面的"好砖"，立即返回，不等待提取完成。
+        页数少于 PREFETCH_MIN_PAGES 时不启动后台进程，各页仍在 correct() 中按需提取。
+        后台进程使用 spawn 方式启动，可以安全地在流水线的生产者线程中调用。
+        :param page_numbers: 要处理的页码列表（0-indexed），应与之后调用 correct() 的顺序一致。
+        """
+        page_numbers = [p for p in page_numbers if p not in self._prefetch_futures]
+        if len(page_numbers) < self.PREFETCH_MIN_PAGES:
+            return
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        for i in range(0, len(page_numbers), self.PREFETCH_CHUNK_PAGES):
+            chunk = page_numbers[i:i + self.PREFETCH_CHUNK_PAGES]
+            future = self._prefetch_executor.submit(
+                CustomsFormCorrector._extract_blocks_worker,
+                (self.pdf_path, chunk, self.char_to_find, self.char_to_replace)
+            )
+            for page_num in chunk:
+                self._prefetch_futures[page_num] = future
+
     def _get_fitz_blocks(self, page_num):
         """
         (私有方法) 使用 PyMuPDF 的 get_text('blocks') 提取所有修正后的文本块。
+        该页的预取结果已就绪时直接使用，否则在当前进程中提取。
         """
         # print("[INFO] 步骤 1/3: 从 PyMuPDF 提取修正后的文本块 ('好砖')...")
+        future = self._prefetch_futures.pop(page_num, None)
+        if future is not None and future.done() and not future.cancelled() and future.exception() is None:
+            self.prefetch_hits += 1
+            return future.result()[page_num]
+        if self.fitz_doc is None:
+            self.fitz_doc = fitz.open(self.pdf_path)
+            self._owns_doc = True
         self.fitz_page = self.fitz_doc[page_num]
-        blocks_data = []
-        for block in self.fitz_page.get_text("blocks"):
-            x0, y0, x1, y1, text, _, _ = block
-            corrected_text = text.strip().replace(self.char_to_find, self.char_to_replace)
-            if corrected_text:
-                blocks_data.append({"text": corrected_text, "bbox": (x0, y0, x1, y1)})
+        blocks_data = CustomsFormCorrector._page_blocks(self.fitz_page, self.char_to_find, self.char_to_replace)
         # print(f"[INFO] 找到 {len(blocks_data)} 个 '好砖'.")
         return blocks_data
 
-    def correct(self, page_num, plumber_page):
+    def correct(self, page_num, plumber_page, layout=None):
         """
         执行核心的"精确换砖"修正流程。
+        :param layout: 可选的 PageLayout。调用方已经计算过页面布局时直接复用，
+                       避免再次调用 find_tables() 和 extract()。
         :return: 修正后的、与 pdfplumber.extract_tables() 格式相同的表格数据。
         """
         self.plumber_page = plumber_page
@@ -64,15 +136,19 @@ class CustomsFormCorrector:
 
         # 步骤2: 获取"地基"
         # print("[INFO] 步骤 2/3: 从 pdfplumber 提取原始表格结构和内容 ('地基')...")
-        plumber_tables = self.plumber_page.find_tables()
+        if layout is None:
+            layout = PageLayout.from_plumber_page(page_num, self.plumber_page)
+        plumber_tables = layout.tables
         if not plumber_tables:
             print("错误：pdfplumber 未能在此页面上找到任何表格。")
             return None
         
-        # 将原始表格数据提取出来，作为我们最终要修改的"画布"
-        final_tables_rebuilt = [table.extract() for table in plumber_tables]
-        final_tables_changed_count = [[[0 for _ in range(len(table.columns))] for _ in range(len(table.rows))] for table in plumber_tables]
-        final_tables_ocr_text = [[["" for _ in range(len(table.columns))] for _ in range(len(table.rows))] for table in plumber_tables]
+        # 将原始表格数据复制出来，作为我们最终要修改的"画布"
+        final_tables_rebuilt = layout.extract_tables()
+        final_tables_changed_count = [[[0 for _ in row] for row in table.rows] for table in plumber_tables]
+        final_tables_ocr_text = [[["" for _ in row] for row in table.rows] for table in plumber_tables]
+        # 单元格空间索引：每页构建一次，每个"好砖"的定位只需两次二分查找
+        cell_index = layout.cell_index()
 
         # 步骤3: "精确换砖"
         # print("[INFO] 步骤 3/3: 开始 '精确换砖' 流程...")
@@ -85,26 +161,7 @@ class CustomsFormCorrector:
             block_center_x = (fitz_block['bbox'][0] + fitz_block['bbox'][2]) / 2
             block_center_y = (fitz_block['bbox'][1] + fitz_block['bbox'][3]) / 2
             
-            found_cell_coords = None
-            for t_idx, table in enumerate(plumber_tables):
-                for r_idx, row in enumerate(table.rows):
-                    for c_idx, cell_bbox in enumerate(row.cells):
-                        if (cell_bbox and
-                            cell_bbox[0] <= block_center_x < cell_bbox[2] and
-                            cell_bbox[1] <= block_center_y < cell_bbox[3]):
-
-                            # if iou > 0.95:
-                            found_cell_coords = (t_idx, r_idx, c_idx)
-                            # print(fitz_block['text'])
-                            # if '1, 00.000 C6' == fitz_block['text']:
-                                # print("fitz_block", fitz_block['text'])
-                            #     clip = fitz.Rect(cell_bbox[0], cell_bbox[1], cell_bbox[2], cell_bbox[3])
-                            #     pix = self.fitz_page.get_pixmap(clip=clip, dpi=300)
-                            #     show_image = Image.open(io.BytesIO(pix.tobytes()))
-                            #     show_image.show()
-                            break
-                    if found_cell_coords: break
-                if found_cell_coords: break
+            found_cell_coords = cell_index.lookup(block_center_x, block_center_y)
             
             if not found_cell_coords: continue
 
@@ -225,10 +282,24 @@ class CustomsFormCorrector:
         return "".join(result_str)
 
     def close(self):
-        """关闭所有打开的PDF文件句柄。"""
-        self.fitz_doc.close()
+        """关闭所有打开的PDF文件句柄，取消未开始的预取并等待后台进程退出（可以重复调用）。"""
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=True, cancel_futures=True)
+            self._prefetch_executor = None
+        self._prefetch_futures.clear()
+        if self.fitz_doc is not None:
+            if self._owns_doc:
+                self.fitz_doc.close()
+            self.fitz_doc = None
+            self.fitz_page = None
         # print("[INFO] PDF文件句柄已关闭。")
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
 # --- 示例用法 ---
 if __name__ == "__main__":
     # PDF文件路径
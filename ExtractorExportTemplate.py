@@ -1,66 +1,49 @@
-from FieldsExtractor import ExportFields, ExportFieldsExtractor
-import re
+from FieldsExtractor import EXPORT_TEMPLATE_SPEC, ExportFieldsExtractor
+from TemplateSpec import NET_WEIGHT, FieldSpec, leading_number, net_weight, strip_currency
+
+
+def net_weight_second_line(text):
+    """HLS的重量单元格：第一行不是 '数值 单位' 时，取第二行。返回 (总净重, 重量单位)。"""
+    match = NET_WEIGHT.match(text)
+    if not match:
+        lines = text.split('\n')
+        if len(lines) < 2:
+            return None, text
+        match = NET_WEIGHT.match(lines[1])
+        if not match:
+            return None, lines[1]
+    return net_weight(match)
+
 
 class TianShiExtractor(ExportFieldsExtractor):
-    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en'):
+    # 字段布局与默认布局相同。如果某个字段在不同位置，在这里覆盖对应的声明
+    TEMPLATE_SPEC = EXPORT_TEMPLATE_SPEC.derive('TianShi')
+
+    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en', **kwargs):
         """
         天狮模板的构造函数。
         调用父类的构造函数以完成基本初始化。
         """
-        super().__init__(pdf_path, output_dir, lang)
+        super().__init__(pdf_path, output_dir, lang, **kwargs)
         self.logger.info("初始化 TianShi 模板提取器。")
 
-    def _parse_group_to_fields(self, group_data: dict) -> ExportFields:
-        """
-        重写父类的方法以适应TianShi模板的特定字段布局。
-        （如果布局与基类完全相同，则此方法可以不重写）
-        """
-        self.logger.info("使用 TianShi 特定的解析逻辑...")
-        # 调用父类的解析方法作为基础，然后可以进行微调
-        item = super()._parse_group_to_fields(group_data)
-        
-        # --- 针对TianShi模板的特定调整 ---
-        # 示例：如果TianShi模板的型号在不同位置
-        # item.MODEL = self._get_cell_from_rows(group_data['rows'], 3, 2) 
-        
-        return item
-
 class HlsExtractor(ExportFieldsExtractor):
-    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en'):
+    TEMPLATE_SPEC = EXPORT_TEMPLATE_SPEC.derive('HLS', fields=[
+        # 金额单元格只取数字部分
+        FieldSpec('AMOUNT_USD', (0, 4), post=(strip_currency('USD'), leading_number)),
+        FieldSpec('AMOUNT_THB', (2, 0), post=(strip_currency('THB'), leading_number)),
+        FieldSpec(('TOTAL_N_W', 'WEIGHT_UNIT'), (0, 3), post=net_weight_second_line),
+        # 项号从文本层读取
+        FieldSpec('NO', (0, 0), source='original_rows', post=leading_number),
+    ])
+
+    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en', **kwargs):
         """
         HLS模板的构造函数。
         """
-        super().__init__(pdf_path, output_dir, lang)
+        super().__init__(pdf_path, output_dir, lang, **kwargs)
         self.logger.info("初始化 HLS 模板提取器。")
 
-    def _parse_group_to_fields(self, group_data: dict) -> ExportFields:
-
-        def get_original_cell(r, c, default=''):
-            try:
-                return group_data.get('original_rows', [])[r][c].strip()
-            except (IndexError, AttributeError):
-                return default
-            
-        # 调用父类的解析方法作为基础，然后可以进行微调
-        item = super()._parse_group_to_fields(group_data)
-
-        item.AMOUNT_USD = self.get_digital_value(item.AMOUNT_USD)
-        item.AMOUNT_THB = self.get_digital_value(item.AMOUNT_THB)
-
-        # 重量cell
-        if len(item.WEIGHT_UNIT.split('\n')) > 1:
-            total_nw_text = item.WEIGHT_UNIT.split('\n')[1]
-            nw_match = re.match(r'([0-9,.]+)\s*([A-Z]+)', total_nw_text, re.IGNORECASE)
-            if nw_match:
-                item.WEIGHT_UNIT = nw_match.group(2).replace('KGV', 'KGM')
-                item.TOTAL_N_W = nw_match.group(1)
-            else:
-                item.WEIGHT_UNIT = total_nw_text
-
-        item.NO = self.get_digital_value(get_original_cell(0, 0))
-
-        return item
-
 
 if __name__ == "__main__":
     import argparse
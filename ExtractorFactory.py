@@ -1,12 +1,91 @@
-from ExtractorImportTemplate import TianShiExtractor as TianShiImportExtractor, LssExtractor as LssImportExtractor, HlsExtractor as HlsImportExtractor, SnpExtractor as SnpImportExtractor, OlcExtractor as OLCImportExtractor
-from ExtractorExportTemplate import TianShiExtractor as TianShiExportExtractor, HlsExtractor as HlsExportExtractor
+import importlib
+
+from PageLayout import TemplateGridCache
+from TemplateSpec import TemplateSpec
 
 class ExtractorFactory:
     """
     一个工厂类，用于根据指定的模板类型创建对应的字段提取器实例。
+
+    模板以 TemplateSpec 注册：(类型, 模板名) -> (提取器类, 模板声明)。新的报关行模板只需要注册一个声明
+    （通常从默认布局 derive 而来），只有描述块解析这类无法声明的差异才需要提取器子类。
+    模板也可以只按名称注册为 '模块:类' 字符串（见 register_lazy_template），第一次创建该模板的提取器时
+    才导入模块，因此导入本模块不会加载提取器、OCR引擎和PDF库，界面和命令行可以快速启动。
+
+    grid_cache 为各模板共享的表格网格缓存（默认关闭，用 use_grid_cache() 或 use_grid_cache_file() 开启）：
+    每个模板的网格从第一页学习（或从持久化文件加载），之后的页面和文档只做快速校验，不再重复调用 find_tables()。
     """
+    grid_cache = None
+    templates = {}
+    # 注册模板时没有指定提取器类，则按报关单类型使用默认提取器
+    DEFAULT_EXTRACTORS = {'import': 'FieldsExtractor:ImportFieldsExtractor', 'export': 'FieldsExtractor:ExportFieldsExtractor'}
+
+    @staticmethod
+    def use_grid_cache(grid_cache=None):
+        """开启（传入 TemplateGridCache，为None时新建一个内存缓存）表格网格缓存。"""
+        ExtractorFactory.grid_cache = grid_cache if grid_cache is not None else TemplateGridCache()
+
+    @staticmethod
+    def use_grid_cache_file(path: str):
+        """开启持久化到指定JSON文件的表格网格缓存。"""
+        ExtractorFactory.grid_cache = TemplateGridCache(path)
+
+    @staticmethod
+    def load_class(target):
+        """把 '模块:类' 字符串解析为类（导入对应模块），已经是类时直接返回。"""
+        if not isinstance(target, str):
+            return target
+        module_name, _, class_name = target.partition(':')
+        return getattr(importlib.import_module(module_name), class_name)
+
+    @staticmethod
+    def register_template(spec: TemplateSpec, extractor_class=None):
+        """
+        注册一个模板。模板声明在注册时编译，之后创建的所有提取器共用编译结果。
+
+        Args:
+            spec (TemplateSpec): 模板声明，spec.doc_type 和 spec.name 决定注册的类型和名称。
+            extractor_class (type, optional): 提取器类，为None时使用该类型的默认提取器。
+        """
+        if extractor_class is None:
+            extractor_class = ExtractorFactory.DEFAULT_EXTRACTORS[spec.doc_type]
+        extractor_class = ExtractorFactory.load_class(extractor_class)
+        spec.compile()
+        ExtractorFactory.templates[(spec.doc_type, spec.name)] = (extractor_class, spec)
+
+    @staticmethod
+    def register_lazy_template(type: str, name: str, target: str):
+        """
+        按名称注册模板，不导入提取器模块。第一次使用时导入 target 并以提取器类的 TEMPLATE_SPEC 注册。
+
+        Args:
+            type (str): 模板类型 ('import' 或 'export')。
+            name (str): 模板名称。
+            target (str): 提取器类，格式为 '模块:类'，例如 'ExtractorImportTemplate:TianShiExtractor'。
+        """
+        ExtractorFactory.templates[(type, name)] = target
+
+    @staticmethod
+    def resolve_template(type: str, name: str):
+        """返回模板的 (提取器类, 模板声明)，按名称注册的模板在这里导入并编译。"""
+        key = (type, name)
+        if key not in ExtractorFactory.templates:
+            raise ValueError(f"未知的模板类型: {name}")
+        entry = ExtractorFactory.templates[key]
+        if isinstance(entry, str):
+            extractor_class = ExtractorFactory.load_class(entry)
+            spec = extractor_class.TEMPLATE_SPEC
+            spec.compile()
+            entry = ExtractorFactory.templates[key] = (extractor_class, spec)
+        return entry
+
     @staticmethod
-    def create_extractor(template_type: str, pdf_path: str, output_dir: str = None, lang: str = 'en', type: str = 'import'):
+    def template_names(type: str = 'import') -> list:
+        """按注册顺序返回指定类型的模板名称。"""
+        return [name for doc_type, name in ExtractorFactory.templates if doc_type == type]
+
+    @staticmethod
+    def create_extractor(template_type: str, pdf_path: str, output_dir: str = None, lang: str = 'en', type: str = 'import', ocr_pool=None, output_formats=None, dataset_dir: str = None):
         """
         根据模板类型创建并返回一个具体的FieldsExtractor实例。
 
@@ -16,27 +95,34 @@ class ExtractorFactory:
             output_dir (str, optional): 输出目录的路径。
             lang (str, optional): OCR语言。
             type (str, optional): 模板类型 (例如, 'import', 'export').
+            ocr_pool (OcrWorkerPool, optional): 共享的常驻OCR进程池，为None时每个文档临时创建。
+            output_formats (list, optional): 结果文件格式 ('json', 'ndjson', 'csv', 'xlsx', 'parquet')，为None时使用提取器的默认格式。
+            dataset_dir (str, optional): Parquet数据集根目录，Parquet文件按 类型/模板/日期 分区写入其中。
 
         Returns:
             一个FieldsExtractor的子类实例，如果模板类型未知则返回None。
         """
-        if type == 'import':
-            if template_type == 'TianShi':
-                return TianShiImportExtractor(pdf_path, output_dir, lang)
-            elif template_type == 'LSS':
-                return LssImportExtractor(pdf_path, output_dir, lang)
-            elif template_type == 'HLS':
-                return HlsImportExtractor(pdf_path, output_dir, lang)
-            elif template_type == 'OLC':
-                return OLCImportExtractor(pdf_path, output_dir, lang, use_corrector=True)
-            elif template_type == 'SNP':
-                return SnpImportExtractor(pdf_path, output_dir, lang)
-            else:
-                raise ValueError(f"未知的模板类型: {template_type}") 
-        elif type == 'export':
-            if template_type == 'TianShi':
-                return TianShiExportExtractor(pdf_path, output_dir, lang)
-            elif template_type == 'HLS':
-                return HlsExportExtractor(pdf_path, output_dir, lang)
-            else:
-                raise ValueError(f"未知的模板类型: {template_type}") 
+        if type not in ExtractorFactory.DEFAULT_EXTRACTORS:
+            return None
+        extractor_class, spec = ExtractorFactory.resolve_template(type, template_type)
+        options = {'grid_cache': ExtractorFactory.grid_cache, 'grid_key': f"{type}/{template_type}",
+                   'template_name': template_type, 'template_spec': spec, 'dataset_dir': dataset_dir}
+        if output_formats is not None:
+            options['output_formats'] = output_formats
+        # 模板声明中的附加参数，例如 OLC 的 use_corrector
+        options.update(spec.options)
+        return extractor_class(pdf_path, output_dir, lang, ocr_pool=ocr_pool, **options)
+
+
+# 内置模板（注册顺序即界面中的显示顺序），按名称注册，创建提取器时才导入模板模块
+BUILTIN_TEMPLATES = [
+    ('import', 'LSS', 'ExtractorImportTemplate:LssExtractor'),
+    ('import', 'HLS', 'ExtractorImportTemplate:HlsExtractor'),
+    ('import', 'SNP', 'ExtractorImportTemplate:SnpExtractor'),
+    ('import', 'OLC', 'ExtractorImportTemplate:OlcExtractor'),
+    ('import', 'TianShi', 'ExtractorImportTemplate:TianShiExtractor'),
+    ('export', 'TianShi', 'ExtractorExportTemplate:TianShiExtractor'),
+    ('export', 'HLS', 'ExtractorExportTemplate:HlsExtractor'),
+]
+for _type, _name, _target in BUILTIN_TEMPLATES:
+    ExtractorFactory.register_lazy_template(_type, _name, _target)
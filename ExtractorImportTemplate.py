@@ -1,37 +1,28 @@
-from FieldsExtractor import ImportFieldsExtractor, ImportFields
+from FieldsExtractor import IMPORT_TEMPLATE_SPEC, ImportFieldsExtractor, ImportFields
 import re
 
 class TianShiExtractor(ImportFieldsExtractor):
-    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en'):
+    # 字段布局与默认布局相同。如果某个字段在不同位置，在这里覆盖对应的声明，例如:
+    # IMPORT_TEMPLATE_SPEC.derive('TianShi', fields=[FieldSpec('MODEL', (3, 2))])
+    TEMPLATE_SPEC = IMPORT_TEMPLATE_SPEC.derive('TianShi')
+
+    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en', **kwargs):
         """
         天狮模板的构造函数。
         调用父类的构造函数以完成基本初始化。
         """
-        super().__init__(pdf_path, output_dir, lang)
+        super().__init__(pdf_path, output_dir, lang, **kwargs)
         self.logger.info("初始化 TianShi 模板提取器。")
 
-    def _parse_group_to_fields(self, group_data: dict) -> ImportFields:
-        """
-        重写父类的方法以适应TianShi模板的特定字段布局。
-        （如果布局与基类完全相同，则此方法可以不重写）
-        """
-        self.logger.info("使用 TianShi 特定的解析逻辑...")
-        # 调用父类的解析方法作为基础，然后可以进行微调
-        item = super()._parse_group_to_fields(group_data)
-        
-        # --- 针对TianShi模板的特定调整 ---
-        # 示例：如果TianShi模板的型号在不同位置
-        # item.MODEL = self._get_cell_from_rows(group_data['rows'], 3, 2) 
-        
-        return item
-
 
 class LssExtractor(ImportFieldsExtractor):
-    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en'):
+    TEMPLATE_SPEC = IMPORT_TEMPLATE_SPEC.derive('LSS')
+
+    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en', **kwargs):
         """
         LSS模板的构造函数。
         """
-        super().__init__(pdf_path, output_dir, lang)
+        super().__init__(pdf_path, output_dir, lang, **kwargs)
         self.logger.info("初始化 LSS 模板提取器。")
 
     def _parse_description_block(self, item: ImportFields, original_block_text: str, ocr_block_text: str):
@@ -99,20 +90,25 @@ class LssExtractor(ImportFieldsExtractor):
 
 
 class HlsExtractor(ImportFieldsExtractor):
-    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en'):
+    TEMPLATE_SPEC = IMPORT_TEMPLATE_SPEC.derive('HLS')
+
+    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en', **kwargs):
         """
         HLS模板的构造函数。
         """
-        super().__init__(pdf_path, output_dir, lang)
+        super().__init__(pdf_path, output_dir, lang, **kwargs)
         self.logger.info("初始化 HLS 模板提取器。")
 
 
 class OlcExtractor(ImportFieldsExtractor):
-    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en', use_corrector: bool = False):
+    # OLC的PDF文本层有错误字符，需要先用 CustomsFormCorrector 纠正
+    TEMPLATE_SPEC = IMPORT_TEMPLATE_SPEC.derive('OLC', options={'use_corrector': True})
+
+    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en', use_corrector: bool = False, **kwargs):
         """
         OLC模板的构造函数。
         """
-        super().__init__(pdf_path=pdf_path, output_dir=output_dir, lang=lang, use_corrector=use_corrector)
+        super().__init__(pdf_path=pdf_path, output_dir=output_dir, lang=lang, use_corrector=use_corrector, **kwargs)
         self.logger.info("初始化 OLC 模板提取器。")
 
     def _parse_description_block(self, item: ImportFields, original_block_text: str, ocr_block_text: str):
@@ -165,11 +161,13 @@ class OlcExtractor(ImportFieldsExtractor):
         item.DESCRIPTION = ' '.join(remaining_text_list).strip().replace('"', '')
 
 class SnpExtractor(ImportFieldsExtractor):
-    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en', use_corrector: bool = False):
+    TEMPLATE_SPEC = IMPORT_TEMPLATE_SPEC.derive('SNP')
+
+    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en', use_corrector: bool = False, **kwargs):
         """
         SNP模板的构造函数。
         """
-        super().__init__(pdf_path=pdf_path, output_dir=output_dir, lang=lang, use_corrector=use_corrector)
+        super().__init__(pdf_path=pdf_path, output_dir=output_dir, lang=lang, use_corrector=use_corrector, **kwargs)
         self.logger.info("初始化 SNP 模板提取器。")
 
 
@@ -1,14 +1,30 @@
-import json
 import re
 import os
-from openpyxl import Workbook
+from datetime import date
 
-
-from OcrParser import OcrParser
+from TemplateSpec import (
+    NET_WEIGHT, QTY_WITH_UNIT, UNIT_CODES, FieldSpec, TemplateSpec, first_line, hs_code_and_unit_codes,
+    invoice_t8, leading_number, net_weight, number_in_lines, package_qty_and_type, strip_currency, strip_pair
+)
+from OutputSinks import ITEM_SINKS, ExcelSink, JsonArraySink, open_item_sink, partition_path
+from RunMetrics import StageTimer, run_metrics, write_json_sidecar, write_prometheus_textfile
+from ThaiNormalizer import DEFAULT_NORMALIZER, THAI_REPLACEMENT_MAP, fix_thanthakhat
 
 
 class ImportFields:
     """一个数据类，用于存放从报关单单个项目中提取的字段。"""
+    # 列式输出（Parquet）中保存为数值的字段（金额、重量、数量、税率）
+    NUMERIC_FIELDS = (
+        'QTY', 'AMOUNT_USD', 'AMOUNT_THB', 'TOTAL_N_W', 'TAX_RATE', 'CUSTOMS_DUTIES_PAYABLE', 'DUTY_PAID',
+        'FEE', 'EXCISE_TAX_RATE', 'EXCISE_TAX', 'OTHER_TAXES', 'MINISTRY_OF_INTERIOR_TAX',
+        'VALUE_ADDED_TAX_BASE', 'VAT',
+    )
+    # 列式输出中以字典编码保存的代码字段
+    CODE_FIELDS = (
+        'HS_CODE', 'QTY_UNIT', 'UNIT_CODE_1', 'UNIT_CODE_2', 'PRIVILEGE_CODE', 'WEIGHT_UNIT',
+        'EXCISE_PRODUCT_CODE', 'INV', 'COUNTRY_OF_ORIGIN',
+    )
+
     def __init__(self):
         self.NO = ''    # NO (项号)
         self.MODEL = ''    # MODEL (型号)
@@ -42,44 +58,91 @@ class ImportFields:
         self.COUNTRY_OF_ORIGIN = ''   # Country of Origin (原产国)
         self.USAGE_RULES = ''   # Usage Rules (使用规则)
         
+# 进口报关单的默认字段布局，单元格为组内的 (行号, 列号)
+IMPORT_TEMPLATE_SPEC = TemplateSpec('default', 'import', fields=[
+    # 第1行
+    FieldSpec('NO', (0, 0), post=first_line),
+    FieldSpec('HS_CODE', (0, 1)),
+    FieldSpec('AMOUNT_USD', (0, 2), post=strip_currency('USD')),
+    FieldSpec('TAX_RATE', (0, 3)),
+    FieldSpec('CUSTOMS_DUTIES_PAYABLE', (0, 4), post=number_in_lines),
+    FieldSpec('FEE', (0, 5), post=number_in_lines),
+    FieldSpec('EXCISE_PRODUCT_CODE', (0, 6)),
+    FieldSpec('EXCISE_TAX', (0, 7), post=number_in_lines),
+    FieldSpec('VALUE_ADDED_TAX_BASE', (0, 8)),
+    # 第2行
+    FieldSpec(('UNIT_CODE_1', 'UNIT_CODE_2'), (1, 0), pattern=UNIT_CODES, post=strip_pair),
+    FieldSpec('AMOUNT_THB', (1, 1)),
+    FieldSpec('DUTY_PAID', (1, 2)),
+    FieldSpec('OTHER_TAXES', (1, 3), post=number_in_lines),
+    FieldSpec('EXCISE_TAX_RATE', (1, 4), post=number_in_lines),
+    FieldSpec('MINISTRY_OF_INTERIOR_TAX', (1, 5), post=number_in_lines),
+    FieldSpec('VAT', (1, 6)),
+    # 第3行
+    FieldSpec('PRIVILEGE_CODE', (2, 0)),
+    FieldSpec(('TOTAL_N_W', 'WEIGHT_UNIT'), (2, 1), pattern=NET_WEIGHT, post=net_weight, fallback='WEIGHT_UNIT'),
+    FieldSpec(('QTY', 'QTY_UNIT'), (2, 2), pattern=QTY_WITH_UNIT, fallback='QTY'),
+], late_fields=[
+    # 第4行：文本层中的发票号，覆盖描述块中找到的值
+    FieldSpec('INV', (3, 0), source='original_rows', post=invoice_t8),
+], description_row=2, description_cell=(2, 3))
+
+
 class ImportFieldsExtractor:
     """
     负责从OCR解析后的文本中提取结构化字段。
     此类不存储字段，而是生成一个包含多个Fields对象的列表。
     """
-    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en', save_json: bool = False, save_excel: bool = True, use_corrector: bool = False):
+    # 每个项目在表格中占用的行数
+    GROUP_SIZE = 4
+    # 报关单类型，用作列式数据集的子目录
+    DOC_TYPE = 'import'
+    FIELDS_CLASS = ImportFields
+    # 字段布局。只有从OCR结果取值的单元格会被 OcrParser 渲染和识别，
+    # 其余单元格（例如描述块）只使用文本层。
+    TEMPLATE_SPEC = IMPORT_TEMPLATE_SPEC
+
+    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en', save_json: bool = False, save_excel: bool = True, use_corrector: bool = False, ocr_pool=None, output_formats=None, dataset_dir: str = None, template_name: str = None, template_spec: TemplateSpec = None,
+                 save_metrics: bool = True, metrics_textfile: str = None, **ocr_options):
         self.pdf_path = pdf_path
         self.output_dir = output_dir if output_dir else self._get_default_output_dir()
         self.lang = lang
         self.save_json = save_json
+        # output_formats: 结果文件的格式列表 ('json', 'ndjson', 'csv', 'xlsx', 'parquet')，默认按 save_json 输出JSON，并总是输出Excel
+        if output_formats is None:
+            output_formats = (['json'] if save_json else []) + ['xlsx']
+        self.output_formats = list(output_formats)
+        for fmt in self.output_formats:
+            if fmt not in ITEM_SINKS:
+                raise ValueError(f"未知的输出格式: {fmt}")
+        # dataset_dir: 列式输出（Parquet）的数据集根目录。指定后Parquet文件按 类型/模板/日期 分区写入
+        # <dataset_dir>/<DOC_TYPE>/template=<模板>/date=<处理日期>/<PDF名>.parquet，整个批次追加到同一个数据集；
+        # 未指定时写在输出目录中，与其他格式并列。
+        self.dataset_dir = dataset_dir
+        if dataset_dir and 'parquet' not in self.output_formats:
+            self.output_formats.append('parquet')
+        # template_spec: 字段布局声明，默认为类的 TEMPLATE_SPEC；编译结果在模板对象上缓存，同一模板只编译一次
+        self.template_spec = template_spec or self.TEMPLATE_SPEC
+        self.template = self.template_spec.compile()
+        self.template_name = template_name or self.template_spec.name
+        self.partition_date = date.today().isoformat()
+        # 运行指标：save_metrics 时在结果文件旁写出 <PDF名>_extracted_fields.metrics.json；
+        # metrics_textfile 为 Prometheus textfile 路径（.prom），每次运行覆盖
+        self.save_metrics = save_metrics
+        self.metrics_textfile = metrics_textfile
+        self.last_metrics = {}  # 最近一次运行的指标
         self.use_corrector = use_corrector
-        self.ocr_parser = OcrParser(lang=self.lang, use_corrector=self.use_corrector)
+        # ocr_pool: 可选的共享 OcrWorkerPool，多个文档复用同一组热模型
+        # ocr_options: 透传给 OcrParser 的其他选项 (例如 ocr_mode)
+        ocr_options.setdefault('ocr_cells', self.template.ocr_cells)
+        # OCR引擎和PDF库在创建提取器时才导入，导入本模块（例如注册模板、界面启动）不加载它们
+        from OcrParser import OcrParser
+        self.ocr_parser = OcrParser(lang=self.lang, use_corrector=self.use_corrector, ocr_pool=ocr_pool, **ocr_options)
         self.logger = self.ocr_parser.logger
 
-        self.replacement_map = {
-            '\uf700': 'ำ',    # sara am
-            '\uf701': '์',    # thanthakhat
-            '\uf702': '้',    # mai tho
-            '\uf706': '้',    # mai tho
-            '\uf707': '๊',    # mai tri
-            '\uf712': 'เ',    # sara e
-            '\uf713': 'ใ',    # sara ai maimuan
-            '\uf714': 'ไ',    # sara ai maimalai
-            '\uf715': '์',    # thanthakhat
-            '\uf716': '่',    # mai ek
-            '\uf717': '๊',    # mai tri
-            '\uf718': '๋',    # mai chattawa
-            '\uf70a': '่',    # mai ek (声调符号)
-            '\uf70e': '์',    # thanthakhat (静音符号)
-            '\uf70b': '้',    # mai tho (声调符号)
-            '\x0b': '(',
-            '\x0c': ')',
-            '\x9e': 'ป',
-            '\x9f': 'ผ',
-            '\x9a': 'ท',
-            '\x8d': 'ช',
-            'Ã': 'โ',
-        }
+        # PUA字形替换表，按表的顺序逐项替换，预编译为 str.translate 表
+        self.replacement_map = THAI_REPLACEMENT_MAP
+        self.thai_normalizer = DEFAULT_NORMALIZER
 
     def _get_default_output_dir(self) -> str:
         """根据PDF文件名生成一个默认的输出目录。"""
@@ -142,214 +205,244 @@ class ImportFieldsExtractor:
 
 
     def fix_thai_thanthakhat(self, text):
-        # 泰语辅音字母Unicode范围，包含所有辅音
-        consonants = (
-            'กขฃคฅฆงจฉชซฌญฎฏฐฑฒณดตถทธนบปผฝพฟภมยรฤลฦวศษสหฬอฮ'
-        )
-    
-        # 构造正则表达式，匹配辅音 + 空白(0个或多个) + 音杀符(์ U+0E4C)
-        pattern = re.compile(
-            f'([{consonants}])\\s*์'
-        )
-    
-        # 替换为辅音+์，去掉空白
-        fixed_text = pattern.sub(r'\1์', text)
-        return fixed_text
-
+        # 去掉辅音和音杀符(์ U+0E4C)之间的空白
+        return fix_thanthakhat(text)
 
     def replace_pua_thai(self, text):
-        for pua_char, std_char in self.replacement_map.items():
-            text = text.replace(pua_char, std_char)
-            text = self.fix_thai_thanthakhat(text)
-            
-        return text
+        return self.thai_normalizer.normalize(text)
 
     def _parse_group_to_fields(self, group_data: dict) -> ImportFields:
-        """将单个分组的OCR结果解析并填充到一个Fields对象中。"""
-        item = ImportFields()
-        rows = group_data.get('rows', [])
-
-        def get_cell(r, c, default=''):
-            try:
-                return rows[r][c].strip()
-            except (IndexError, AttributeError):
-                return default
-            
-        def get_original_cell(r, c, default=''):
-            try:
-                return group_data.get('original_rows', [])[r][c].strip()
-            except (IndexError, AttributeError):
-                return default
-            
-        def get_digital_value(text):
-            # 提取数字
-            value_list = text.split('\n')
-            for value in value_list:
-                match = re.search(r'([0-9,.%]+)', value)
-                if match:
-                    return match.group(1)
-            return text
-            
-        # --- 按单元格位置解析字段 ---
-        # 第1行
-        item.NO = get_cell(0, 0).split('\n')[0]
-        item.HS_CODE = get_cell(0, 1)
-        item.AMOUNT_USD = get_cell(0, 2).replace('USD\n', '').replace('USD ', '').strip()
-        item.TAX_RATE = get_cell(0, 3)
-        item.CUSTOMS_DUTIES_PAYABLE = get_digital_value(get_cell(0, 4))
-        item.FEE = get_digital_value(get_cell(0, 5))
-        item.EXCISE_PRODUCT_CODE = get_cell(0, 6)
-        item.EXCISE_TAX = get_digital_value(get_cell(0, 7))
-        item.VALUE_ADDED_TAX_BASE = get_cell(0, 8)
-
-        # 第2行
-        unit_codes = get_cell(1, 0).split('/')
-        if len(unit_codes) == 2:
-            item.UNIT_CODE_1 = unit_codes[0].strip()
-            item.UNIT_CODE_2 = unit_codes[1].strip()
-        item.AMOUNT_THB = get_cell(1, 1)
-        item.DUTY_PAID = get_cell(1, 2)
-        item.OTHER_TAXES = get_digital_value(get_cell(1, 3))
-        item.EXCISE_TAX_RATE = get_digital_value(get_cell(1, 4))
-        item.MINISTRY_OF_INTERIOR_TAX = get_digital_value(get_cell(1, 5))
-        item.VAT = get_cell(1, 6)
-
-        # 第3行
-        item.PRIVILEGE_CODE = get_cell(2, 0)
-        total_nw_text = get_cell(2, 1)
-        nw_match = re.match(r'([0-9,.]+)\s*([A-Z]+)', total_nw_text, re.IGNORECASE)
-        if nw_match:
-            item.WEIGHT_UNIT = nw_match.group(2).replace('KGV', 'KGM')
-            item.TOTAL_N_W = nw_match.group(1)
-        else:
-            item.WEIGHT_UNIT = total_nw_text
-
-        qty_unit_text = get_cell(2, 2)
-        qty_unit_match = re.match(r'([0-9,.]+)\s*([A-Z]+[0-9]*)', qty_unit_text, re.IGNORECASE)
-        if qty_unit_match:
-            item.QTY = qty_unit_match.group(1)
-            item.QTY_UNIT = qty_unit_match.group(2)
-        else:
-            item.QTY = qty_unit_text
-
-        # 解析描述块,找到字符串最长的单元格
-        max_length = 0
-        max_length_row = None
-        for row in group_data.get('original_rows', [])[2]:
-            if row is not None and len(row) > max_length and re.search(r'[\u0E00-\u0E7F]', row):
-                max_length = len(row)
-                max_length_row = row
-
-        description_block = max_length_row
-        description_block = self.replace_pua_thai(description_block)
-        self._parse_description_block(item, original_block_text=description_block, ocr_block_text=get_cell(2, 3))
-
-        # 第4行
-        inv_text = get_original_cell(3, 0)
-        inv_text_list = inv_text.split('\n')
-        for text in inv_text_list:
-            if re.search(r'[\u0E00-\u0E7F]', text):
-                text = re.sub(r'[\u0E00-\u0E7F]+', '', text).strip()
-            if 'T8' in text:
-                #提取T8及之后的字符
-                inv_match = re.search(r'(T8\S*)', text)
-                if inv_match:
-                    item.INV = inv_match.group(0).strip()
-                else:
-                    item.INV = text.strip()
+        """按模板的字段声明把单个分组的OCR结果解析并填充到一个Fields对象中。"""
+        item = self.FIELDS_CLASS()
+        template = self.template
+        template.apply(group_data, item)
 
+        # 解析描述块（该行文本层中含泰文的最长单元格）
+        description_block = self.replace_pua_thai(template.description_block(group_data))
+        self._parse_description_block(item, original_block_text=description_block,
+                                      ocr_block_text=template.cell_text(group_data, template.description_cell))
+
+        template.apply_late(group_data, item)
         return item
 
     def save_to_json(self, items: list, filename: str = "extracted_fields.json"):
         """将提取出的字段列表保存为JSON文件。"""
-        os.makedirs(self.output_dir, exist_ok=True)
         filepath = os.path.join(self.output_dir, filename)
-        
-        # 将Fields对象列表转换为字典列表以便序列化
-        items_as_dicts = [item.__dict__ for item in items]
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(items_as_dicts, f, ensure_ascii=False, indent=2)
+        # 逐条序列化写出，不在内存中构造完整的字典列表
+        with JsonArraySink(filepath) as sink:
+            sink.open()
+            for item in items:
+                sink.write(item)
         self.logger.info(f"已将提取的字段保存到: {filepath}")
 
+    # Excel输出的表头，列顺序与 _excel_row 一致
+    EXCEL_HEADERS = [
+        'NO', 	'MODEL',	'DESCRIPTION(英文描述)',	'DESCRIPTION(泰文描述)',
+        'HS CODE',	'QTY',	'Unit',	'Unit Code 1', 'Unit Code 2',	'Privilege Code',	'AMOUNT(USD)',	'AMOUNT(THB)',
+        'TOTAL.N.W', 'Weight unit',	'Tax rate',	'Customs duties payable',	'Duty paid',	'Inv.',
+        'Fee',	'Excise Product Code',	'Excise tax rate',	'Excise tax',	'Other taxes',
+        'Taxes for the Ministry of Interior',	'Value Added Tax Base',	'VAT',
+        'FE Certificate No./Date',	'TISI Certificate No./Date',	'Explanation',	'Country of Origin',	'Usage Rules'
+    ]
+
+    def _excel_row(self, item) -> list:
+        """把一个项目转换为Excel中的一行，列顺序与 EXCEL_HEADERS 一致。"""
+        return [
+            item.NO, item.MODEL, item.DESCRIPTION, item.DESCRIPTION_TH,
+            item.HS_CODE, item.QTY, item.QTY_UNIT, item.UNIT_CODE_1, 
+            item.UNIT_CODE_2, item.PRIVILEGE_CODE, item.AMOUNT_USD, 
+            item.AMOUNT_THB, item.TOTAL_N_W, item.WEIGHT_UNIT, item.TAX_RATE, 
+            item.CUSTOMS_DUTIES_PAYABLE, item.DUTY_PAID, item.INV, item.FEE, 
+            item.EXCISE_PRODUCT_CODE, item.EXCISE_TAX_RATE, item.EXCISE_TAX, 
+            item.OTHER_TAXES, item.MINISTRY_OF_INTERIOR_TAX,
+            item.VALUE_ADDED_TAX_BASE, item.VAT, item.FE_CERTIFICATE_NO_DATE, 
+            item.TISI_CERTIFICATE_NO_DATE, item.EXPLANATION, item.COUNTRY_OF_ORIGIN, 
+            item.USAGE_RULES
+        ]
+
     def save_to_excel(self, items: list, filename: str = "extracted_fields.xlsx"):
         """将提取出的字段列表保存为Excel文件。"""
-        os.makedirs(self.output_dir, exist_ok=True)
         filepath = os.path.join(self.output_dir, filename)
-        
-        # 创建Excel工作簿
-        workbook = Workbook()
-        sheet = workbook.active
-        
-        # 添加表头
-        sheet.append([
-                'NO', 	'MODEL',	'DESCRIPTION(英文描述)',	'DESCRIPTION(泰文描述)',
-                'HS CODE',	'QTY',	'Unit',	'Unit Code 1', 'Unit Code 2',	'Privilege Code',	'AMOUNT(USD)',	'AMOUNT(THB)',
-                'TOTAL.N.W', 'Weight unit',	'Tax rate',	'Customs duties payable',	'Duty paid',	'Inv.',
-                'Fee',	'Excise Product Code',	'Excise tax rate',	'Excise tax',	'Other taxes',
-                'Taxes for the Ministry of Interior',	'Value Added Tax Base',	'VAT',
-                'FE Certificate No./Date',	'TISI Certificate No./Date',	'Explanation',	'Country of Origin',	'Usage Rules'
-            ])
-        
-        # 添加数据
-        for item in items:
-            sheet.append([
-                item.NO, item.MODEL, item.DESCRIPTION, item.DESCRIPTION_TH,
-                item.HS_CODE, item.QTY, item.QTY_UNIT, item.UNIT_CODE_1, 
-                item.UNIT_CODE_2, item.PRIVILEGE_CODE, item.AMOUNT_USD, 
-                item.AMOUNT_THB, item.TOTAL_N_W, item.WEIGHT_UNIT, item.TAX_RATE, 
-                item.CUSTOMS_DUTIES_PAYABLE, item.DUTY_PAID, item.INV, item.FEE, 
-                item.EXCISE_PRODUCT_CODE, item.EXCISE_TAX_RATE, item.EXCISE_TAX, 
-                item.OTHER_TAXES, item.MINISTRY_OF_INTERIOR_TAX,
-                item.VALUE_ADDED_TAX_BASE, item.VAT, item.FE_CERTIFICATE_NO_DATE, 
-                item.TISI_CERTIFICATE_NO_DATE, item.EXPLANATION, item.COUNTRY_OF_ORIGIN, 
-                item.USAGE_RULES
-            ])
-
-        # 保存Excel文件
-        workbook.save(filepath)
+        # 只写模式的工作簿逐行写出，内存占用不随行数增长
+        with ExcelSink(filepath, self.EXCEL_HEADERS, self._excel_row) as sink:
+            sink.open()
+            for item in items:
+                sink.write(item)
         self.logger.info(f"已将提取的字段保存到: {filepath}")
 
 
+    def iter_built_items(self, all_pages_groups: dict, timer: StageTimer = None):
+        """按页码顺序把OCR分组结果逐个解析为字段对象。指定 timer 时解析耗时累加到 'parse' 阶段。"""
+        sorted_pages = sorted(all_pages_groups.keys(), key=int)
+        for page_num_str in sorted_pages:
+            for group_data in all_pages_groups[page_num_str]:
+                if timer is None:
+                    yield self._parse_group_to_fields(group_data)
+                    continue
+                with timer.stage('parse'):
+                    item = self._parse_group_to_fields(group_data)
+                yield item
+
+    def build_items(self, all_pages_groups: dict, timer: StageTimer = None) -> list:
+        """按页码顺序把OCR分组结果解析为字段对象列表。"""
+        return list(self.iter_built_items(all_pages_groups, timer))
+
+    def open_sinks(self) -> list:
+        """按 output_formats 创建结果文件的输出，文件名为 <PDF名>_extracted_fields.<格式>。"""
+        pdf_name = os.path.splitext(os.path.basename(self.pdf_path))[0]
+        base_path = os.path.join(self.output_dir, f"{pdf_name}_extracted_fields")
+        sinks = []
+        for fmt in self.output_formats:
+            path = f"{base_path}.{fmt}"
+            if fmt == 'parquet' and self.dataset_dir:
+                path = partition_path(
+                    os.path.join(self.dataset_dir, self.DOC_TYPE),
+                    [('template', self.template_name), ('date', self.partition_date)],
+                    f"{pdf_name}.parquet"
+                )
+            sinks.append(open_item_sink(fmt, path, self.EXCEL_HEADERS, self._excel_row,
+                                        extra_columns={'SOURCE_FILE': os.path.basename(self.pdf_path)}))
+        return sinks
+
+    def write_items(self, items, timer: StageTimer = None):
+        """
+        把项目逐条写入所有输出格式（items 可以是列表或生成器），
+        返回 (项目数, 写出的文件路径列表)。没有任何项目时不创建文件。
+        指定 timer 时写出耗时（包括关闭文件时保存Excel工作簿）累加到 'write' 阶段。
+        """
+        timer = timer or StageTimer()
+        sinks = self.open_sinks()
+        item_count = 0
+        try:
+            for item in items:
+                with timer.stage('write'):
+                    for sink in sinks:
+                        sink.write(item)
+                item_count += 1
+        finally:
+            with timer.stage('write'):
+                for sink in sinks:
+                    sink.close()
+        saved_files = [sink.path for sink in sinks if sink.count]
+        for path in saved_files:
+            self.logger.info(f"已将提取的字段保存到: {path}")
+        return item_count, saved_files
+
+    def save_items(self, extracted_items: list, timer: StageTimer = None) -> list:
+        """按配置保存解析结果，返回写出的文件路径列表。"""
+        return self.write_items(extracted_items, timer)[1]
+
+    def metrics_path(self) -> str:
+        """运行指标JSON文件的路径，与结果文件放在同一目录。"""
+        pdf_name = os.path.splitext(os.path.basename(self.pdf_path))[0]
+        return os.path.join(self.output_dir, f"{pdf_name}_extracted_fields.metrics.json")
+
+    def record_metrics(self, run_stats: dict, timer: StageTimer, item_count: int) -> dict:
+        """
+        汇总一次运行的指标（OcrParser 的运行统计 + 文档级的提取、解析、写出阶段），保存到 self.last_metrics，
+        并按设置写出JSON文件和 Prometheus textfile。写出失败只记录错误，不影响提取结果。
+        """
+        labels = {'doc_type': self.DOC_TYPE, 'template': self.template_name}
+        metrics = run_metrics(run_stats, timer.summary(), labels=labels, items=item_count)
+        metrics['source'] = os.path.basename(self.pdf_path)
+        self.last_metrics = metrics
+        try:
+            if self.save_metrics:
+                write_json_sidecar(metrics, self.metrics_path())
+                self.logger.info(f"运行指标已保存到: {self.metrics_path()}")
+            if self.metrics_textfile:
+                write_prometheus_textfile(metrics, self.metrics_textfile)
+        except OSError as e:
+            self.logger.error(f"写出运行指标时出错: {e}")
+        return metrics
+
     def extract_items(self):
         """执行完整的提取流程：OCR -> 解析 -> 保存。"""
         self.logger.info("开始执行字段提取流程...")
+        timer = StageTimer()
         # 1. 使用OcrParser提取原始文本
-        all_pages_groups = self.ocr_parser.extract_group_text(
-            self.pdf_path,
-            output_dir=self.output_dir,
-            lang=self.lang,
-            save_json=self.save_json,
-        )
+        with timer.stage('extract'):
+            all_pages_groups = self.ocr_parser.extract_group_text(
+                self.pdf_path,
+                output_dir=self.output_dir,
+                lang=self.lang,
+                save_json=self.save_json,
+                group_size=self.GROUP_SIZE
+            )
 
         if not all_pages_groups:
             self.logger.warning("OCR未能从PDF中提取任何分组，提取流程终止。")
+            self.record_metrics(self.ocr_parser.last_run_stats, timer, 0)
             return None
 
         # 2. 遍历所有分组并解析字段
-        extracted_items = []
-        sorted_pages = sorted(all_pages_groups.keys(), key=int)
-        for page_num_str in sorted_pages:
-            for group_data in all_pages_groups[page_num_str]:
-                item_fields = self._parse_group_to_fields(group_data)
-                extracted_items.append(item_fields)
+        extracted_items = self.build_items(all_pages_groups, timer)
         
         self.logger.info(f"成功从 {len(all_pages_groups)} 个页面中解析出 {len(extracted_items)} 个项目。")
 
-        # 3. 保存结果到JSON文件
-        if self.save_json and extracted_items:
-            filename = f"{os.path.splitext(os.path.basename(self.pdf_path))[0]}_extracted_fields.json"
-            self.save_to_json(extracted_items, filename=filename)
-
-        # 4. 保存结果到Excel文件
-        if extracted_items:
-            filename = f"{os.path.splitext(os.path.basename(self.pdf_path))[0]}_extracted_fields.xlsx"
-            self.save_to_excel(extracted_items, filename=filename)
+        self.save_items(extracted_items, timer)
+        self.record_metrics(self.ocr_parser.last_run_stats, timer, len(extracted_items))
 
         return extracted_items
 
+    def iter_items(self, ordered: bool = True, write_outputs: bool = True):
+        """
+        流式提取：每识别完一页就解析并产出该页的项目（ImportFields/ExportFields 对象），
+        同时把它们追加写入输出文件，不需要等整个文档处理完。
+
+        :param ordered: True 时按页码顺序产出；False 时按页面完成的顺序产出（输出文件中的顺序也相同）。
+        :param write_outputs: 是否边产出边写出结果文件（格式由 output_formats 决定，文件名与 extract_items 相同）。
+
+        每页处理完后刷新所有输出，但只有 csv 和 ndjson（ItemSink.INCREMENTAL）在提取过程中就是完整可读的文件；
+        json 数组、xlsx 和 parquet 同样逐条追加，要到迭代结束（或提前停止）关闭输出后才完整。
+        需要边提取边读取结果的调用方应在 output_formats 中使用 'ndjson' 或 'csv'。
+        """
+        sinks = self.open_sinks() if write_outputs else []
+        timer = StageTimer()
+        item_count = 0
+        pages = self.ocr_parser.iter_group_text(self.pdf_path, lang=self.lang, group_size=self.GROUP_SIZE, ordered=ordered)
+        try:
+            while True:
+                # 'extract' 只统计等待下一页结果的时间，不包括调用方处理产出项目的时间
+                with timer.stage('extract'):
+                    page = next(pages, None)
+                if page is None:
+                    break
+                for group_data in page[1]:
+                    with timer.stage('parse'):
+                        item = self._parse_group_to_fields(group_data)
+                    with timer.stage('write'):
+                        for sink in sinks:
+                            sink.write(item)
+                    item_count += 1
+                    yield item
+                with timer.stage('write'):
+                    for sink in sinks:
+                        sink.flush()
+        finally:
+            pages.close()
+            with timer.stage('write'):
+                for sink in sinks:
+                    sink.close()
+            for sink in sinks:
+                if sink.count:
+                    self.logger.info(f"已将提取的字段保存到: {sink.path}")
+        self.logger.info(f"流式提取完成，共解析出 {item_count} 个项目。")
+        self.record_metrics(self.ocr_parser.last_run_stats, timer, item_count)
+
 class ExportFields:
     """一个数据类，用于存放从报关单单个项目中提取的字段。"""
+    # 列式输出（Parquet）中保存为数值的字段（金额、重量、数量、税率）
+    NUMERIC_FIELDS = (
+        'QTY', 'PACKAGE_QTY', 'AMOUNT_USD', 'AMOUNT_THB', 'TOTAL_N_W', 'TAX_RATE', 'EXPORT_TAX',
+        'CUSTOMS_DUTIES_PAYABLE', 'VAT',
+    )
+    # 列式输出中以字典编码保存的代码字段
+    CODE_FIELDS = (
+        'HS_CODE', 'QTY_UNIT', 'UNIT_CODE_1', 'UNIT_CODE_2', 'PACKAGE_TYPE', 'WEIGHT_UNIT',
+        'PRIVILEGE_CODE', 'INV', 'COUNTRY_OF_ORIGIN', 'COUNTRY_OF_DESTINATION',
+    )
+
     def __init__(self):
         self.NO = ''    # NO (项号)
         self.MODEL = ''    # MODEL (型号)
@@ -377,113 +470,42 @@ class ExportFields:
         self.COUNTRY_OF_ORIGIN = ''   # Country of Origin (原产国)
         self.COUNTRY_OF_DESTINATION = ''   # Country of Destination (目的国)
 
-class ExportFieldsExtractor(ImportFieldsExtractor):
-    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en', save_json: bool = True, save_excel: bool = True, use_corrector: bool = False):
-        super().__init__(pdf_path, output_dir, lang, save_json, save_excel, use_corrector)
+# 出口报关单的默认字段布局，单元格为组内的 (行号, 列号)
+EXPORT_TEMPLATE_SPEC = TemplateSpec('default', 'export', fields=[
+    # HS编码和单位cell
+    FieldSpec(('HS_CODE', 'UNIT_CODE_1', 'UNIT_CODE_2'), (6, 0), post=hs_code_and_unit_codes),
+    # 包装数量和包装类型cell（文本层）
+    FieldSpec(('PACKAGE_QTY', 'PACKAGE_TYPE'), (0, 2), source='original_rows', post=package_qty_and_type),
+    # 重量cell
+    FieldSpec(('TOTAL_N_W', 'WEIGHT_UNIT'), (0, 3), pattern=NET_WEIGHT, post=net_weight, fallback='WEIGHT_UNIT'),
+    # QTY 和数量单位cell
+    FieldSpec(('QTY', 'QTY_UNIT'), (1, 0), pattern=QTY_WITH_UNIT, fallback='QTY'),
+    FieldSpec('AMOUNT_USD', (0, 4), post=strip_currency('USD')),
+    FieldSpec('AMOUNT_THB', (2, 0), post=strip_currency('THB')),
+    FieldSpec('TAX_RATE', (4, 0)),
+    FieldSpec('EXPORT_TAX', (6, 1)),
+    FieldSpec('CUSTOMS_DUTIES_PAYABLE', (5, 0)),
+    FieldSpec('PRIVILEGE_CODE', (0, 5)),
+    FieldSpec('NO', (0, 0), post=first_line),
+], description_row=3, description_cell=(3, 0))
 
-    def get_digital_value(self, text):
-            # 提取数字
-            value_list = text.split('\n')
-            for value in value_list:
-                match = re.match(r'([0-9,.%]+)', value)
-                if match:
-                    return match.group(0)
-            return text
-
-    def _parse_group_to_fields(self, group_data: dict) ->  ExportFields:
-        item = ExportFields()
-        rows = group_data.get('rows', [])
-
-        def get_cell(r, c, default=''):
-            try:
-                return rows[r][c].strip()
-            except (IndexError, AttributeError):
-                return default
-            
-        def get_original_cell(r, c, default=''):
-            try:
-                return group_data.get('original_rows', [])[r][c].strip()
-            except (IndexError, AttributeError):
-                return default
-            
 
-            
-        # --- 按单元格位置解析字段 ---
-        # HS编码和单位cell
-        cell_values = get_cell(6, 0).split('\n')
-        item.HS_CODE = self.get_digital_value(get_cell(6, 0))
-        if item.HS_CODE:
-            cell_values.remove(item.HS_CODE)
-        if len(cell_values) > 0:
-            unit_codes = cell_values[0].strip().split('/')
-            if len(unit_codes) == 2:
-                item.UNIT_CODE_1 = unit_codes[0].strip()
-                item.UNIT_CODE_2 = unit_codes[1].strip()
-
-        # 包装数量和包装类型cell
-        cell_values = get_original_cell(0, 2).split('\n')
-        for text in cell_values:
-            if re.search(r'[\u0E00-\u0E7F]', text):
-                cell_values.remove(text)
-        item.PACKAGE_QTY = self.get_digital_value(get_original_cell(0, 2))
-        if item.PACKAGE_QTY:
-            cell_values.remove(item.PACKAGE_QTY)
-        if len(cell_values) > 0:
-            item.PACKAGE_TYPE = cell_values[0].strip()
-
-        # 重量cell
-        total_nw_text = get_cell(0, 3)
-        nw_match = re.match(r'([0-9,.]+)\s*([A-Z]+)', total_nw_text, re.IGNORECASE)
-        if nw_match:
-            item.WEIGHT_UNIT = nw_match.group(2).replace('KGV', 'KGM')
-            item.TOTAL_N_W = nw_match.group(1)
-        else:
-            item.WEIGHT_UNIT = total_nw_text
-
-        # QTY 和数量单位cell
-        qty_unit_text = get_cell(1, 0)
-        qty_unit_match = re.match(r'([0-9,.]+)\s*([A-Z]+[0-9]*)', qty_unit_text, re.IGNORECASE)
-        if qty_unit_match:
-            item.QTY = qty_unit_match.group(1)
-            item.QTY_UNIT = qty_unit_match.group(2)
-        else:
-            item.QTY = qty_unit_text
-
-        # 美元金额cell
-        item.AMOUNT_USD = get_cell(0, 4).replace('USD\n', '').replace('USD ', '').strip()
-
-        # 泰铢金额cell
-        item.AMOUNT_THB = get_cell(2, 0).replace('THB\n', '').replace('THB ', '').strip()
-
-        # 出口税率cell
-        item.TAX_RATE = get_cell(4, 0)
-
-        # 出口税cell
-        item.EXPORT_TAX = get_cell(6, 1)
-
-        # 关税评估价格cell
-        item.CUSTOMS_DUTIES_PAYABLE = get_cell(5, 0)
-
-        # 优惠代码cell
-        item.PRIVILEGE_CODE = get_cell(0, 5)
-
-        item.NO = get_cell(0, 0).split('\n')[0]
-        
+class ExportFieldsExtractor(ImportFieldsExtractor):
+    # 出口模板每组8行
+    GROUP_SIZE = 8
+    DOC_TYPE = 'export'
+    FIELDS_CLASS = ExportFields
+    TEMPLATE_SPEC = EXPORT_TEMPLATE_SPEC
 
-        # 解析描述块,找到字符串最长的单元格
-        max_length = 0
-        max_length_row = None
-        for row in group_data.get('original_rows', [])[3]:
-            if row is not None and len(row) > max_length and re.search(r'[\u0E00-\u0E7F]', row):
-                max_length = len(row)
-                max_length_row = row
+    def __init__(self, pdf_path: str, output_dir: str = None, lang: str = 'en', save_json: bool = True, save_excel: bool = True, use_corrector: bool = False, ocr_pool=None, output_formats=None, dataset_dir: str = None, template_name: str = None, template_spec: TemplateSpec = None,
+                 save_metrics: bool = True, metrics_textfile: str = None, **ocr_options):
+        super().__init__(pdf_path, output_dir, lang, save_json, save_excel, use_corrector, ocr_pool, output_formats, dataset_dir, template_name, template_spec,
+                         save_metrics, metrics_textfile, **ocr_options)
 
-        description_block = max_length_row
-        description_block = self.replace_pua_thai(description_block)
-        self._parse_description_block(item, original_block_text=description_block, ocr_block_text=get_cell(3, 0))
+    def get_digital_value(self, text):
+        """返回第一个以数字开头的行开头的数字部分，没有时返回原文本。"""
+        return leading_number(text)
 
-        return item
-    
     def _parse_description_block(self, item: ExportFields, original_block_text: str, ocr_block_text: str):
         if not original_block_text:
             return
@@ -544,77 +566,27 @@ class ExportFieldsExtractor(ImportFieldsExtractor):
                 remaining_text_list.remove(text)
         item.DESCRIPTION = ' '.join(remaining_text_list).strip().replace('"', '')
     
-    def extract_items(self):
-        """执行完整的提取流程：OCR -> 解析 -> 保存。"""
-        self.logger.info("开始执行字段提取流程...")
-        # 1. 使用OcrParser提取原始文本
-        all_pages_groups = self.ocr_parser.extract_group_text(
-            self.pdf_path,
-            output_dir=self.output_dir,
-            lang=self.lang,
-            save_json=self.save_json,
-            group_size=8
-        )
+    # Excel输出的表头，列顺序与 _excel_row 一致
+    EXCEL_HEADERS = [
+        'NO', 	'MODEL',	'DESCRIPTION(英文描述)',	'DESCRIPTION(泰文描述)',
+        'HS CODE',	'QTY',	'Unit',	'Unit Code 1', 'Unit Code 2',	'Privilege Code',	
+        'Package Qty', 'Package Type',	'AMOUNT(USD)',	'AMOUNT(THB)',
+        'TOTAL.N.W', 'Weight unit',	'Tax rate',	'Export tax',	'Customs duties payable',	'Inv.',
+        'Country of Origin',	'Country of Destination'
+    ]
+
+    def _excel_row(self, item) -> list:
+        """把一个项目转换为Excel中的一行，列顺序与 EXCEL_HEADERS 一致。"""
+        return [
+            item.NO, item.MODEL, item.DESCRIPTION, item.DESCRIPTION_TH,
+            item.HS_CODE, item.QTY, item.QTY_UNIT, item.UNIT_CODE_1, 
+            item.UNIT_CODE_2, item.PRIVILEGE_CODE, item.PACKAGE_QTY, 
+            item.PACKAGE_TYPE, item.AMOUNT_USD, item.AMOUNT_THB, 
+            item.TOTAL_N_W, item.WEIGHT_UNIT, item.TAX_RATE, item.EXPORT_TAX, 
+            item.CUSTOMS_DUTIES_PAYABLE, item.INV, item.COUNTRY_OF_ORIGIN, 
+            item.COUNTRY_OF_DESTINATION
+        ]
 
-        if not all_pages_groups:
-            self.logger.warning("OCR未能从PDF中提取任何分组，提取流程终止。")
-            return None
-
-        # 2. 遍历所有分组并解析字段
-        extracted_items = []
-        sorted_pages = sorted(all_pages_groups.keys(), key=int)
-        for page_num_str in sorted_pages:
-            for group_data in all_pages_groups[page_num_str]:
-                item_fields = self._parse_group_to_fields(group_data)
-                extracted_items.append(item_fields)
-        
-        self.logger.info(f"成功从 {len(all_pages_groups)} 个页面中解析出 {len(extracted_items)} 个项目。")
-
-        # 3. 保存结果到JSON文件
-        if self.save_json and extracted_items:
-            filename = f"{os.path.splitext(os.path.basename(self.pdf_path))[0]}_extracted_fields.json"
-            self.save_to_json(extracted_items, filename=filename)
-
-        # 4. 保存结果到Excel文件
-        if extracted_items:
-            filename = f"{os.path.splitext(os.path.basename(self.pdf_path))[0]}_extracted_fields.xlsx"
-            self.save_to_excel(extracted_items, filename=filename)
-
-        return extracted_items
-    
-    def save_to_excel(self, items: list, filename: str = "extracted_fields.xlsx"):
-        """将提取出的字段列表保存为Excel文件。"""
-        os.makedirs(self.output_dir, exist_ok=True)
-        filepath = os.path.join(self.output_dir, filename)
-        
-        # 创建Excel工作簿
-        workbook = Workbook()
-        sheet = workbook.active
-        
-        # 添加表头
-        sheet.append([
-                'NO', 	'MODEL',	'DESCRIPTION(英文描述)',	'DESCRIPTION(泰文描述)',
-                'HS CODE',	'QTY',	'Unit',	'Unit Code 1', 'Unit Code 2',	'Privilege Code',	
-                'Package Qty', 'Package Type',	'AMOUNT(USD)',	'AMOUNT(THB)',
-                'TOTAL.N.W', 'Weight unit',	'Tax rate',	'Export tax',	'Customs duties payable',	'Inv.',
-                'Country of Origin',	'Country of Destination'
-            ])
-        
-        # 添加数据
-        for item in items:
-            sheet.append([
-                item.NO, item.MODEL, item.DESCRIPTION, item.DESCRIPTION_TH,
-                item.HS_CODE, item.QTY, item.QTY_UNIT, item.UNIT_CODE_1, 
-                item.UNIT_CODE_2, item.PRIVILEGE_CODE, item.PACKAGE_QTY, 
-                item.PACKAGE_TYPE, item.AMOUNT_USD, item.AMOUNT_THB, 
-                item.TOTAL_N_W, item.WEIGHT_UNIT, item.TAX_RATE, item.EXPORT_TAX, 
-                item.CUSTOMS_DUTIES_PAYABLE, item.INV, item.COUNTRY_OF_ORIGIN, 
-                item.COUNTRY_OF_DESTINATION
-            ])
-
-        # 保存Excel文件
-        workbook.save(filepath)
-        self.logger.info(f"已将提取的字段保存到: {filepath}")
 
 if __name__ == '__main__':
     # 为 FieldsExtractor 添加命令行测试入口
@@ -626,6 +598,10 @@ if __name__ == '__main__':
     parent_parser.add_argument("-o", "--output", help="输出目录路径。默认为PDF旁边的新建文件夹。")
     parent_parser.add_argument("--lang", default="en", help="OCR识别语言 (例如 'en', 'ch', 'th')。默认: 'en'。")
     parent_parser.add_argument("--type", default="import", help="提取类型 (例如 'import', 'export')。默认: 'import'。")
+    parent_parser.add_argument("--stream", action="store_true", help="流式提取：每完成一页就解析并追加写出该页的项目（提取过程中只有 ndjson/csv 文件可以直接读取）。")
+    parent_parser.add_argument("--formats", default="json,xlsx", help="结果文件格式，逗号分隔 (json, ndjson, csv, xlsx, parquet)。默认: 'json,xlsx'。")
+    parent_parser.add_argument("--dataset-dir", help="Parquet数据集根目录，指定后Parquet文件按 类型/模板/日期 分区写入。")
+    parent_parser.add_argument("--metrics-textfile", help="把运行指标写为 Prometheus textfile（例如 node_exporter 的 textfile 目录中的 customs.prom）。")
 
     parser = argparse.ArgumentParser(
         description="从PDF报关单中提取结构化字段。",
@@ -641,7 +617,10 @@ if __name__ == '__main__':
             output_dir=args.output,
             lang=args.lang,
             save_json=True,
-            save_excel=True
+            save_excel=True,
+            output_formats=args.formats.split(','),
+            dataset_dir=args.dataset_dir,
+            metrics_textfile=args.metrics_textfile
         )
     elif args.type == 'export':
         extractor = ExportFieldsExtractor(
@@ -649,6 +628,13 @@ if __name__ == '__main__':
             output_dir=args.output,
             lang=args.lang,
             save_json=True,
-            save_excel=True
+            save_excel=True,
+            output_formats=args.formats.split(','),
+            dataset_dir=args.dataset_dir,
+            metrics_textfile=args.metrics_textfile
     )
-    extractor.extract_items()
+    if args.stream:
+        for item in extractor.iter_items():
+            print(f"{item.NO}\t{item.HS_CODE}\t{item.DESCRIPTION}")
+    else:
+        extractor.extract_items()
@@ -0,0 +1,92 @@
+import os
+import subprocess
+import sys
+from collections import namedtuple
+
+
+# 启动时不应加载的重量级依赖：只有开始提取时才需要
+HEAVY_DEPENDENCIES = ('paddleocr', 'paddle', 'cv2', 'fitz', 'pymupdf', 'pdfplumber', 'pdfminer', 'pypdfium2',
+                      'numpy', 'PIL', 'openpyxl', 'pyarrow')
+
+# -X importtime 输出中的一行：模块自身耗时、包含子模块的累计耗时（微秒）、缩进层级
+ImportRecord = namedtuple('ImportRecord', ['module', 'self_us', 'cumulative_us', 'depth'])
+
+
+def parse_importtime(output: str) -> list:
+    """解析 python -X importtime 写到 stderr 的输出，返回 ImportRecord 列表（按导入完成的顺序）。"""
+    records = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # 表头行: "import time: self [us] | cumulative | imported package"
+            continue
+        name = fields[2].rstrip()
+        module = name.lstrip()
+        depth = (len(name) - len(module) - 1) // 2
+        records.append(ImportRecord(module, int(fields[0]), int(fields[1]), depth))
+    return records
+
+
+def profile_import(module: str, python: str = None, cwd: str = None) -> list:
+    """
+    在新的解释器进程中导入模块并返回 -X importtime 的记录。
+    子进程的工作目录默认为本文件所在目录，使项目模块可以直接导入。
+    """
+    command = [python or sys.executable, '-X', 'importtime', '-c', f'import {module}']
+    result = subprocess.run(command, cwd=cwd or os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{result.stderr.strip()}")
+    return parse_importtime(result.stderr)
+
+
+def by_dependency(records: list) -> dict:
+    """
+    按顶层包汇总模块自身耗时（微秒），例如 numpy.* 的耗时都计入 'numpy'。
+    各顶层包的自身耗时之和等于总导入时间，不会因为包之间的互相导入而重复计算。
+    """
+    totals = {}
+    for record in records:
+        package = record.module.split('.')[0]
+        totals[package] = totals.get(package, 0) + record.self_us
+    return totals
+
+
+def report(module: str, records: list, top: int = 15) -> str:
+    """生成一个模块的导入时间报告：总时间、耗时最多的依赖、启动时已加载的重量级依赖。"""
+    total_us = sum(record.self_us for record in records)
+    totals = sorted(by_dependency(records).items(), key=lambda kv: kv[1], reverse=True)
+    lines = [f"{module}: 导入 {len(records)} 个模块, 共 {total_us / 1000:.1f} ms"]
+    for package, self_us in totals[:top]:
+        lines.append(f"  {package:<28}{self_us / 1000:>10.1f} ms{100.0 * self_us / max(total_us, 1):>7.1f}%")
+    loaded = [dep for dep in HEAVY_DEPENDENCIES if dep in dict(totals)]
+    lines.append(f"  已加载的重量级依赖: {', '.join(loaded) if loaded else '无'}")
+    return '\n'.join(lines)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="按依赖统计模块的导入时间（基于 python -X importtime）。")
+    parser.add_argument("modules", nargs='*', default=['ExtractorFactory', 'BatchExtractor', 'ui'],
+                        help="要导入的模块 (默认: ExtractorFactory BatchExtractor ui)。")
+    parser.add_argument("--top", type=int, default=15, help="显示耗时最多的依赖数 (默认: 15)。")
+    parser.add_argument("--repeat", type=int, default=3, help="每个模块导入的次数，取总时间最短的一次 (默认: 3)。")
+    parser.add_argument("--fail-on-heavy", action="store_true",
+                        help="任一模块在导入时加载了重量级依赖则以非零状态退出（可用于检查启动路径）。")
+    args = parser.parse_args()
+
+    heavy_loaded = False
+    for module in args.modules:
+        runs = [profile_import(module) for _ in range(max(1, args.repeat))]
+        records = min(runs, key=lambda run: sum(record.self_us for record in run))
+        print(report(module, records, args.top))
+        loaded_modules = {record.module.split('.')[0] for record in records}
+        heavy_loaded = heavy_loaded or any(dep in loaded_modules for dep in HEAVY_DEPENDENCIES)
+    if args.fail_on_heavy and heavy_loaded:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+class OcrCache:
+    """
+    基于内容寻址的持久化OCR结果缓存。
+
+    键为预处理后单元格图像的哈希值加上OCR语言和模型设置，值为识别出的单元格文本。
+    报关单中大量单元格内容重复（单位代码、"USD"、优惠代码、税率等），
+    在页面之间、文档之间以及同一文件重复运行时都可以直接命中缓存。
+
+    数据保存在 SQLite 数据库中（WAL模式），多个工作进程可以各自打开同一个缓存文件并发读写。
+    缓存总大小超过 max_bytes 时按最近访问时间淘汰（LRU）。
+    总大小保存在 totals 表中，由触发器随每次插入、删除和大小变化增减（对所有进程的写入都成立），
+    写入时只需读取这一行，不必扫描整个表。
+    """
+    DB_FILENAME = "ocr_cache.sqlite3"
+
+    def __init__(self, cache_dir: str, max_bytes: int = 256 * 1024 * 1024):
+        """
+        :param cache_dir: 缓存目录，不存在时自动创建。
+        :param max_bytes: 缓存文本的总字节数上限。
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.db_path = os.path.join(cache_dir, self.DB_FILENAME)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)")
+        self._conn.commit()
+        # 在同一个写事务中建立总大小和触发器，已有的缓存文件只在此时统计一次总大小
+        self._conn.executescript(
+            "BEGIN IMMEDIATE;"
+            "CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL);"
+            "INSERT OR IGNORE INTO totals (id, size) SELECT 0, COALESCE(SUM(size), 0) FROM entries;"
+            "CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries "
+            "BEGIN UPDATE totals SET size = size + NEW.size WHERE id = 0; END;"
+            "CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries "
+            "BEGIN UPDATE totals SET size = size - OLD.size WHERE id = 0; END;"
+            "CREATE TRIGGER IF NOT EXISTS entries_resize AFTER UPDATE OF size ON entries "
+            "BEGIN UPDATE totals SET size = size + NEW.size - OLD.size WHERE id = 0; END;"
+            "COMMIT;"
+        )
+
+    @staticmethod
+    def make_key(image, settings: str) -> str:
+        """
+        根据预处理后的图像数组和OCR设置计算缓存键。
+        :param image: 单元格图像（numpy数组）。
+        :param settings: 影响识别结果的设置，例如语言、OCR模式和模型版本。
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(settings.encode('utf-8'))
+        digest.update(f"|{image.shape}|{image.dtype}|".encode('ascii'))
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def get_many(self, keys) -> dict:
+        """批量查询，返回 {key: text}，同时刷新命中条目的访问时间。"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        found = {}
+        with self._lock:
+            # SQLite 单条语句的参数个数有限，分块查询
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, text FROM entries WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE entries SET last_access = ? WHERE key = ?", [(now, key) for key in found]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str):
+        """查询单个键，未命中时返回None。"""
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: dict):
+        """批量写入 {key: text}，写入后按需执行LRU淘汰。"""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            # 用 UPSERT 而不是 INSERT OR REPLACE：REPLACE 删除旧行时不会触发删除触发器，总大小会偏大
+            self._conn.executemany(
+                "INSERT INTO entries (key, text, size, last_access) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET text = excluded.text, size = excluded.size, last_access = excluded.last_access",
+                [(key, text, len(key) + len(text.encode('utf-8')), now) for key, text in items.items()]
+            )
+            self._conn.commit()
+            self._evict()
+
+    def put(self, key: str, text: str):
+        """写入单个条目。"""
+        self.put_many({key: text})
+
+    def _evict(self):
+        """总大小超过上限时，从最久未访问的条目开始删除，直到降到上限的90%。"""
+        total_size = self._total_size()
+        if total_size <= self.max_bytes:
+            return
+        to_free = total_size - int(self.max_bytes * 0.9)
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            victims.append((key,))
+            to_free -= size
+            if to_free <= 0:
+                break
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        self._conn.commit()
+
+    def _total_size(self) -> int:
+        """返回由触发器维护的缓存总大小（只读取一行）。"""
+        return self._conn.execute("SELECT size FROM totals WHERE id = 0").fetchone()[0]
+
+    def stats(self) -> dict:
+        """返回缓存统计：条目数、总大小以及本实例的命中/未命中次数。"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return {
+                'entries': entries,
+                'bytes': self._total_size(),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def clear(self):
+        """清空缓存。"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def close(self):
+        """关闭数据库连接。"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="查看或清空OCR结果缓存。")
+    parser.add_argument("cache_dir", help="缓存目录。")
+    parser.add_argument("--clear", action="store_true", help="清空缓存。")
+    args = parser.parse_args()
+
+    cache = OcrCache(args.cache_dir)
+    if args.clear:
+        cache.clear()
+    stats = cache.stats()
+    print(f"条目数: {stats['entries']}, 大小: {stats['bytes']} / {stats['max_bytes']} 字节")
+    cache.close()
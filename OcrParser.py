@@ -1,44 +1,311 @@
-import pdfplumber
 import os
 import re
 import json
-from PIL import Image
 import numpy as np
-from PIL import Image as PILImage
-from paddleocr import PaddleOCR
 import logging
 import multiprocessing
-from tqdm import tqdm
-import cv2
-from CustomsFormCorrector import CustomsFormCorrector
+import threading
+import queue
+import time
+import importlib
+from collections import namedtuple
+from contextlib import contextmanager
+from importlib import metadata
+from OcrCache import OcrCache
+from PageLayout import TemplateGridCache
+from PdfBackend import PDF_BACKENDS, open_pdf_backend
+from RunMetrics import StageTimer
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logging.disable(logging.DEBUG)  # 关闭DEBUG日志的打印
 logging.disable(logging.WARNING)  # 关闭WARNING日志的打印
-# 为每个工作进程设置的全局OCR实例
+# 为每个工作进程设置的全局OCR实例，按语言缓存（每个进程每种语言一个热模型）
 # 这是必要的，因为实例(self)本身不能被传递给子进程
-_process_ocr_instance = None
-_process_ocr_lang = None
+_process_ocr_instances = {}
+# 每个工作进程各自打开的OCR结果缓存，按 (缓存目录, 容量上限) 区分
+_process_ocr_caches = {}
+
+# 页面渲染分辨率 (dpi)
+PAGE_RESOLUTION = 300
+
+# 发送给工作进程的页面引用：工作进程根据它自行渲染页面，
+# 避免在进程间序列化整页图像（300dpi的A4页面约25MB）。
+# origin 为页面裁剪框左上角在单元格坐标系中的位置，用于换算 PyMuPDF 的裁剪区域；
+# backend 为父进程查找表格时使用的PDF后端，工作进程用同一后端渲染页面，保证坐标一致
+PageRef = namedtuple('PageRef', ['pdf_path', 'page_num', 'resolution', 'origin', 'backend'], defaults=((0, 0), 'pdfplumber'))
+
+# 空白单元格预过滤：去掉表格线后墨迹像素不超过此值的单元格视为空白，不进行OCR（负数表示关闭）
+BLANK_CELL_MAX_INK = 8
+
+# OCR结果缓存的默认容量上限
+OCR_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# 批量识别时每批送入识别器的文本行数量
+OCR_REC_BATCH_SIZE = 16
+# 仅识别模式: 投影切分出的行数超过该值时回退到文本检测（例如描述块）
+REC_ONLY_MAX_LINES = 2
+# 仅识别模式: 小于该像素数的空白间隔不切分（300dpi下约1pt）
+REC_ONLY_MIN_LINE_GAP = 4
+# 仅识别模式: 裁剪文本行时在四周保留的像素
+REC_ONLY_LINE_PADDING = 4
+
+# 文本层不可信的标志: 私用区(PUA)字形、控制字符(如\x15)、Latin-1乱码、替换字符和未映射的(cid:x)
+_UNTRUSTED_TEXT_PATTERN = re.compile(r'[\ue000-\uf8ff\x00-\x08\x0b-\x1f\x7f-\x9f\u00c0-\u00ff\ufffd]|\(cid:\d+\)')
 
 class OcrParser:
-    def __init__(self, lang='en', use_corrector=False):
+    def __init__(self, lang='en', use_corrector=False, ocr_pool=None, ocr_mode='cell', max_rec_lines=REC_ONLY_MAX_LINES, text_layer_first=False,
+                 pipeline=True, prefetch_pages=2, raster_mode='page', ocr_cells=None, cache_dir=None, cache_max_bytes=OCR_CACHE_MAX_BYTES,
+                 grid_cache=None, grid_key='default', pdf_backend='pdfplumber',
+                 single_channel=False, blank_max_ink=BLANK_CELL_MAX_INK, resolution=PAGE_RESOLUTION, ocr_engine=None):
         self.lang = lang
         self.use_corrector = use_corrector
+        # OCR模式: 'cell' 逐个单元格检测+识别; 'batch' 逐单元格检测后整页批量识别;
+        # 'rec_only' 用投影切分单行/双行单元格直接识别，只对多行单元格运行检测，识别同样整页批量进行
+        self.ocr_mode = ocr_mode
+        self.max_rec_lines = max_rec_lines  # 仅识别模式下不经检测直接识别的最大行数
+        # 为True时优先使用PDF文本层，只对文本层不可信的单元格进行OCR
+        self.text_layer_first = text_layer_first
+        # 为True时页面准备与OCR流水线并行；prefetch_pages 为已准备好、等待提交的页面队列上限
+        self.pipeline = pipeline
+        self.prefetch_pages = prefetch_pages
+        # 单元格图像来源: 'page' 渲染整页后切片; 'clip' 用 PyMuPDF 只渲染需要OCR的单元格区域
+        self.raster_mode = raster_mode
+        # 模板会读取OCR结果的单元格 {(组内行号, 列号)}，其余单元格不渲染也不识别；None表示全部识别
+        self.ocr_cells = frozenset(ocr_cells) if ocr_cells is not None else None
+        # 持久化OCR结果缓存目录，为None时不使用缓存
+        self.cache_dir = os.path.abspath(cache_dir) if cache_dir else None
+        self.cache_max_bytes = cache_max_bytes
+        # 可选的 TemplateGridCache：按模板复用已学习的表格网格，校验通过的页面不再调用 find_tables()
+        self.grid_cache = grid_cache
+        self.grid_key = grid_key
+        # PDF后端: 'pdfplumber' 或 'pymupdf'（一个库完成表格查找、文本层和渲染）
+        if pdf_backend not in PDF_BACKENDS:
+            raise ValueError(f"未知的PDF后端: {pdf_backend}")
+        self.pdf_backend = pdf_backend
+        # 为True时逐单元格模式向OCR引擎传入单通道灰度图（PaddleOCR 的 ocr() 支持单通道输入）
+        self.single_channel = single_channel
+        # 空白单元格预过滤阈值：文字墨迹像素不超过此值的单元格不进行OCR，负数表示关闭
+        self.blank_max_ink = blank_max_ink
+        # 工作进程渲染页面的dpi
+        self.resolution = resolution
+        # OCR引擎类，格式为 '模块:类'，在工作进程中导入并以 lang 参数实例化；None表示PaddleOCR。
+        # 用于替换为确定性的桩引擎，单独测量表格解析和版面处理的耗时
+        self.ocr_engine = ocr_engine
+        self.ocr_pool = ocr_pool  # 可选的共享 OcrWorkerPool，为None时每次调用临时创建进程池
         self.logger = logging.getLogger("OcrParser")
         self.progress_queue = None  # 用于向UI报告进度的队列
+        self.last_run_stats = {}  # 最近一次 extract_group_text 的运行统计
+        self.stage_timer = StageTimer()  # 父进程中页面准备各阶段的耗时
 
     @staticmethod
-    def _initialize_worker(lang: str):
+    def _initialize_worker(langs, ocr_engine=None):
         """
         为每个工作进程初始化OCR模型。
         这是一个静态方法，以便可以安全地传递给Pool的initializer。
+        langs 可以是单个语言字符串，也可以是需要预热的语言列表。
+        """
+        if isinstance(langs, str):
+            langs = (langs,)
+        for lang in langs:
+            OcrParser._get_ocr_instance(lang, ocr_engine)
+
+    @staticmethod
+    def _get_ocr_instance(lang: str, ocr_engine: str = None):
+        """
+        返回当前进程中指定语言（和引擎）的OCR实例，必要时进行初始化。
+        返回 (实例, 是否为本次新初始化)。
+        """
+        instance_key = lang if ocr_engine is None else (ocr_engine, lang)
+        instance = _process_ocr_instances.get(instance_key)
+        if instance is not None:
+            return instance, False
+        logging.info(f"进程 {os.getpid()}: 初始化语言为 '{lang}' 的OCR模型...")
+        if ocr_engine is None:
+            # paddleocr 只在工作进程第一次初始化模型时导入，主进程和界面启动时不加载
+            from paddleocr import PaddleOCR
+            instance = PaddleOCR(use_angle_cls=False, lang=lang, use_gpu=False, use_tensorrt=False, show_log=False, rec_batch_num=OCR_REC_BATCH_SIZE)
+        else:
+            module_name, _, class_name = ocr_engine.partition(':')
+            instance = getattr(importlib.import_module(module_name), class_name)(lang=lang)
+        _process_ocr_instances[instance_key] = instance
+        logging.info(f"进程 {os.getpid()}: OCR模型初始化完成。")
+        return instance, True
+
+    @staticmethod
+    def _is_text_layer_trusted(text) -> bool:
+        """
+        单元格的文本层策略选择: 文本层干净时直接使用，否则需要OCR。
+        空文本也视为不可信（可能是扫描件或文字被转成了图形）。
+        """
+        if not isinstance(text, str) or not text.strip():
+            return False
+        return _UNTRUSTED_TEXT_PATTERN.search(text) is None
+
+    @staticmethod
+    def _binarize(img_np_rgb, color_threshold, single_channel=False):
+        """
+        图像预处理：将非黑色像素替换为白色。可以处理整页，也可以处理单个单元格或裁剪区域。
+        返回 (处理后的图像, 墨迹掩码)，墨迹掩码中True表示足够黑的文本像素。
+        single_channel 为False时处理后的图像为OpenCV的BGR格式，为True时为单通道灰度图。
+        """
+        import cv2
+        # 灰度图用于创建阈值掩码（RGB直接转灰度，与先转BGR再转灰度的结果相同）
+        gray_img = cv2.cvtColor(img_np_rgb, cv2.COLOR_RGB2GRAY)
+
+        # 不够黑的像素 (亮度大于等于阈值) 在掩码中为255，这些是我们想要变成白色的区域
+        _, light_pixels_mask = cv2.threshold(gray_img, float(np.ceil(color_threshold)) - 1, 255, cv2.THRESH_BINARY)
+
+        # 取逐像素最大值把这些像素设置为白色，其余像素保持原值
+        if single_channel:
+            processed_img = cv2.max(gray_img, light_pixels_mask)
+        else:
+            # 颜色空间转换：从Pillow的RGB格式转换为OpenCV的BGR格式
+            processed_img = cv2.max(cv2.cvtColor(img_np_rgb, cv2.COLOR_RGB2BGR),
+                                    cv2.cvtColor(light_pixels_mask, cv2.COLOR_GRAY2BGR))
+        return processed_img, light_pixels_mask == 0
+
+    @staticmethod
+    def _ocr_cell(ocr_instance, processed_img):
+        """对单个单元格执行完整的检测+识别，返回按行拼接的文本。"""
+        result = ocr_instance.ocr(processed_img, cls=True)
+        cell_text = ""
+        if result and len(result) > 0 and result[0]:
+            texts = [line[1][0] for line in result[0] if line and line[1] and line[1][0].strip()]
+            cell_text = "\n".join(texts)
+        return cell_text
+
+    @staticmethod
+    def _sort_text_boxes(dt_boxes):
+        """
+        将检测框按从上到下、从左到右排序。
+        与PaddleOCR的 sorted_boxes 规则一致：纵坐标相差不足10像素的框视为同一行。
+        """
+        boxes = sorted(dt_boxes, key=lambda box: (box[0][1], box[0][0]))
+        for i in range(len(boxes) - 1):
+            for j in range(i, -1, -1):
+                if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                    boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+                else:
+                    break
+        return boxes
+
+    @staticmethod
+    def _detect_text_lines(ocr_instance, processed_img):
+        """
+        只运行文本检测，返回单元格内按阅读顺序排列的文本行图像。
+        表格单元格内的文字都是水平的，因此直接按检测框的外接矩形裁剪，
+        不再做透视变换。
+        """
+        dt_boxes, _ = ocr_instance.text_detector(processed_img)
+        if dt_boxes is None or len(dt_boxes) == 0:
+            return []
+        height, width = processed_img.shape[:2]
+        line_images = []
+        for box in OcrParser._sort_text_boxes(dt_boxes):
+            xs = [point[0] for point in box]
+            ys = [point[1] for point in box]
+            x0, x1 = max(0, int(min(xs))), min(width, int(round(max(xs))))
+            y0, y1 = max(0, int(min(ys))), min(height, int(round(max(ys))))
+            line_img = processed_img[y0:y1, x0:x1]
+            if line_img.size == 0:
+                continue
+            # 与PaddleOCR一致：明显竖排的文本框旋转后再识别
+            if line_img.shape[0] / line_img.shape[1] >= 1.5:
+                line_img = np.rot90(line_img)
+            line_images.append(line_img)
+        return line_images
+
+    @staticmethod
+    def _count_text_ink(ink_mask):
+        """
+        统计单元格内的文字墨迹像素数，几乎横贯/纵贯整个单元格的表格线不计入。
+        只做按行、按列的计数，开销远小于一次OCR调用。
+        """
+        height, width = ink_mask.shape
+        if height == 0 or width == 0:
+            return 0
+        row_ink = np.count_nonzero(ink_mask, axis=1)
+        col_ink = np.count_nonzero(ink_mask, axis=0)
+        text_rows = row_ink <= width * 0.9
+        line_cols = col_ink > height * 0.9
+        text_ink = int(row_ink[text_rows].sum())
+        if line_cols.any():
+            text_ink -= int(np.count_nonzero(ink_mask[text_rows][:, line_cols]))
+        return text_ink
+
+    @staticmethod
+    def _split_text_lines(ink_mask, min_gap=REC_ONLY_MIN_LINE_GAP, padding=REC_ONLY_LINE_PADDING):
+        """
+        用水平投影把单元格切分成文本行，不调用检测模型。
+        返回每一行的 (y0, y1, x0, x1) 像素范围，空白单元格返回空列表。
+        """
+        height, width = ink_mask.shape
+        # 单元格边缘可能带有表格线，几乎横贯/纵贯整个单元格的行和列不算作文字
+        row_ink = ink_mask.sum(axis=1)
+        col_ink = ink_mask.sum(axis=0)
+        text_mask = ink_mask.copy()
+        text_mask[row_ink > width * 0.9, :] = False
+        text_mask[:, col_ink > height * 0.9] = False
+
+        ink_rows = np.flatnonzero(text_mask.any(axis=1))
+        if ink_rows.size == 0:
+            return []
+
+        # 相邻墨迹行之间的空白少于 min_gap 时视为同一行（例如泰文的上下标符号）
+        breaks = np.flatnonzero(np.diff(ink_rows) > min_gap)
+        starts = np.concatenate(([ink_rows[0]], ink_rows[breaks + 1]))
+        ends = np.concatenate((ink_rows[breaks], [ink_rows[-1]]))
+
+        lines = []
+        for y_start, y_end in zip(starts, ends):
+            ink_cols = np.flatnonzero(text_mask[y_start:y_end + 1].any(axis=0))
+            y0 = max(0, int(y_start) - padding)
+            y1 = min(height, int(y_end) + 1 + padding)
+            x0 = max(0, int(ink_cols[0]) - padding)
+            x1 = min(width, int(ink_cols[-1]) + 1 + padding)
+            lines.append((y0, y1, x0, x1))
+        return lines
+
+    @staticmethod
+    def _recognize_batched(ocr_instance, line_images, batch_size):
         """
-        global _process_ocr_instance, _process_ocr_lang
-        if _process_ocr_instance is None or _process_ocr_lang != lang:
-            logging.info(f"进程 {os.getpid()}: 初始化语言为 '{lang}' 的OCR模型...")
-            _process_ocr_instance = PaddleOCR(use_angle_cls=False, lang=lang, use_gpu=False, use_tensorrt=False, show_log=False)
-            _process_ocr_lang = lang
-            logging.info(f"进程 {os.getpid()}: OCR模型初始化完成。")
+        按宽高比分桶批量识别文本行图像，返回与输入顺序一致的 (文本, 置信度) 列表。
+        宽高比相近的图像放在同一批中，可以减少识别器内部的填充开销。
+        """
+        results = [('', 0.0)] * len(line_images)
+        order = sorted(range(len(line_images)), key=lambda i: line_images[i].shape[1] / float(line_images[i].shape[0]))
+        for start in range(0, len(order), batch_size):
+            batch_indices = order[start:start + batch_size]
+            rec_res, _ = ocr_instance.text_recognizer([line_images[i] for i in batch_indices])
+            for i, res in zip(batch_indices, rec_res):
+                results[i] = res
+        return results
+
+    @staticmethod
+    def _get_ocr_cache(options: dict):
+        """返回当前进程中的OCR结果缓存；未配置缓存目录时返回None。"""
+        cache_dir = options.get('cache_dir')
+        if not cache_dir:
+            return None
+        cache_id = (cache_dir, options.get('cache_max_bytes'))
+        cache = _process_ocr_caches.get(cache_id)
+        if cache is None:
+            cache = OcrCache(cache_dir, max_bytes=options.get('cache_max_bytes') or OCR_CACHE_MAX_BYTES)
+            _process_ocr_caches[cache_id] = cache
+        return cache
+
+    @staticmethod
+    def _ocr_cache_settings(options: dict) -> str:
+        """影响识别结果的设置，作为缓存键的一部分：语言、OCR模式和模型版本。"""
+        if options.get('ocr_engine'):
+            engine = f"engine={options['ocr_engine']}"
+        else:
+            try:
+                engine = f"paddleocr={metadata.version('paddleocr')}"
+            except metadata.PackageNotFoundError:
+                engine = 'paddleocr=unknown'
+        return (f"{engine}|lang={options['lang']}|mode={options.get('ocr_mode', 'cell')}"
+                f"|max_rec_lines={options.get('max_rec_lines', REC_ONLY_MAX_LINES)}")
 
     @staticmethod
     def _process_page_groups_worker(page_data: tuple):
@@ -46,63 +313,70 @@ class OcrParser:
         在工作进程中处理单个页面的所有组。
         这是一个静态方法，以便可以安全地被 pool.imap 调用。
         """
-        page_num, img_original, img_scale, cell_coords, groups, original_groups, color_threshold = page_data
+        page_num, page_ref, cell_coords, groups, original_groups, cell_texts, options = page_data
+        color_threshold = options['color_threshold']
+        ocr_mode = options.get('ocr_mode', 'cell')
+        # PaddleOCR 的 ocr() 会自行把单通道图像转换为三通道；批量/仅识别模式直接调用检测器和识别器，需要BGR图像
+        single_channel = options.get('single_channel', False) and ocr_mode == 'cell'
+        blank_max_ink = options.get('blank_max_ink', BLANK_CELL_MAX_INK)
         
         logger = logging.getLogger(f"Worker-Page-{page_num+1}")
         logger.info(f"开始在进程 {os.getpid()} 中处理页面 {page_num + 1}...")
+        worker_start = time.perf_counter()
+        worker_cpu_start = time.process_time()
 
-        img_data = np.array(img_original)
+        ocr_cells = options.get('ocr_cells')
+        page_stats = {'pid': os.getpid(), 'model_inits': 0, 'cells_rec_only': 0, 'cells_detected': 0,
+                      'cells_ocr': 0, 'cells_preprocessed': 0, 'cells_text_layer': 0, 'cells_unread': 0, 'cache_hits': 0, 'cache_misses': 0,
+                      'cells_blank': 0, 'preprocess_seconds': 0.0, 'preprocess_cpu_seconds': 0.0}
+        # 整页的单元格都可以使用文本层时任务中没有页面引用，既不渲染页面也不需要OCR模型
+        rasterizer = None
+        if page_ref is not None:
+            rasterizer = _CellRasterizer(page_ref, options.get('raster_mode', 'page'))
         page_groups = []
+        # 需要OCR的单元格: [((group_idx, row_idx, col_idx), 预处理后的图像, 墨迹掩码), ...]
+        pending_cells = []
 
         for group_idx, (start_row, end_row) in enumerate(groups):
             group_cells = cell_coords[start_row:end_row+1]
             group_text_rows = []
 
-            for row_cells in group_cells:
+            for row_idx, row_cells in enumerate(group_cells):
                 row_texts = []
-                for cell in row_cells:
+                for col_idx, cell in enumerate(row_cells):
                     if cell:
-                        x0, y0, x1, y1 = cell
-                        x0_img, y0_img = int(x0 * img_scale), int(y0 * img_scale)
-                        x1_img, y1_img = int(x1 * img_scale), int(y1 * img_scale)
-                        
-                        cell_img_np_rgb = img_data[y0_img:y1_img, x0_img:x1_img]
-                        
-                        if cell_img_np_rgb.size > 0:
-                            try:
-                                # 颜色空间转换：从Pillow的RGB格式转换为OpenCV的BGR格式
-                                cell_img_np = cv2.cvtColor(cell_img_np_rgb, cv2.COLOR_RGB2BGR)
-
-                                # --- 图像预处理：将非黑色像素替换为白色 ---
-                                # 创建一个图像的副本进行处理
-                                processed_img = cell_img_np.copy()
-                                
-                                # 将BGR图像转换为灰度图以创建阈值掩码
-                                gray_img = cv2.cvtColor(cell_img_np, cv2.COLOR_BGR2GRAY)
-                                
-                                # 找到所有不够黑的像素点 (亮度大于等于阈值)
-                                # 这些是我们想要变成白色的区域
-                                light_pixels_mask = gray_img >= color_threshold
-                                
-                                # 将这些不够黑的像素在原彩色图副本中设置为白色
-                                processed_img[light_pixels_mask] = [255, 255, 255]
-
-                                # 使用处理后的BGR图像进行OCR识别
-                                result = _process_ocr_instance.ocr(processed_img, cls=True)
-
-                                # cv2.imshow("processed_img", processed_img)
-                                # cv2.waitKey(0)
-                                
-                                cell_text = ""
-                                if result and len(result) > 0 and result[0]:
-                                    texts = [line[1][0] for line in result[0] if line and line[1] and line[1][0].strip()]
-                                    cell_text = "\n".join(texts)
-                                row_texts.append(cell_text)
-                            except Exception as e:
-                                logger.error(f"处理单元格时出错: {e}")
-                                row_texts.append('')
-                        else:
+                        if ocr_cells is not None and (row_idx, len(row_texts)) not in ocr_cells:
+                            # 模板不会读取该单元格的OCR结果，跳过渲染和识别
+                            page_stats['cells_unread'] += 1
                             row_texts.append('')
+                            continue
+                        if cell_texts is not None:
+                            text_layer = cell_texts[group_idx][row_idx][col_idx]
+                            if OcrParser._is_text_layer_trusted(text_layer):
+                                page_stats['cells_text_layer'] += 1
+                                row_texts.append(text_layer)
+                                continue
+                        # 需要OCR结果的单元格先渲染和预处理；只有通过空白过滤且未命中缓存的才计入 cells_ocr
+                        page_stats['cells_preprocessed'] += 1
+
+                        cell_key = (group_idx, row_idx, len(row_texts))
+                        row_texts.append('')
+
+                        try:
+                            preprocess_start = time.perf_counter()
+                            preprocess_cpu_start = time.process_time()
+                            processed_img, ink_mask = rasterizer.crop_binarized(cell, color_threshold, single_channel)
+                            page_stats['preprocess_seconds'] += time.perf_counter() - preprocess_start
+                            page_stats['preprocess_cpu_seconds'] += time.process_time() - preprocess_cpu_start
+                            if processed_img.size == 0:
+                                continue
+                            if OcrParser._count_text_ink(ink_mask) <= blank_max_ink:
+                                # 几乎没有墨迹的空白单元格直接返回空字符串，不查缓存也不识别
+                                page_stats['cells_blank'] += 1
+                                continue
+                            pending_cells.append((cell_key, processed_img, ink_mask))
+                        except Exception as e:
+                            logger.error(f"处理单元格时出错: {e}")
                     # else:
                     #     row_texts.append('')
                 group_text_rows.append(row_texts)
@@ -112,8 +386,508 @@ class OcrParser:
                 'rows': group_text_rows,
                 'original_rows': original_groups[group_idx]
             })
-            
-        return page_num, page_groups
+        if rasterizer is not None:
+            rasterizer.close()
+            # 按需渲染发生在第一次裁剪单元格时，从预处理耗时中分出渲染耗时
+            page_stats['rasterize_seconds'] = rasterizer.render_seconds
+            page_stats['rasterize_cpu_seconds'] = rasterizer.render_cpu_seconds
+            page_stats['preprocess_seconds'] -= rasterizer.render_seconds
+            page_stats['preprocess_cpu_seconds'] -= rasterizer.render_cpu_seconds
+
+        # 先查询持久化缓存，命中的单元格不再识别
+        cell_results = {}
+        cache = OcrParser._get_ocr_cache(options) if pending_cells else None
+        cache_keys = {}
+        if cache is not None:
+            settings = OcrParser._ocr_cache_settings(options)
+            cache_keys = {cell_key: OcrCache.make_key(processed_img, settings) for cell_key, processed_img, _ in pending_cells}
+            try:
+                cached_texts = cache.get_many(cache_keys.values())
+            except Exception as e:
+                logger.error(f"读取OCR缓存时出错: {e}")
+                cached_texts = {}
+            for cell_key, _, _ in pending_cells:
+                if cache_keys[cell_key] in cached_texts:
+                    cell_results[cell_key] = cached_texts[cache_keys[cell_key]]
+            page_stats['cache_hits'] = len(cell_results)
+            page_stats['cache_misses'] = len(pending_cells) - len(cell_results)
+            pending_cells = [pending for pending in pending_cells if pending[0] not in cell_results]
+
+        # 真正送入OCR引擎的单元格数（空白单元格和缓存命中不计入）
+        page_stats['cells_ocr'] = len(pending_cells)
+        ocr_instance = None
+        if pending_cells:
+            # 进程池常驻时模型已经是热的，只有遇到新语言时才会在这里初始化
+            init_start = time.perf_counter()
+            init_cpu_start = time.process_time()
+            ocr_instance, model_initialized = OcrParser._get_ocr_instance(options['lang'], options.get('ocr_engine'))
+            page_stats['model_inits'] = int(model_initialized)
+            page_stats['model_init_seconds'] = time.perf_counter() - init_start
+            page_stats['model_init_cpu_seconds'] = time.process_time() - init_cpu_start
+
+        ocr_start = time.perf_counter()
+        ocr_cpu_start = time.process_time()
+
+        # 批量模式下收集整页的文本行，最后统一识别：[(group_idx, row_idx, col_idx), ...] 与文本行图像一一对应
+        line_keys = []
+        line_images = []
+        # 识别过程中没有出错的单元格，只有这些结果会写入持久化缓存
+        completed_cells = set()
+        for cell_key, processed_img, ink_mask in pending_cells:
+            cell_results[cell_key] = ''
+            try:
+                if ocr_mode == 'rec_only':
+                    text_lines = OcrParser._split_text_lines(ink_mask)
+                    if len(text_lines) <= options.get('max_rec_lines', REC_ONLY_MAX_LINES):
+                        # 单元格已经由表格结构定位好，短单元格跳过检测直接识别
+                        page_stats['cells_rec_only'] += 1
+                        for y0_line, y1_line, x0_line, x1_line in text_lines:
+                            line_keys.append(cell_key)
+                            line_images.append(processed_img[y0_line:y1_line, x0_line:x1_line])
+                        completed_cells.add(cell_key)
+                        continue
+                if ocr_mode in ('batch', 'rec_only'):
+                    page_stats['cells_detected'] += 1
+                    for line_img in OcrParser._detect_text_lines(ocr_instance, processed_img):
+                        line_keys.append(cell_key)
+                        line_images.append(line_img)
+                else:
+                    # 使用处理后的图像（BGR或单通道）进行OCR识别
+                    cell_results[cell_key] = OcrParser._ocr_cell(ocr_instance, processed_img)
+                completed_cells.add(cell_key)
+            except Exception as e:
+                logger.error(f"处理单元格时出错: {e}")
+
+        if line_images:
+            # 将整页的文本行按原顺序写回对应的 (组, 行, 列)
+            drop_score = getattr(ocr_instance, 'drop_score', 0.5)
+            cell_lines = {}
+            try:
+                rec_results = OcrParser._recognize_batched(ocr_instance, line_images, options.get('rec_batch_size', OCR_REC_BATCH_SIZE))
+            except Exception as e:
+                logger.error(f"批量识别页面时出错: {e}")
+                rec_results = []
+                # 识别失败时本页的结果都不可信，一律不写入缓存，下次运行重新识别
+                completed_cells.clear()
+            for cell_key, (text, score) in zip(line_keys, rec_results):
+                if score >= drop_score and text.strip():
+                    cell_lines.setdefault(cell_key, []).append(text)
+            for cell_key, texts in cell_lines.items():
+                cell_results[cell_key] = "\n".join(texts)
+        page_stats['text_lines'] = len(line_images)
+        page_stats['ocr_seconds'] = time.perf_counter() - ocr_start
+        page_stats['ocr_cpu_seconds'] = time.process_time() - ocr_cpu_start
+
+        for (group_idx, row_idx, col_idx), text in cell_results.items():
+            page_groups[group_idx]['rows'][row_idx][col_idx] = text
+
+        if cache is not None and completed_cells:
+            try:
+                cache.put_many({cache_keys[cell_key]: cell_results[cell_key] for cell_key in completed_cells})
+            except Exception as e:
+                logger.error(f"写入OCR缓存时出错: {e}")
+
+        # 工作进程处理这一页的总耗时，用于计算进程利用率
+        page_stats['worker_seconds'] = time.perf_counter() - worker_start
+        page_stats['worker_cpu_seconds'] = time.process_time() - worker_cpu_start
+        return page_num, page_groups, page_stats
+
+    @staticmethod
+    def _accumulate_page_stats(run_stats: dict, page_stats: dict):
+        """将单个页面的统计计数累加到本次运行的统计中。"""
+        for key, value in page_stats.items():
+            if key != 'pid':
+                run_stats[key] = run_stats.get(key, 0) + value
+
+    @staticmethod
+    def _task_needs_ocr(page_data: tuple) -> bool:
+        """页面任务是否包含需要OCR的单元格（否则可以在当前进程中直接完成）。"""
+        return page_data[1] is not None
+
+    def _iter_read_cells(self, row_idx, row_cells):
+        """
+        产出一行中模板会读取OCR结果的单元格 (col_idx, 输出列号)。
+        输出列号与工作进程结果中的列号一致（跳过None占位的单元格）。
+        """
+        out_idx = 0
+        for col_idx, cell in enumerate(row_cells):
+            if cell:
+                if self.ocr_cells is None or (row_idx, out_idx) in self.ocr_cells:
+                    yield col_idx, out_idx
+                out_idx += 1
+
+    def _iter_page_tasks(self, pdf_path, page_numbers, group_size, lang, color_threshold, state=None):
+        """
+        逐页准备OCR任务的生成器：提取表格、定位项目分组，并为需要OCR的页面生成页面引用。
+        页面图像由工作进程自行渲染，父进程不持有也不传递整页图像。
+        每准备好一页就立即产出该页的任务元组，供串行或流水线模式消费。
+
+        state (dict, optional): 用于回传准备阶段的信息，例如 'total_pages'（待处理的页数）
+                                和 'task_pages'（已产出任务的页码，按产出顺序）。
+
+        每页只调用一次 find_tables()，得到的 PageLayout 同时用于表格文本、单元格坐标和修正器。
+        """
+        timer = self.stage_timer
+        corrector = None
+        try:
+            with open_pdf_backend(self.pdf_backend, pdf_path) as document:
+                if self.use_corrector:
+                    from CustomsFormCorrector import CustomsFormCorrector
+                    # PyMuPDF 后端时修正器直接复用同一个文档
+                    corrector = CustomsFormCorrector(pdf_path, fitz_doc=getattr(document, 'doc', None))
+                page_count = document.page_count()
+                if page_numbers is None:
+                    page_numbers = range(page_count)
+                else:
+                    page_numbers = [p for p in page_numbers if 0 <= p < page_count]
+                if state is not None:
+                    state['total_pages'] = len(page_numbers)
+                if corrector is not None:
+                    # 后台进程按页序预取后面页面的"好砖"，与本线程逐页准备表格并行
+                    corrector.prefetch(list(page_numbers))
+
+                for page_num in page_numbers:
+                    self.logger.info(f"准备第 {page_num + 1} 页数据...")
+                    page = document.page(page_num)
+
+                    layout = page.layout(timer=timer, grid_cache=self.grid_cache, grid_key=self.grid_key)
+                    # 估计值而非测量值：按原流程的代码结构推算（extract_tables() 和获取坐标各调用一次 find_tables()，
+                    # 修正器再调用一次），只用于与实际调用次数对比
+                    timer.count('find_tables_estimated_baseline', 3 if self.use_corrector else 2)
+                    extracted_tables = layout.extract_tables()
+                    if self.use_corrector:
+                        with timer.stage('correct'):
+                            extracted_tables = corrector.correct(page_num, page.native, layout=layout)
+                        self.logger.info(extracted_tables)
+                    if not extracted_tables or not extracted_tables[0]:
+                        self.logger.warning(f"第 {page_num + 1} 页未找到表格。")
+                        continue
+
+                    table_text_data = extracted_tables[0]
+
+                    start_index = -1
+                    for i, row in enumerate(table_text_data):
+                        first_cell_text = row[0]
+                        if isinstance(first_cell_text, str) and (
+                            re.match(r'^\d+\n', first_cell_text) or
+                            re.search(r'ราย\s*การ', first_cell_text) # 更宽松的泰语匹配
+                        ):
+                            start_index = i
+                            break
+
+                    if start_index == -1:
+                        self.logger.warning(f"第 {page_num + 1} 页未找到报关单项目起始点。")
+                        continue
+
+                    table_layout = layout.tables[0]
+
+                    groups = []
+                    original_groups = []
+                    # 与 cell_coords 对齐的各组单元格文本层（保留None占位），仅在文本层优先模式下使用
+                    group_cell_texts = [] if self.text_layer_first else None
+                    for i in range(start_index, len(table_text_data), group_size):
+                        if i + group_size <= len(table_text_data) and table_text_data[i][0] is not None and table_text_data[i][0].strip() != '':
+                            groups.append((i, i + group_size - 1))
+                            if group_cell_texts is not None:
+                                group_cell_texts.append([list(row) for row in table_text_data[i:i+group_size]])
+                            fixed_table_text_data = []
+                            for row in table_text_data[i:i+group_size]:
+                                for cell in row:
+                                    if cell is None:
+                                        row.remove(cell)
+                                fixed_table_text_data.append(row)
+                            original_groups.append(fixed_table_text_data)
+
+                    cell_coords = table_layout.rows
+
+                    # 只有存在需要OCR的单元格时才让工作进程渲染页面
+                    needs_ocr = bool(groups)
+                    if group_cell_texts is not None:
+                        needs_ocr = any(
+                            not OcrParser._is_text_layer_trusted(row_texts[col_idx])
+                            for (start_row, end_row), texts in zip(groups, group_cell_texts)
+                            for row_idx, (row_cells, row_texts) in enumerate(zip(cell_coords[start_row:end_row+1], texts))
+                            for col_idx, out_idx in self._iter_read_cells(row_idx, row_cells)
+                        )
+                    elif self.ocr_cells is not None:
+                        needs_ocr = any(
+                            True
+                            for start_row, end_row in groups
+                            for row_idx, row_cells in enumerate(cell_coords[start_row:end_row+1])
+                            for _ in self._iter_read_cells(row_idx, row_cells)
+                        )
+                    page_ref = PageRef(os.path.abspath(pdf_path), page_num, self.resolution, page.origin, self.pdf_backend) if needs_ocr else None
+                    if state is not None:
+                        # 记录任务的页面顺序，供按页面顺序输出结果时使用
+                        state.setdefault('task_pages', []).append(page_num)
+
+                    yield (
+                        page_num,
+                        page_ref,
+                        cell_coords,
+                        groups,
+                        original_groups,
+                        group_cell_texts,
+                        {'lang': lang, 'color_threshold': color_threshold, 'ocr_mode': self.ocr_mode, 'max_rec_lines': self.max_rec_lines,
+                         'raster_mode': self.raster_mode, 'ocr_cells': self.ocr_cells,
+                         'cache_dir': self.cache_dir, 'cache_max_bytes': self.cache_max_bytes,
+                         'single_channel': self.single_channel, 'blank_max_ink': self.blank_max_ink,
+                         'ocr_engine': self.ocr_engine}
+                    )
+        finally:
+            if corrector is not None:
+                # 关闭修正器的PyMuPDF文档并停止预取进程（生成器提前结束时同样执行）
+                corrector.close()
+                timer.count('corrector_prefetch_hits', corrector.prefetch_hits)
+
+    def _run_serial(self, page_data_to_process, get_pool):
+        """
+        串行模式：所有页面准备完成后再一次性提交给进程池，按完成顺序产出结果。
+        """
+        if not page_data_to_process:
+            return
+        if not any(OcrParser._task_needs_ocr(page_data) for page_data in page_data_to_process):
+            # 所有单元格都可以直接使用文本层，无需启动OCR进程池
+            self.logger.info("所有单元格的文本层均可信，跳过OCR。")
+            for page_data in page_data_to_process:
+                yield OcrParser._process_page_groups_worker(page_data)
+            return
+
+        pool = get_pool()
+        pool.begin_run()
+        self.logger.info(f"使用 {pool.max_workers} 个进程开始OCR处理...")
+        # 使用 imap_unordered 以便在任务完成时立即获得结果，这对于进度更新更及时
+        for result in pool.imap_unordered(OcrParser._process_page_groups_worker, page_data_to_process):
+            pool.record_page_stats(result[2])
+            yield result
+
+    def _run_pipelined(self, tasks, get_pool, tagged=False):
+        """
+        流水线模式：生产者线程逐页准备任务并放入有界队列，主线程立即把任务提交给进程池，
+        同时限制进程池中未完成的任务数，按完成顺序产出结果。
+        不需要OCR的页面直接在当前进程中处理，不会为它们启动进程池。
+
+        tagged 为True时 tasks 产出 (标签, 任务)，结果同样以 (标签, 结果) 产出，
+        用于把多个文档的页面放进同一条流水线（见 BatchExtractor）。
+        此时单个页面处理出错不会中断流水线，而是以 (标签, 异常) 产出，由调用方决定如何处理该文档。
+        """
+        task_queue = queue.Queue(maxsize=self.prefetch_pages)
+        result_queue = queue.Queue()
+        stop_event = threading.Event()
+        done_marker = object()
+
+        def put_task(item):
+            # 消费者提前退出时停止生产，避免生产者线程阻塞在满队列上
+            while not stop_event.is_set():
+                try:
+                    task_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for page_data in tasks:
+                    if not put_task(page_data):
+                        break
+            except Exception as e:
+                put_task(e)
+            finally:
+                tasks.close()
+                put_task(done_marker)
+
+        producer = threading.Thread(target=produce, name="OcrPageProducer", daemon=True)
+        producer.start()
+
+        pool = None
+        in_flight = 0
+        producing = True
+        try:
+            while producing or in_flight:
+                # 先取出所有已完成的结果，尽快交给调用方
+                while in_flight:
+                    try:
+                        result, error = result_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    in_flight -= 1
+                    tag, result = result
+                    if error is not None:
+                        if not tagged:
+                            raise error
+                        yield tag, error
+                        continue
+                    pool.record_page_stats(result[2])
+                    yield (tag, result) if tagged else result
+
+                if producing and (pool is None or in_flight < pool.max_workers * 2):
+                    try:
+                        item = task_queue.get(timeout=0.05)
+                    except queue.Empty:
+                        continue
+                    if item is done_marker:
+                        producing = False
+                        continue
+                    if isinstance(item, Exception):
+                        raise item
+                    tag, page_data = item if tagged else (None, item)
+                    if not OcrParser._task_needs_ocr(page_data):
+                        try:
+                            result = OcrParser._process_page_groups_worker(page_data)
+                        except Exception as e:
+                            if not tagged:
+                                raise
+                            result = e
+                        yield (tag, result) if tagged else result
+                    else:
+                        if pool is None:
+                            pool = get_pool()
+                            pool.begin_run()
+                            self.logger.info(f"使用 {pool.max_workers} 个进程开始流水线OCR处理...")
+                        pool.apply_async(
+                            OcrParser._process_page_groups_worker, page_data,
+                            callback=lambda result, tag=tag: result_queue.put(((tag, result), None)),
+                            error_callback=lambda error, tag=tag: result_queue.put(((tag, None), error))
+                        )
+                        in_flight += 1
+                elif in_flight:
+                    # 进程池已满或任务已全部提交：阻塞等待下一个结果
+                    result, error = result_queue.get()
+                    in_flight -= 1
+                    tag, result = result
+                    if error is not None:
+                        if not tagged:
+                            raise error
+                        yield tag, error
+                        continue
+                    pool.record_page_stats(result[2])
+                    yield (tag, result) if tagged else result
+        finally:
+            stop_event.set()
+            producer.join()
+
+    def iter_group_text(self, pdf_path, page_numbers=None, group_size=4, lang='en', max_workers=None, color_threshold=10, ordered=True):
+        """
+        逐页产出OCR分组结果的生成器：进程池每返回一页就产出 (页码, 该页的分组列表)，
+        调用方不必等待整个PDF处理完成。没有分组的页面不产出。
+
+        参数与 extract_group_text 相同，另外:
+            ordered (bool, optional): 为True（默认）时按页面顺序产出（先完成的后续页面会短暂缓存），
+                                      为False时按完成顺序产出。
+
+        全部页面产出后，运行统计写入 self.last_run_stats。
+        """
+        if max_workers is None:
+            max_workers = multiprocessing.cpu_count()
+        max_workers = min(max_workers, 8)
+
+        # 优先使用共享的常驻进程池；否则在第一次需要OCR时临时创建一个，用完即关闭
+        owned_pools = []
+        run_stats = {'pages': 0, 'model_inits': 0, 'workers': 0}
+        def get_pool():
+            if self.ocr_pool is None and not owned_pools:
+                owned_pools.append(OcrWorkerPool(max_workers=max_workers, langs=(lang,), ocr_engine=self.ocr_engine))
+            pool = self.ocr_pool if self.ocr_pool is not None else owned_pools[0]
+            # 只有用到进程池时才计算进程利用率（整个文档都使用文本层时为0个进程）
+            run_stats['workers'] = pool.max_workers
+            return pool
+
+        state = {'task_pages': []}
+        pending_results = {}  # 按页面顺序输出时，等待前面页面的结果
+        next_index = 0
+        self.stage_timer = StageTimer()
+        start_time = time.perf_counter()
+        cpu_start = time.process_time()
+        tasks = self._iter_page_tasks(pdf_path, page_numbers, group_size, lang, color_threshold, state=state)
+        results_iterator = None
+        try:
+            if self.pipeline:
+                results_iterator = self._run_pipelined(tasks, get_pool)
+            else:
+                results_iterator = self._run_serial(list(tasks), get_pool)
+
+            # 手动迭代结果并更新进度条
+            for i, result in enumerate(results_iterator):
+                page_num, page_groups, page_stats = result
+                if i == 0:
+                    run_stats['first_result_seconds'] = time.perf_counter() - start_time
+                run_stats['pages'] += 1
+                self._accumulate_page_stats(run_stats, page_stats)
+
+                # 如果UI传递了进度队列，则更新进度
+                if self.progress_queue:
+                    # 计算进度百分比
+                    total_pages = max(state.get('total_pages', 0), i + 1)
+                    progress_percentage = int(((i + 1) / total_pages) * 100)
+                    self.progress_queue.put(progress_percentage)
+
+                if not ordered:
+                    if page_groups:
+                        yield page_num, page_groups
+                    continue
+                # 按页面顺序输出：结果先放入缓冲区，前面的页面都到齐后再依次产出
+                pending_results[page_num] = page_groups
+                task_pages = state['task_pages']
+                while next_index < len(task_pages) and task_pages[next_index] in pending_results:
+                    ready_groups = pending_results.pop(task_pages[next_index])
+                    next_index += 1
+                    if ready_groups:
+                        yield task_pages[next_index - 1], ready_groups
+        finally:
+            # 调用方提前停止迭代时，先结束流水线（停止生产者线程）再关闭进程池
+            if results_iterator is not None:
+                results_iterator.close()
+            tasks.close()
+            for pool in owned_pools:
+                pool.shutdown()
+        run_stats['wall_seconds'] = time.perf_counter() - start_time
+        # 父进程（包括流水线中准备页面的后台线程）的CPU时间
+        run_stats['cpu_seconds'] = time.process_time() - cpu_start
+        run_stats['stages'] = self.stage_timer.summary()
+        if run_stats['workers'] and run_stats['wall_seconds'] > 0:
+            run_stats['worker_utilization'] = run_stats.get('worker_seconds', 0.0) / (run_stats['workers'] * run_stats['wall_seconds'])
+        self.last_run_stats = run_stats
+        if run_stats['wall_seconds'] > 0:
+            self.logger.info(
+                f"运行统计: {run_stats['pages']} 页, 用时 {run_stats['wall_seconds']:.2f}s "
+                f"({run_stats['pages'] / run_stats['wall_seconds']:.2f} 页/秒), 父进程CPU {run_stats['cpu_seconds']:.2f}s; "
+                f"渲染 {run_stats.get('rasterize_seconds', 0.0):.2f}s, OCR {run_stats.get('ocr_seconds', 0.0):.2f}s（工作进程累计）, "
+                f"进程利用率 {run_stats.get('worker_utilization', 0.0):.1%}。"
+            )
+        find_tables_calls = self.stage_timer.calls('find_tables')
+        estimated_baseline_calls = self.stage_timer.counters.get('find_tables_estimated_baseline', 0)
+        if estimated_baseline_calls:
+            self.logger.info(
+                f"页面布局: find_tables 实际调用 {find_tables_calls} 次, 耗时 {self.stage_timer.seconds('find_tables'):.2f}s; "
+                f"按原流程每页调用次数估计为 {estimated_baseline_calls} 次（估计值，未实际测量）。"
+            )
+        if self.grid_cache is not None:
+            self.logger.info(
+                f"表格网格缓存: 命中 {self.stage_timer.counters.get('grid_cache_hits', 0)} 页, "
+                f"未命中 {self.stage_timer.counters.get('grid_cache_misses', 0)} 页。"
+            )
+        if run_stats.get('cells_preprocessed'):
+            self.logger.info(
+                f"单元格预处理: {run_stats['cells_preprocessed']} 个单元格, 耗时 {run_stats.get('preprocess_seconds', 0.0):.2f}s（工作进程累计）, "
+                f"其中空白单元格 {run_stats.get('cells_blank', 0)} 个跳过OCR, 实际OCR {run_stats.get('cells_ocr', 0)} 个。"
+            )
+        if self.cache_dir:
+            cache_lookups = run_stats.get('cache_hits', 0) + run_stats.get('cache_misses', 0)
+            self.logger.info(
+                f"OCR缓存: 命中 {run_stats.get('cache_hits', 0)} 次, 未命中 {run_stats.get('cache_misses', 0)} 次, "
+                f"命中率 {(run_stats.get('cache_hits', 0) / cache_lookups if cache_lookups else 0.0):.1%}。"
+            )
+        if self.text_layer_first:
+            cells_ocr = run_stats.get('cells_ocr', 0)
+            cells_text_layer = run_stats.get('cells_text_layer', 0)
+            # 分母为模板读取的全部单元格：使用文本层的 + 需要OCR结果的（包括空白和缓存命中）
+            total_cells = run_stats.get('cells_preprocessed', 0) + cells_text_layer
+            run_stats['ocr_cell_ratio'] = cells_ocr / total_cells if total_cells else 0.0
+            self.logger.info(
+                f"文本层优先: OCR单元格 {cells_ocr} 个, 直接使用文本层 {cells_text_layer} 个, "
+                f"OCR比例 {run_stats['ocr_cell_ratio']:.1%}。"
+            )
 
     def extract_group_text(self, pdf_path, output_dir=None, page_numbers=None, group_size=4, lang='en', max_workers=None, save_json=True, color_threshold=10):
         """
@@ -125,116 +899,27 @@ class OcrParser:
             page_numbers (list, optional): 要处理的页面列表（0-indexed）。默认为所有页面。
             group_size (int, optional): 每个分组的行数。默认为4。
             lang (str, optional): OCR语言。默认为 'en'。
-            max_workers (int, optional): 最大工作进程数。默认为CPU核心数。
+            max_workers (int, optional): 最大工作进程数。默认为CPU核心数。使用共享进程池时忽略此参数。
             save_json (bool, optional): 是否保存JSON结果。默认为True。
             color_threshold (int, optional): 颜色过滤阈值 (0-255)。低于此值的像素被视为文本。默认为50。
             use_corrector (bool, optional): 是否使用海关表单修正器。默认为False。
-        """
-        if max_workers is None:
-            max_workers = multiprocessing.cpu_count()
-        max_workers = min(max_workers, 8)
 
+        OcrParser.pipeline 为True（默认）时，页面准备在后台线程中进行，
+        每准备好一页就立即交给OCR进程池，准备与识别相互重叠。
+        """
         if output_dir is None:
             pdf_dir = os.path.dirname(os.path.abspath(pdf_path))
             pdf_name = os.path.splitext(os.path.basename(pdf_path))[0]
             output_dir = os.path.join(pdf_dir, f"{pdf_name}_table_groups_text")
         os.makedirs(output_dir, exist_ok=True)
 
-        if self.use_corrector:
-            corrector = CustomsFormCorrector(pdf_path)
-        page_data_to_process = []
-        with pdfplumber.open(pdf_path) as pdf:
-            if page_numbers is None:
-                page_numbers = range(len(pdf.pages))
-            else:
-                page_numbers = [p for p in page_numbers if 0 <= p < len(pdf.pages)]
-
-            for page_num in page_numbers:
-                self.logger.info(f"准备第 {page_num + 1} 页数据...")
-                page = pdf.pages[page_num]
-                
-                img = page.to_image(resolution=300)
-                
-                extracted_tables = page.extract_tables()
-                if self.use_corrector:
-                    extracted_tables = corrector.correct(page_num, page)
-                    self.logger.info(extracted_tables)
-                if not extracted_tables or not extracted_tables[0]:
-                    self.logger.warning(f"第 {page_num + 1} 页未找到表格。")
-                    continue
-                
-                table_text_data = extracted_tables[0]
-                
-                start_index = -1
-                for i, row in enumerate(table_text_data):
-                    first_cell_text = row[0]
-                    if isinstance(first_cell_text, str) and (
-                        re.match(r'^\d+\n', first_cell_text) or
-                        re.search(r'ราย\s*การ', first_cell_text) # 更宽松的泰语匹配
-                    ):
-                        start_index = i
-                        break
-                
-                if start_index == -1:
-                    self.logger.warning(f"第 {page_num + 1} 页未找到报关单项目起始点。")
-                    continue
-                
-                table_objects = page.find_tables()
-                if not table_objects:
-                    self.logger.warning(f"第 {page_num + 1} 页未找到表格坐标对象。")
-                    continue
-                table_obj = table_objects[0]
-
-                groups = []
-                original_groups = []
-                for i in range(start_index, len(table_text_data), group_size):
-                    if i + group_size <= len(table_text_data) and table_text_data[i][0] is not None and table_text_data[i][0].strip() != '':
-                        groups.append((i, i + group_size - 1))
-                        fixed_table_text_data = []
-                        for row in table_text_data[i:i+group_size]:
-                            for cell in row:
-                                if cell is None:
-                                    row.remove(cell)
-                            fixed_table_text_data.append(row)
-                        original_groups.append(fixed_table_text_data)
-                
-                cell_coords = [row.cells for row in table_obj.rows]
-                
-                page_data_to_process.append((
-                    page_num,
-                    img.original,
-                    img.scale,
-                    cell_coords,
-                    groups,
-                    original_groups,
-                    color_threshold
-                ))
-
-                # break
-
         all_pages_groups = {}
-        if page_data_to_process:
-            self.logger.info(f"使用 {max_workers} 个进程开始OCR处理...")
-            total_pages = len(page_data_to_process)
-            
-            with multiprocessing.Pool(processes=max_workers, initializer=OcrParser._initialize_worker, initargs=(lang,)) as pool:
-                # 使用 imap_unordered 以便在任务完成时立即获得结果，这对于进度更新更及时
-                results_iterator = pool.imap_unordered(OcrParser._process_page_groups_worker, page_data_to_process)
-                
-                # 手动迭代结果并更新进度条
-                for i, result in enumerate(results_iterator):
-                    page_num, page_groups = result
-                    if page_groups:
-                        # 对结果进行排序，因为imap_unordered不保证顺序
-                        all_pages_groups[page_num] = page_groups
-                    
-                    # 如果UI传递了进度队列，则更新进度
-                    if self.progress_queue:
-                        # 计算进度百分比
-                        progress_percentage = int(((i + 1) / total_pages) * 100)
-                        self.progress_queue.put(progress_percentage)
-        
-        # 注意：由于我们使用了imap_unordered，如果需要按页面顺序处理结果，
+        # 结果按完成顺序到达，按页码存放
+        for page_num, page_groups in self.iter_group_text(pdf_path, page_numbers=page_numbers, group_size=group_size, lang=lang,
+                                                          max_workers=max_workers, color_threshold=color_threshold, ordered=False):
+            all_pages_groups[page_num] = page_groups
+
+        # 注意：由于结果按完成顺序到达，如果需要按页面顺序处理结果，
         # 在这里需要对 all_pages_groups 字典按键进行排序。
         # 对于保存为JSON，字典键的顺序通常不重要。
         if save_json and all_pages_groups:
@@ -245,13 +930,200 @@ class OcrParser:
             #         json.dump(page_groups, f, ensure_ascii=False, indent=2)
             
             # 保存一个包含所有页面的总JSON文件
-            all_json_path = os.path.join(output_dir, "all_pages_groups_text.json")
-            with open(all_json_path, 'w', encoding='utf-8') as f:
-                json.dump(all_pages_groups, f, ensure_ascii=False, indent=2)
-            self.logger.info(f"所有页面的合并结果已保存到: {all_json_path}")
+            self.save_groups_json(all_pages_groups, output_dir)
             
         return all_pages_groups
 
+    def save_groups_json(self, all_pages_groups: dict, output_dir: str) -> str:
+        """把所有页面的分组结果保存为一个JSON文件，返回文件路径。"""
+        os.makedirs(output_dir, exist_ok=True)
+        all_json_path = os.path.join(output_dir, "all_pages_groups_text.json")
+        with open(all_json_path, 'w', encoding='utf-8') as f:
+            json.dump(all_pages_groups, f, ensure_ascii=False, indent=2)
+        self.logger.info(f"所有页面的合并结果已保存到: {all_json_path}")
+        return all_json_path
+
+class _CellRasterizer:
+    """
+    工作进程中的单元格图像来源，按需渲染（没有单元格需要OCR时不会渲染任何内容）。
+    'page' 模式用页面引用指定的PDF后端渲染整页后按单元格切片（pdfplumber 后端与原流程的像素完全一致）；
+    'clip' 模式用 PyMuPDF 的 get_pixmap(clip=...) 只渲染单元格所在的矩形区域。
+
+    crop_binarized() 在 'page' 模式下对整页只做一次阈值预处理，单元格直接取整页结果的切片视图，
+    不再为每个单元格复制和转换图像；'clip' 模式下每个裁剪区域预处理一次。
+    """
+    def __init__(self, page_ref: PageRef, raster_mode='page'):
+        self.page_ref = page_ref
+        self.raster_mode = raster_mode
+        self.img_data = None
+        self.img_scale = None
+        self.fitz_doc = None
+        self.fitz_page = None
+        # 整页预处理结果: (预处理参数, 处理后的整页图像, 整页墨迹掩码)
+        self._binarized = None
+        # 渲染页面（或裁剪区域）的累计耗时
+        self.render_seconds = 0.0
+        self.render_cpu_seconds = 0.0
+
+    @contextmanager
+    def _timed_render(self):
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            self.render_seconds += time.perf_counter() - start
+            self.render_cpu_seconds += time.process_time() - cpu_start
+
+    def _render_page(self):
+        """用与父进程相同的PDF后端渲染整页（pdfplumber 后端即 page.to_image()，与此前的渲染完全一致）。"""
+        with self._timed_render(), open_pdf_backend(self.page_ref.backend, self.page_ref.pdf_path) as document:
+            self.img_data, self.img_scale = document.page(self.page_ref.page_num).rasterize(self.page_ref.resolution)
+
+    def crop(self, cell):
+        """返回单元格的RGB图像数组。"""
+        x0, y0, x1, y1 = cell
+        if self.raster_mode == 'clip':
+            import fitz  # PyMuPDF
+            if self.fitz_page is None:
+                self.fitz_doc = fitz.open(self.page_ref.pdf_path)
+                self.fitz_page = self.fitz_doc[self.page_ref.page_num]
+            origin_x, origin_y = self.page_ref.origin
+            clip = fitz.Rect(x0 - origin_x, y0 - origin_y, x1 - origin_x, y1 - origin_y)
+            with self._timed_render():
+                pix = self.fitz_page.get_pixmap(clip=clip, dpi=self.page_ref.resolution, alpha=False)
+            return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+
+        if self.img_data is None:
+            self._render_page()
+        x0_img, y0_img = int(x0 * self.img_scale), int(y0 * self.img_scale)
+        x1_img, y1_img = int(x1 * self.img_scale), int(y1 * self.img_scale)
+        return self.img_data[y0_img:y1_img, x0_img:x1_img]
+
+    def crop_binarized(self, cell, color_threshold, single_channel=False):
+        """
+        返回单元格预处理后的 (图像, 墨迹掩码)，结果与对 crop(cell) 调用 OcrParser._binarize 完全相同。
+        'page' 模式下返回的是整页预处理结果的切片视图，调用方不能修改。
+        """
+        if self.raster_mode == 'clip':
+            cell_img_np_rgb = self.crop(cell)
+            if cell_img_np_rgb.size == 0:
+                return cell_img_np_rgb, np.zeros(cell_img_np_rgb.shape[:2], dtype=bool)
+            return OcrParser._binarize(cell_img_np_rgb, color_threshold, single_channel)
+
+        settings = (color_threshold, single_channel)
+        if self._binarized is None or self._binarized[0] != settings:
+            if self.img_data is None:
+                self._render_page()
+            processed_page, ink_page = OcrParser._binarize(self.img_data, color_threshold, single_channel)
+            self._binarized = (settings, processed_page, ink_page)
+        _, processed_page, ink_page = self._binarized
+        x0, y0, x1, y1 = cell
+        x0_img, y0_img = int(x0 * self.img_scale), int(y0 * self.img_scale)
+        x1_img, y1_img = int(x1 * self.img_scale), int(y1 * self.img_scale)
+        return processed_page[y0_img:y1_img, x0_img:x1_img], ink_page[y0_img:y1_img, x0_img:x1_img]
+
+    def close(self):
+        """释放页面图像和PyMuPDF文档句柄。"""
+        self.img_data = None
+        self._binarized = None
+        if self.fitz_doc is not None:
+            self.fitz_doc.close()
+            self.fitz_doc = None
+            self.fitz_page = None
+
+
+class OcrWorkerPool:
+    """
+    常驻的OCR进程池，可在多个PDF文档和多种语言之间共享。
+
+    每个工作进程为每种语言只加载一次PaddleOCR模型并一直保持（热模型），
+    因此多个文档复用同一个进程池时无需重复初始化模型。
+    进程池需要显式调用 shutdown() 关闭，也可以使用 with 语句。
+    """
+    def __init__(self, max_workers=None, langs=('en',), ocr_engine=None):
+        """
+        :param max_workers: 工作进程数。默认为CPU核心数，最多8个。
+        :param langs: 启动时需要在每个进程中预热的OCR语言列表。
+        :param ocr_engine: 预热的OCR引擎类 ('模块:类')，None表示PaddleOCR。
+        """
+        if max_workers is None:
+            max_workers = multiprocessing.cpu_count()
+        self.max_workers = min(max_workers, 8)
+        self.langs = (langs,) if isinstance(langs, str) else tuple(langs)
+        self.logger = logging.getLogger("OcrWorkerPool")
+        self._lock = threading.Lock()
+        self._pool = multiprocessing.Pool(
+            processes=self.max_workers,
+            initializer=OcrParser._initialize_worker,
+            initargs=(self.langs, ocr_engine)
+        )
+        self.runs = 0  # 已处理的文档数
+        # initializer 会在每个进程中为每种预热语言各初始化一次模型
+        self.model_inits = self.max_workers * len(self.langs)
+        self.logger.info(f"OCR进程池已启动: {self.max_workers} 个进程, 预热语言 {list(self.langs)}。")
+
+    def begin_run(self):
+        """标记开始处理一个新文档，用于统计节省的模型初始化次数。"""
+        with self._lock:
+            self.runs += 1
+
+    def record_page_stats(self, page_stats: dict):
+        """累计工作进程返回的页面统计（例如惰性初始化新语言模型的次数）。"""
+        with self._lock:
+            self.model_inits += page_stats.get('model_inits', 0)
+
+    @property
+    def saved_model_inits(self) -> int:
+        """
+        与"每个文档新建一个进程池"的旧流程相比节省的模型初始化次数。
+        旧流程中每个文档都会在每个工作进程里初始化一次模型。
+        """
+        return max(0, self.runs * self.max_workers - self.model_inits)
+
+    def stats(self) -> dict:
+        """返回进程池的运行统计。"""
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'langs': list(self.langs),
+                'runs': self.runs,
+                'model_inits': self.model_inits,
+                'saved_model_inits': self.saved_model_inits,
+            }
+
+    def apply_async(self, func, task, callback=None, error_callback=None):
+        """异步提交单个任务，完成后在结果线程中调用 callback / error_callback。"""
+        if self._pool is None:
+            raise RuntimeError("OCR进程池已关闭。")
+        return self._pool.apply_async(func, (task,), callback=callback, error_callback=error_callback)
+
+    def imap_unordered(self, func, iterable):
+        """在进程池中执行任务，并按完成顺序返回结果。"""
+        if self._pool is None:
+            raise RuntimeError("OCR进程池已关闭。")
+        return self._pool.imap_unordered(func, iterable)
+
+    def shutdown(self):
+        """关闭进程池并等待所有工作进程退出。可以重复调用。"""
+        if self._pool is None:
+            return
+        self._pool.close()
+        self._pool.join()
+        self._pool = None
+        stats = self.stats()
+        self.logger.info(
+            f"OCR进程池已关闭: 处理 {stats['runs']} 个文档, 初始化模型 {stats['model_inits']} 次, "
+            f"节省 {stats['saved_model_inits']} 次模型初始化。"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+
 def main():
     """脚本的命令行入口。"""
     # 在Windows上, 'spawn'是更安全的多进程启动方式
@@ -268,13 +1140,27 @@ def main():
     parser.add_argument("--processes", type=int, default=4, help="工作进程数 (默认: CPU核心数)。")
     parser.add_argument("--no-json", action="store_true", help="不保存JSON输出文件。")
     parser.add_argument("--color-threshold", type=int, default=10, help="颜色过滤的亮度阈值 (0-255)。数值越低，只识别越黑的文本。默认: 10。")
+    parser.add_argument("--cache-dir", help="持久化OCR结果缓存目录。默认不使用缓存。")
+    parser.add_argument("--grid-cache", help="表格网格缓存文件 (JSON)。指定后按已学习的网格快速定位表格，校验失败才调用 find_tables()。")
+    parser.add_argument("--blank-ink-threshold", type=int, default=BLANK_CELL_MAX_INK, help=f"文字墨迹像素不超过此值的单元格视为空白，跳过OCR；负数表示关闭 (默认: {BLANK_CELL_MAX_INK})。")
+    parser.add_argument("--single-channel", action="store_true", help="逐单元格模式下向OCR引擎传入单通道灰度图。")
+    parser.add_argument("--pdf-backend", choices=sorted(PDF_BACKENDS), default="pdfplumber", help="PDF后端: 'pdfplumber' 或 'pymupdf'。默认: 'pdfplumber'。")
+    parser.add_argument("--raster-mode", choices=["page", "clip"], default="page", help="单元格图像来源: 'page' 渲染整页, 'clip' 只渲染单元格区域。默认: 'page'。")
+    parser.add_argument("--no-pipeline", action="store_true", help="关闭流水线模式：先准备完所有页面再开始OCR。")
+    parser.add_argument("--text-layer-first", action="store_true", help="优先使用PDF文本层，只对文本层不可信的单元格进行OCR。")
+    parser.add_argument("--ocr-mode", choices=["cell", "batch", "rec_only"], default="cell", help="OCR模式: 'cell' 逐单元格识别, 'batch' 整页批量识别, 'rec_only' 短单元格跳过检测直接识别。默认: 'cell'。")
+    parser.add_argument("--dpi", type=int, default=PAGE_RESOLUTION, help=f"渲染页面的dpi (默认: {PAGE_RESOLUTION})。")
+    parser.add_argument("--ocr-engine", help="替换PaddleOCR的OCR引擎类，格式为 '模块:类'，例如 'stub_ocr:StubOcrEngine'。")
     args = parser.parse_args()
 
     # 将用户输入的1-based页码转换为0-based
     page_numbers = [p - 1 for p in args.pages] if args.pages else None
 
     # 初始化并运行解析器
-    ocr_parser = OcrParser(lang=args.lang)
+    ocr_parser = OcrParser(lang=args.lang, ocr_mode=args.ocr_mode, text_layer_first=args.text_layer_first, pipeline=not args.no_pipeline, raster_mode=args.raster_mode, cache_dir=args.cache_dir, pdf_backend=args.pdf_backend,
+                           single_channel=args.single_channel, blank_max_ink=args.blank_ink_threshold,
+                           resolution=args.dpi, ocr_engine=args.ocr_engine,
+                           grid_cache=TemplateGridCache(args.grid_cache) if args.grid_cache else None)
     all_pages_groups = ocr_parser.extract_group_text(
         args.pdf_path,
         output_dir=args.output,
@@ -0,0 +1,273 @@
+import csv
+import json
+import os
+
+
+class ItemSink:
+    """
+    逐条写出提取结果的输出目标。
+    文件在写入第一条记录时才创建，没有任何记录时不会留下空文件（除非显式调用 open()）。
+
+    INCREMENTAL 为True的格式（csv、ndjson）每次 flush() 后文件就是完整可读的，适合边提取边读取；
+    其余格式只是逐条追加以控制内存占用，文件在 close() 之后才完整：JSON数组要到写入结尾的 ']' 才是合法JSON，
+    xlsx 在 close() 时才保存，Parquet 要写入文件尾的元数据后才能读取。
+    """
+    INCREMENTAL = False
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._opened = False
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _write(self, item):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+    def open(self):
+        """创建输出文件并写入文件头（表头等）。重复调用无效果。"""
+        if not self._opened:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._open()
+            self._opened = True
+
+    def write(self, item):
+        """写入一条记录（ImportFields/ExportFields 对象）。"""
+        self.open()
+        self._write(item)
+        self.count += 1
+
+    def flush(self):
+        """把已写入的记录刷新到磁盘（不支持增量刷新的格式忽略此调用）。"""
+
+    def close(self):
+        """结束写入。文件从未创建时什么也不做。"""
+        if self._opened:
+            self._close()
+            self._opened = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class JsonArraySink(ItemSink):
+    """
+    以JSON数组格式逐条写出记录，文件内容与对整个列表执行
+    json.dump(items, ensure_ascii=False, indent=2) 完全相同。
+    close() 写入结尾的 ']' 之前文件不是合法的JSON，需要边提取边读取时使用 NdjsonSink。
+    """
+    def _open(self):
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._file.write('[')
+
+    def _write(self, item):
+        text = json.dumps(item.__dict__, ensure_ascii=False, indent=2)
+        self._file.write(',\n  ' if self.count else '\n  ')
+        self._file.write(text.replace('\n', '\n  '))
+
+    def flush(self):
+        if self._opened:
+            self._file.flush()
+
+    def _close(self):
+        self._file.write('\n]' if self.count else ']')
+        self._file.close()
+
+
+class NdjsonSink(ItemSink):
+    """以NDJSON格式（每行一个JSON对象）逐条写出记录，每次 flush() 后已写入的行都可以直接读取。"""
+    INCREMENTAL = True
+
+    def _open(self):
+        self._file = open(self.path, 'w', encoding='utf-8')
+
+    def _write(self, item):
+        self._file.write(json.dumps(item.__dict__, ensure_ascii=False))
+        self._file.write('\n')
+
+    def flush(self):
+        if self._opened:
+            self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class TableSink(ItemSink):
+    """
+    按固定列顺序逐行写出记录的表格输出。
+    :param headers: 表头。
+    :param row_func: 把一条记录转换为一行单元格值的函数，列顺序与表头一致。
+    """
+    def __init__(self, path: str, headers: list, row_func):
+        super().__init__(path)
+        self.headers = headers
+        self.row_func = row_func
+
+
+class CsvSink(TableSink):
+    """
+    逐行写出CSV文件。
+    使用带BOM的UTF-8编码，Excel可以直接打开并正确显示泰文和中文表头。
+    """
+    INCREMENTAL = True
+
+    def _open(self):
+        self._file = open(self.path, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.headers)
+
+    def _write(self, item):
+        self._writer.writerow(self.row_func(item))
+
+    def flush(self):
+        if self._opened:
+            self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class ExcelSink(TableSink):
+    """
+    逐行写出Excel表格。
+    使用 openpyxl 的只写模式：行在追加时直接序列化到临时文件，不在内存中保留单元格对象，
+    内存占用不随行数增长。工作簿在 close() 时才保存，flush() 不会写出任何内容。
+    """
+    def _open(self):
+        from openpyxl import Workbook
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet()
+        self._sheet.append(self.headers)
+
+    def _write(self, item):
+        self._sheet.append(self.row_func(item))
+
+    def _close(self):
+        self._workbook.save(self.path)
+
+
+def parse_number(text):
+    """把 '1,234.50'、'7%' 这类文本解析为浮点数，空值或无法解析时返回None。"""
+    if text is None:
+        return None
+    text = text.strip().replace(',', '').rstrip('%').strip()
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def partition_path(root: str, partitions: list, filename: str) -> str:
+    """
+    返回Hive风格分区目录下的文件路径，例如 root/template=TianShi/date=2025-07-10/filename。
+    :param partitions: (分区名, 值) 的列表，按顺序作为目录层级。
+    """
+    parts = [f"{key}={str(value).replace('/', '_').replace(os.sep, '_')}" for key, value in partitions]
+    return os.path.join(root, *parts, filename)
+
+
+class ParquetSink(ItemSink):
+    """
+    以Parquet列式格式写出记录，供分析任务直接按列读取。
+
+    列类型来自记录类的 NUMERIC_FIELDS 和 CODE_FIELDS：数值字段（金额、重量、数量等）保存为 float64，
+    无法解析的值为空；代码字段（HS编码、单位、国家、发票号等）保存为字典编码的字符串，空值为空；
+    其余字段保存为普通字符串。记录累积到 batch_size 条后作为一个行组写出，内存占用只取决于批次大小。
+    没有写入任何记录时不创建文件。
+    :param extra_columns: 附加到每条记录的常量列，例如 {'SOURCE_FILE': 'xxx.pdf'}，以字典编码保存。
+    """
+    def __init__(self, path: str, extra_columns: dict = None, batch_size: int = 4096):
+        super().__init__(path)
+        self.extra_columns = dict(extra_columns or {})
+        self.batch_size = batch_size
+        self._writer = None
+        self._schema = None
+        self._rows = []
+
+    def _open(self):
+        self._rows = []
+
+    def _build_schema(self, item):
+        import pyarrow as pa
+        item_class = type(item)
+        numeric_fields = set(getattr(item_class, 'NUMERIC_FIELDS', ()))
+        code_fields = set(getattr(item_class, 'CODE_FIELDS', ()))
+        code_type = pa.dictionary(pa.int32(), pa.string())
+        fields = []
+        for name in item.__dict__:
+            if name in numeric_fields:
+                fields.append(pa.field(name, pa.float64()))
+            elif name in code_fields:
+                fields.append(pa.field(name, code_type))
+            else:
+                fields.append(pa.field(name, pa.string()))
+        fields.extend(pa.field(name, code_type) for name in self.extra_columns)
+        return pa.schema(fields)
+
+    def _write(self, item):
+        if self._schema is None:
+            self._schema = self._build_schema(item)
+        self._rows.append(item)
+        if len(self._rows) >= self.batch_size:
+            self._write_rows()
+
+    def _write_rows(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        rows, self._rows = self._rows, []
+        columns = []
+        for field in self._schema:
+            if field.name in self.extra_columns:
+                values = [self.extra_columns[field.name]] * len(rows)
+            else:
+                values = [row.__dict__.get(field.name) for row in rows]
+            if pa.types.is_floating(field.type):
+                values = [parse_number(value) for value in values]
+            elif pa.types.is_dictionary(field.type):
+                values = [value if value else None for value in values]
+            columns.append(pa.array(values, type=field.type))
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, self._schema)
+        self._writer.write_table(pa.Table.from_arrays(columns, schema=self._schema))
+
+    def _close(self):
+        if self._rows:
+            self._write_rows()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+# 输出格式名称（同时也是文件扩展名）到输出类的映射
+ITEM_SINKS = {
+    'json': JsonArraySink,
+    'ndjson': NdjsonSink,
+    'csv': CsvSink,
+    'xlsx': ExcelSink,
+    'parquet': ParquetSink,
+}
+
+
+def open_item_sink(fmt: str, path: str, headers: list = None, row_func=None, extra_columns: dict = None) -> ItemSink:
+    """
+    按格式名称创建输出。表格格式（csv、xlsx）需要 headers 和 row_func，
+    JSON格式直接写出记录的全部字段，Parquet 还会附加 extra_columns 中的常量列。
+    """
+    if fmt not in ITEM_SINKS:
+        raise ValueError(f"未知的输出格式: {fmt}")
+    sink_class = ITEM_SINKS[fmt]
+    if issubclass(sink_class, TableSink):
+        return sink_class(path, headers, row_func)
+    if sink_class is ParquetSink:
+        return sink_class(path, extra_columns=extra_columns)
+    return sink_class(path)
@@ -0,0 +1,296 @@
+import json
+import logging
+import os
+import threading
+from bisect import bisect_right
+
+
+class TableLayout:
+    """
+    单个表格的布局：按行排列的单元格坐标（缺失的单元格为None）及对应的文本层。
+    与 pdfplumber 的 Table.rows[i].cells 和 Table.extract() 的结构一一对应。
+    """
+    def __init__(self, bbox, rows, texts):
+        self.bbox = bbox
+        self.rows = rows     # [[(x0, top, x1, bottom) 或 None, ...], ...]
+        self.texts = texts   # [[str 或 None, ...], ...]
+
+    @classmethod
+    def from_table(cls, table):
+        """从 pdfplumber 的 Table 对象构建布局（只调用一次 table.extract()）。"""
+        return cls(table.bbox, [list(row.cells) for row in table.rows], table.extract())
+
+    def copy_texts(self):
+        """返回文本层的副本，调用方可以自由修改而不影响布局本身。"""
+        return [list(row) for row in self.texts]
+
+
+class PageLayout:
+    """
+    单个页面的表格布局（单元格、行、列以及提取的文本），每页只计算一次，
+    由表格提取、单元格坐标查找和 CustomsFormCorrector 共同使用。
+    """
+    def __init__(self, page_num, tables):
+        self.page_num = page_num
+        self.tables = tables  # [TableLayout, ...]，顺序与 page.find_tables() 一致
+        self._cell_index = None
+
+    @classmethod
+    def from_plumber_page(cls, page_num, plumber_page, timer=None):
+        """
+        对 pdfplumber 页面执行一次 find_tables() 并提取文本，构建页面布局。
+        :param timer: 可选的 StageTimer，用于记录表格查找与文本提取的耗时。
+        """
+        if timer is not None:
+            with timer.stage('find_tables'):
+                plumber_tables = plumber_page.find_tables()
+            with timer.stage('extract_table_text'):
+                tables = [TableLayout.from_table(table) for table in plumber_tables]
+        else:
+            tables = [TableLayout.from_table(table) for table in plumber_page.find_tables()]
+        return cls(page_num, tables)
+
+    def extract_tables(self):
+        """返回与 page.extract_tables() 相同格式的表格文本（副本）。"""
+        return [table.copy_texts() for table in self.tables]
+
+    def cell_index(self):
+        """返回本页单元格的空间索引（首次调用时构建）。"""
+        if self._cell_index is None:
+            self._cell_index = CellSpatialIndex(self.tables)
+        return self._cell_index
+
+
+class TemplateGridCache:
+    """
+    按模板缓存已学习的表格网格（各表格的单元格坐标），在页面之间和文档之间复用。
+
+    同一模板的报关单表格网格是固定的，没有必要每页都用 find_tables() 从线段重新推导。
+    第一次遇到某个模板（或网格变体）时执行完整的 find_tables() 并记录网格，
+    之后的页面只需快速校验横竖线是否与已学习的网格一致：每条线的位置以及线上各段的起止范围都要相同
+    （同样位置的线条中某几行合并或拆分了单元格时，线段范围不同，不会误用缓存的单元格）。
+    一致则直接用缓存的单元格构建表格，不一致才回退到 find_tables() 并学习新的变体。
+
+    指定 path 时网格持久化到JSON文件，下次运行直接复用。
+    """
+    MIN_EDGE_LENGTH = 3  # 与 pdfplumber 默认的 edge_min_length 一致，过短的线段不参与校验
+
+    def __init__(self, path: str = None, tolerance: float = 1.0, max_variants: int = 4):
+        """
+        :param path: 持久化文件路径（JSON）。为None时只在内存中缓存。
+        :param tolerance: 校验线条位置时允许的误差（PDF点）。
+        :param max_variants: 每个模板最多保留的网格变体数（例如最后一页项目较少时的网格）。
+        """
+        self.path = path
+        self.tolerance = tolerance
+        self.max_variants = max_variants
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._grids = {}  # 模板键 -> [网格, ...]，最近命中的排在前面
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._grids = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                # 损坏或写了一半的缓存文件不影响提取，从空缓存开始重新学习
+                logging.getLogger("TemplateGridCache").error(f"读取表格网格缓存 {path} 时出错，将重新学习: {e}")
+                self._grids = {}
+
+    def _cluster_lines(self, segments):
+        """
+        把位置相差不超过容差的线段合并为一条线（位置取平均值），并合并线上首尾相接或重叠的线段。
+        :param segments: [(位置, 起点, 终点), ...]
+        :return: (位置列表, 每条线的线段范围列表 [[[起点, 终点], ...], ...])
+        """
+        positions, spans = [], []
+        group = []
+        for segment in sorted(segments) + [None]:
+            if group and (segment is None or segment[0] - group[-1][0] > self.tolerance):
+                positions.append(sum(position for position, _, _ in group) / len(group))
+                line_spans = []
+                for _, start, end in sorted(group, key=lambda item: item[1]):
+                    if line_spans and start - line_spans[-1][1] <= self.tolerance:
+                        line_spans[-1][1] = max(line_spans[-1][1], end)
+                    else:
+                        line_spans.append([start, end])
+                spans.append(line_spans)
+                group = []
+            if segment is not None:
+                group.append(segment)
+        return positions, spans
+
+    def _ruling_lines(self, plumber_page):
+        """返回页面上竖线的x位置、横线的y位置（已合并）以及各条线的线段范围。"""
+        vertical, horizontal = [], []
+        for edge in plumber_page.edges:
+            orientation = edge.get('orientation')
+            if orientation == 'v' and edge['bottom'] - edge['top'] >= self.MIN_EDGE_LENGTH:
+                vertical.append((edge['x0'], edge['top'], edge['bottom']))
+            elif orientation == 'h' and edge['x1'] - edge['x0'] >= self.MIN_EDGE_LENGTH:
+                horizontal.append((edge['top'], edge['x0'], edge['x1']))
+        xs, x_spans = self._cluster_lines(vertical)
+        ys, y_spans = self._cluster_lines(horizontal)
+        return xs, ys, x_spans, y_spans
+
+    def _close(self, a, b):
+        """两组数值的个数相同且逐个相差不超过容差。"""
+        return len(a) == len(b) and all(abs(u - v) <= self.tolerance for u, v in zip(a, b))
+
+    def _spans_match(self, a, b):
+        """两组线条上的线段范围是否一致（每条线的线段数相同，起止点都在容差内）。"""
+        return len(a) == len(b) and all(
+            len(spans_a) == len(spans_b) and all(self._close(span_a, span_b) for span_a, span_b in zip(spans_a, spans_b))
+            for spans_a, spans_b in zip(a, b)
+        )
+
+    def _matches(self, grid, page_size, xs, ys, x_spans, y_spans):
+        """
+        校验页面尺寸、全部横竖线的位置以及每条线的线段范围是否与网格一致（不允许多线、少线或线段不同）。
+        没有记录线段范围的旧网格一律视为不一致，重新学习。
+        """
+        if 'x_spans' not in grid or 'y_spans' not in grid:
+            return False
+        if not self._close(page_size, grid['page_size']):
+            return False
+        return (self._close(xs, grid['xs']) and self._close(ys, grid['ys']) and
+                self._spans_match(x_spans, grid['x_spans']) and self._spans_match(y_spans, grid['y_spans']))
+
+    def layout_for_page(self, template_key: str, page_num, plumber_page, timer=None):
+        """
+        返回页面的 PageLayout：网格校验通过时使用缓存的单元格，否则执行 find_tables() 并学习网格。
+        :param template_key: 模板键，例如 'import/TianShi'。
+        :param timer: 可选的 StageTimer。
+        """
+        if timer is not None:
+            with timer.stage('grid_validate'):
+                xs, ys, x_spans, y_spans = self._ruling_lines(plumber_page)
+        else:
+            xs, ys, x_spans, y_spans = self._ruling_lines(plumber_page)
+        page_size = (plumber_page.width, plumber_page.height)
+
+        with self._lock:
+            variants = self._grids.get(template_key, [])
+            grid = next((g for g in variants if self._matches(g, page_size, xs, ys, x_spans, y_spans)), None)
+            if grid is not None:
+                self.hits += 1
+                # 最近命中的变体移到最前，加快后续校验
+                variants.remove(grid)
+                variants.insert(0, grid)
+            else:
+                self.misses += 1
+
+        if grid is not None:
+            # plumber_page 来自已打开的PDF，此时 pdfplumber 已经导入
+            from pdfplumber.table import Table
+            if timer is not None:
+                timer.count('grid_cache_hits')
+                with timer.stage('extract_table_text'):
+                    tables = [TableLayout.from_table(Table(plumber_page, [tuple(cell) for cell in cells]))
+                              for cells in grid['tables']]
+            else:
+                tables = [TableLayout.from_table(Table(plumber_page, [tuple(cell) for cell in cells]))
+                          for cells in grid['tables']]
+            return PageLayout(page_num, tables)
+
+        if timer is not None:
+            timer.count('grid_cache_misses')
+            with timer.stage('find_tables'):
+                plumber_tables = plumber_page.find_tables()
+            with timer.stage('extract_table_text'):
+                tables = [TableLayout.from_table(table) for table in plumber_tables]
+        else:
+            plumber_tables = plumber_page.find_tables()
+            tables = [TableLayout.from_table(table) for table in plumber_tables]
+        if plumber_tables:
+            self.learn(template_key, page_size, xs, ys, [[list(cell) for cell in table.cells] for table in plumber_tables],
+                       x_spans=x_spans, y_spans=y_spans)
+        return PageLayout(page_num, tables)
+
+    def learn(self, template_key: str, page_size, xs, ys, tables, x_spans=None, y_spans=None):
+        """
+        记录一个网格变体；超过 max_variants 时淘汰最久未命中的变体。
+        x_spans / y_spans 为与 xs / ys 对应的各条线的线段范围，省略时该网格不会被校验通过。
+        """
+        grid = {'page_size': list(page_size), 'xs': xs, 'ys': ys, 'tables': tables}
+        if x_spans is not None and y_spans is not None:
+            grid.update(x_spans=x_spans, y_spans=y_spans)
+        with self._lock:
+            variants = self._grids.setdefault(template_key, [])
+            variants.insert(0, grid)
+            del variants[self.max_variants:]
+            if self.path:
+                self._save()
+
+    def _save(self):
+        """原子地写入持久化文件。"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._grids, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self, template_key: str = None):
+        """清空某个模板（或全部模板）的已学习网格。"""
+        with self._lock:
+            if template_key is None:
+                self._grids.clear()
+            else:
+                self._grids.pop(template_key, None)
+            if self.path:
+                self._save()
+
+    def grids(self) -> dict:
+        """返回各模板已学习的网格变体 {模板键: [网格, ...]}（浅拷贝）。"""
+        with self._lock:
+            return {key: list(variants) for key, variants in self._grids.items()}
+
+    def stats(self) -> dict:
+        """返回命中/未命中次数以及各模板的网格变体数。"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'templates': {key: len(variants) for key, variants in self._grids.items()},
+            }
+
+
+class CellSpatialIndex:
+    """
+    页面所有表格单元格的空间索引，用于由点坐标快速定位所在单元格。
+
+    把所有单元格的左右边界、上下边界分别排序去重，形成基本网格；
+    每个基本网格格子预先记录覆盖它的第一个单元格 (表格序号, 行号, 列号)。
+    查询时对两个边界数组各做一次二分查找，结果与按 表格→行→列 顺序逐个比较
+    x0 <= x < x1 且 top <= y < bottom 的嵌套循环完全一致。
+    """
+    def __init__(self, tables):
+        """
+        :param tables: TableLayout 列表（或任何带有 rows 属性、按行给出单元格坐标的对象）。
+        """
+        cells = [
+            ((t_idx, r_idx, c_idx), cell_bbox)
+            for t_idx, table in enumerate(tables)
+            for r_idx, row in enumerate(table.rows)
+            for c_idx, cell_bbox in enumerate(row)
+            if cell_bbox
+        ]
+        self.xs = sorted({value for _, bbox in cells for value in (bbox[0], bbox[2])})
+        self.ys = sorted({value for _, bbox in cells for value in (bbox[1], bbox[3])})
+        x_pos = {value: i for i, value in enumerate(self.xs)}
+        y_pos = {value: i for i, value in enumerate(self.ys)}
+        self._slots = {}  # (列区间序号, 行区间序号) -> (表格序号, 行号, 列号)
+        for coords, (x0, top, x1, bottom) in cells:
+            for i in range(x_pos[x0], x_pos[x1]):
+                for j in range(y_pos[top], y_pos[bottom]):
+                    # 只保留嵌套循环中最先匹配到的单元格
+                    self._slots.setdefault((i, j), coords)
+
+    def lookup(self, x, y):
+        """返回包含点 (x, y) 的单元格 (表格序号, 行号, 列号)，不在任何单元格内时返回None。"""
+        i = bisect_right(self.xs, x) - 1
+        j = bisect_right(self.ys, y) - 1
+        if i < 0 or j < 0:
+            return None
+        return self._slots.get((i, j))
@@ -0,0 +1,198 @@
+from contextlib import nullcontext
+
+import numpy as np
+
+from PageLayout import PageLayout, TableLayout
+
+
+class PdfPage:
+    """
+    PDF后端页面的公共接口：表格布局、文本层和页面渲染。
+    坐标统一使用左上角为原点的PDF点坐标，origin 为页面在该坐标系中的左上角位置。
+    """
+    def __init__(self, page_num, native):
+        self.page_num = page_num
+        self.native = native  # 底层库的页面对象（pdfplumber.Page 或 fitz.Page）
+
+    @property
+    def origin(self):
+        """页面左上角在单元格坐标系中的位置，用于换算 PyMuPDF 的裁剪区域。"""
+        return (0, 0)
+
+    def layout(self, timer=None, grid_cache=None, grid_key='default') -> PageLayout:
+        """查找页面上的表格，返回 PageLayout。"""
+        raise NotImplementedError
+
+    def text(self) -> str:
+        """返回页面的文本层。"""
+        raise NotImplementedError
+
+    def size(self):
+        """返回页面的 (宽, 高)，单位为PDF点。"""
+        raise NotImplementedError
+
+    def rulings(self, min_length: float = 3):
+        """
+        返回页面上表格线的位置 (竖线的x坐标列表, 横线的y坐标列表)，不渲染页面。
+        矩形的四条边也计入，短于 min_length 的线段忽略。坐标未合并，可能有重复。
+        """
+        raise NotImplementedError
+
+    def rasterize(self, resolution):
+        """按指定dpi渲染整页，返回 (RGB图像数组, 坐标到像素的缩放比例)。"""
+        raise NotImplementedError
+
+
+class PdfBackend:
+    """
+    PDF后端的公共接口：打开文档、列出页面。
+    用 with 语句使用，退出时关闭文档。
+    """
+    name = None
+
+    def __init__(self, pdf_path: str):
+        self.pdf_path = pdf_path
+
+    def page_count(self) -> int:
+        raise NotImplementedError
+
+    def page(self, page_num) -> PdfPage:
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class PdfplumberPage(PdfPage):
+    @property
+    def origin(self):
+        return (self.native.bbox[0], self.native.bbox[1])
+
+    def layout(self, timer=None, grid_cache=None, grid_key='default'):
+        if grid_cache is not None:
+            return grid_cache.layout_for_page(grid_key, self.page_num, self.native, timer=timer)
+        return PageLayout.from_plumber_page(self.page_num, self.native, timer=timer)
+
+    def text(self):
+        return self.native.extract_text() or ''
+
+    def size(self):
+        return (self.native.width, self.native.height)
+
+    def rulings(self, min_length=3):
+        xs, ys = [], []
+        for edge in self.native.edges:
+            orientation = edge.get('orientation')
+            if orientation == 'v' and edge['bottom'] - edge['top'] >= min_length:
+                xs.append(edge['x0'])
+            elif orientation == 'h' and edge['x1'] - edge['x0'] >= min_length:
+                ys.append(edge['top'])
+        return xs, ys
+
+    def rasterize(self, resolution):
+        img = self.native.to_image(resolution=resolution)
+        return np.asarray(img.original), img.scale
+
+
+class PdfplumberBackend(PdfBackend):
+    """pdfplumber 后端：表格查找为纯Python实现，页面通过 pypdfium2 渲染。"""
+    name = 'pdfplumber'
+
+    def __init__(self, pdf_path: str):
+        super().__init__(pdf_path)
+        import pdfplumber
+        self.pdf = pdfplumber.open(pdf_path)
+
+    def page_count(self):
+        return len(self.pdf.pages)
+
+    def page(self, page_num):
+        return PdfplumberPage(page_num, self.pdf.pages[page_num])
+
+    def close(self):
+        if self.pdf is not None:
+            self.pdf.close()
+            self.pdf = None
+
+
+class PyMuPDFPage(PdfPage):
+    def layout(self, timer=None, grid_cache=None, grid_key='default'):
+        # 表格网格缓存基于 pdfplumber 的线段和 Table 对象，PyMuPDF 后端总是直接查找表格
+        with timer.stage('find_tables') if timer is not None else nullcontext():
+            found = self.native.find_tables().tables
+        with timer.stage('extract_table_text') if timer is not None else nullcontext():
+            tables = [TableLayout.from_table(table) for table in found]
+        return PageLayout(self.page_num, tables)
+
+    def text(self):
+        return self.native.get_text()
+
+    def size(self):
+        return (self.native.rect.width, self.native.rect.height)
+
+    def rulings(self, min_length=3):
+        # get_drawings() 只解析矢量路径，比 find_tables() 和 pdfplumber 的完整版面分析快得多
+        xs, ys = [], []
+        for path in self.native.get_drawings():
+            for item in path['items']:
+                if item[0] == 'l':
+                    p1, p2 = item[1], item[2]
+                    if abs(p1.x - p2.x) < 1 and abs(p1.y - p2.y) >= min_length:
+                        xs.append(p1.x)
+                    elif abs(p1.y - p2.y) < 1 and abs(p1.x - p2.x) >= min_length:
+                        ys.append(min(p1.y, p2.y))
+                elif item[0] == 're':
+                    rect = item[1]
+                    if rect.height >= min_length:
+                        xs.extend((rect.x0, rect.x1))
+                    if rect.width >= min_length:
+                        ys.extend((rect.y0, rect.y1))
+        return xs, ys
+
+    def rasterize(self, resolution):
+        pix = self.native.get_pixmap(dpi=resolution, alpha=False)
+        img_data = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+        return img_data, resolution / 72
+
+
+class PyMuPDFBackend(PdfBackend):
+    """
+    PyMuPDF 后端：一个库完成表格查找、文本层和渲染，
+    CustomsFormCorrector 也可以直接复用同一个文档（见 doc 属性），无需再次打开PDF。
+    """
+    name = 'pymupdf'
+
+    def __init__(self, pdf_path: str):
+        super().__init__(pdf_path)
+        import fitz  # PyMuPDF
+        self.doc = fitz.open(pdf_path)
+
+    def page_count(self):
+        return self.doc.page_count
+
+    def page(self, page_num):
+        return PyMuPDFPage(page_num, self.doc[page_num])
+
+    def close(self):
+        if self.doc is not None:
+            self.doc.close()
+            self.doc = None
+
+
+PDF_BACKENDS = {
+    PdfplumberBackend.name: PdfplumberBackend,
+    PyMuPDFBackend.name: PyMuPDFBackend,
+}
+
+
+def open_pdf_backend(name: str, pdf_path: str) -> PdfBackend:
+    """按名称打开PDF后端（'pdfplumber' 或 'pymupdf'）。"""
+    if name not in PDF_BACKENDS:
+        raise ValueError(f"未知的PDF后端: {name}")
+    return PDF_BACKENDS[name](pdf_path)
@@ -0,0 +1,239 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    按阶段累计耗时（墙钟时间和当前线程的CPU时间）和调用次数的计时器。
+
+    用法:
+        timer = StageTimer()
+        with timer.stage('find_tables'):
+            page.find_tables()
+        timer.count('find_tables_saved')
+        print(timer.report())
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}    # 阶段名 -> {'seconds': 累计秒数, 'cpu_seconds': 累计CPU秒数, 'calls': 调用次数}
+        self.counters = {}  # 计数器名 -> 数值
+
+    @contextmanager
+    def stage(self, name: str):
+        """统计 with 块内代码的耗时，并累加到指定阶段。CPU时间只统计当前线程（流水线中页面准备在后台线程进行）。"""
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, cpu_seconds=time.thread_time() - cpu_start)
+
+    def add(self, name: str, seconds: float, calls: int = 1, cpu_seconds: float = 0.0):
+        """直接累加某个阶段的耗时（例如由工作进程回传的耗时）。"""
+        with self._lock:
+            entry = self.stages.setdefault(name, {'seconds': 0.0, 'cpu_seconds': 0.0, 'calls': 0})
+            entry['seconds'] += seconds
+            entry['cpu_seconds'] += cpu_seconds
+            entry['calls'] += calls
+
+    def count(self, name: str, value: int = 1):
+        """累加一个计数器。"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def seconds(self, name: str) -> float:
+        """返回某个阶段的累计耗时。"""
+        return self.stages.get(name, {}).get('seconds', 0.0)
+
+    def cpu_seconds(self, name: str) -> float:
+        """返回某个阶段的累计CPU时间。"""
+        return self.stages.get(name, {}).get('cpu_seconds', 0.0)
+
+    def calls(self, name: str) -> int:
+        """返回某个阶段的调用次数。"""
+        return self.stages.get(name, {}).get('calls', 0)
+
+    def summary(self) -> dict:
+        """返回可序列化为JSON的统计结果。"""
+        with self._lock:
+            return {
+                'stages': {name: dict(entry) for name, entry in self.stages.items()},
+                'counters': dict(self.counters),
+            }
+
+    def report(self) -> str:
+        """返回便于阅读的多行统计文本。"""
+        lines = []
+        for name, entry in self.stages.items():
+            average = entry['seconds'] / entry['calls'] if entry['calls'] else 0.0
+            lines.append(f"{name}: {entry['seconds']:.3f}s (CPU {entry['cpu_seconds']:.3f}s) / {entry['calls']} 次 "
+                         f"(平均 {average * 1000:.1f}ms)")
+        for name, value in self.counters.items():
+            lines.append(f"{name}: {value}")
+        return "\n".join(lines)
+
+
+# 工作进程回传的页面统计中的阶段耗时：阶段名 -> (墙钟时间键, CPU时间键)，各进程累计
+WORKER_STAGES = {
+    'rasterize': ('rasterize_seconds', 'rasterize_cpu_seconds'),
+    'preprocess': ('preprocess_seconds', 'preprocess_cpu_seconds'),
+    'model_init': ('model_init_seconds', 'model_init_cpu_seconds'),
+    'ocr': ('ocr_seconds', 'ocr_cpu_seconds'),
+}
+# 单元格计数：指标中的类别 -> 页面统计键
+CELL_COUNTERS = {
+    'ocr': 'cells_ocr',  # 真正送入OCR引擎的单元格（不含空白单元格和缓存命中）
+    'preprocessed': 'cells_preprocessed',
+    'blank': 'cells_blank',
+    'text_layer': 'cells_text_layer',
+    'unread': 'cells_unread',
+    'cache_hit': 'cache_hits',
+    'cache_miss': 'cache_misses',
+}
+METRIC_PREFIX = 'customs_extractor'
+
+
+def run_metrics(run_stats: dict, document_stages: dict = None, labels: dict = None, items: int = None) -> dict:
+    """
+    把 OcrParser 的运行统计（last_run_stats，或批量处理时一个文档累计的页面统计）整理为一份运行指标。
+
+    :param run_stats: 运行统计，包含 'pages'、'wall_seconds'、'cpu_seconds'、'workers'、'stages'（父进程的 StageTimer.summary()）
+                      以及工作进程回传的各项计数和耗时。
+    :param document_stages: 文档级阶段（提取、解析、写出）的 StageTimer.summary()。
+    :param labels: 标识这次运行的标签，例如 {'doc_type': 'import', 'template': 'TianShi'}。
+    :param items: 解析出的项目数。
+    :return: 可序列化为JSON的指标：
+        {'labels', 'timestamp', 'pages', 'items', 'wall_seconds', 'cpu_seconds', 'pages_per_second',
+         'workers', 'worker_busy_seconds', 'worker_cpu_seconds', 'worker_utilization',
+         'cells': {类别: 数量}, 'stages': {阶段名: {'process', 'wall_seconds', 'cpu_seconds', 'calls'}}}
+        stages 中 process 为 'main'（父进程）或 'worker'（工作进程，各进程累计，calls 为页数）。
+    """
+    pages = run_stats.get('pages', 0)
+    wall_seconds = run_stats.get('wall_seconds', 0.0)
+    workers = run_stats.get('workers', 0)
+    worker_busy_seconds = run_stats.get('worker_seconds', 0.0)
+    stages = {}
+    for source in (document_stages, run_stats.get('stages')):
+        for name, entry in (source or {}).get('stages', {}).items():
+            stages[name] = {'process': 'main', 'wall_seconds': entry['seconds'],
+                            'cpu_seconds': entry.get('cpu_seconds', 0.0), 'calls': entry['calls']}
+    for name, (wall_key, cpu_key) in WORKER_STAGES.items():
+        if wall_key in run_stats:
+            stages[name] = {'process': 'worker', 'wall_seconds': run_stats[wall_key],
+                            'cpu_seconds': run_stats.get(cpu_key, 0.0), 'calls': pages}
+    return {
+        'labels': dict(labels or {}),
+        'timestamp': time.time(),
+        'pages': pages,
+        'items': items,
+        'wall_seconds': wall_seconds,
+        'cpu_seconds': run_stats.get('cpu_seconds', 0.0),
+        'pages_per_second': pages / wall_seconds if wall_seconds > 0 else 0.0,
+        'workers': workers,
+        'worker_busy_seconds': worker_busy_seconds,
+        'worker_cpu_seconds': run_stats.get('worker_cpu_seconds', 0.0),
+        # 工作进程处理页面的时间占 进程数 × 运行时间 的比例
+        'worker_utilization': worker_busy_seconds / (workers * wall_seconds) if workers and wall_seconds > 0 else 0.0,
+        'cells': {kind: run_stats.get(key, 0) for kind, key in CELL_COUNTERS.items()},
+        'stages': stages,
+    }
+
+
+def merge_run_metrics(metrics_list: list, labels: dict = None, wall_seconds: float = None, workers: int = None) -> dict:
+    """
+    合并多次运行（例如一个批次中的所有文档）的指标：计数和各阶段耗时相加。
+    文档在同一条流水线中重叠处理时各文档的运行时间不能相加，需要传入整个批次的 wall_seconds 和进程数；
+    父进程的CPU时间同理（各文档的CPU时间无法分开统计时为0），由调用方另行设置。
+    """
+    merged = run_metrics({}, labels=labels, items=0)
+    for metrics in metrics_list:
+        merged['pages'] += metrics['pages']
+        merged['items'] += metrics['items'] or 0
+        merged['cpu_seconds'] += metrics['cpu_seconds']
+        merged['worker_busy_seconds'] += metrics['worker_busy_seconds']
+        merged['worker_cpu_seconds'] += metrics['worker_cpu_seconds']
+        for kind, value in metrics['cells'].items():
+            merged['cells'][kind] += value
+        for name, entry in metrics['stages'].items():
+            total = merged['stages'].setdefault(name, {'process': entry['process'], 'wall_seconds': 0.0,
+                                                       'cpu_seconds': 0.0, 'calls': 0})
+            total['wall_seconds'] += entry['wall_seconds']
+            total['cpu_seconds'] += entry['cpu_seconds']
+            total['calls'] += entry['calls']
+    if wall_seconds is None:
+        wall_seconds = sum(metrics['wall_seconds'] for metrics in metrics_list)
+    if workers is None:
+        workers = max((metrics['workers'] for metrics in metrics_list), default=0)
+    merged['wall_seconds'] = wall_seconds
+    merged['workers'] = workers
+    merged['pages_per_second'] = merged['pages'] / wall_seconds if wall_seconds > 0 else 0.0
+    merged['worker_utilization'] = (merged['worker_busy_seconds'] / (workers * wall_seconds)
+                                    if workers and wall_seconds > 0 else 0.0)
+    return merged
+
+
+def _label_text(labels: dict) -> str:
+    if not labels:
+        return ''
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def prometheus_text(metrics: dict, prefix: str = METRIC_PREFIX) -> str:
+    """把运行指标转换为 Prometheus 文本格式（node_exporter textfile collector 可直接读取），所有指标都是最近一次运行的 gauge。"""
+    labels = metrics.get('labels', {})
+    lines = []
+
+    def gauge(name, help_text, samples):
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} gauge")
+        for extra_labels, value in samples:
+            lines.append(f"{prefix}_{name}{_label_text({**labels, **extra_labels})} {float(value or 0)!r}")
+
+    gauge('last_run_timestamp_seconds', 'Unix time when the last run finished.', [({}, metrics['timestamp'])])
+    gauge('pages', 'Pages processed in the last run.', [({}, metrics['pages'])])
+    gauge('items', 'Items parsed in the last run.', [({}, metrics['items'])])
+    gauge('wall_seconds', 'Wall time of the last run.', [({}, metrics['wall_seconds'])])
+    gauge('cpu_seconds', 'CPU time of the main process in the last run.', [({}, metrics['cpu_seconds'])])
+    gauge('pages_per_second', 'Pages per second in the last run.', [({}, metrics['pages_per_second'])])
+    gauge('workers', 'OCR worker processes used by the last run.', [({}, metrics['workers'])])
+    gauge('worker_busy_seconds', 'Time OCR workers spent on pages, summed over workers.', [({}, metrics['worker_busy_seconds'])])
+    gauge('worker_cpu_seconds', 'CPU time of OCR workers, summed over workers.', [({}, metrics['worker_cpu_seconds'])])
+    gauge('worker_utilization_ratio', 'Worker busy time divided by workers times wall time.', [({}, metrics['worker_utilization'])])
+    gauge('cells', 'Table cells by how they were read.',
+          [({'kind': kind}, value) for kind, value in metrics['cells'].items()])
+    gauge('stage_seconds', 'Time spent in each stage; worker stages are summed over workers.',
+          [({'stage': name, 'process': entry['process'], 'clock': clock}, entry[f'{clock}_seconds'])
+           for name, entry in metrics['stages'].items() for clock in ('wall', 'cpu')])
+    gauge('stage_calls', 'Calls of each stage (pages for worker stages).',
+          [({'stage': name, 'process': entry['process']}, entry['calls']) for name, entry in metrics['stages'].items()])
+    return '\n'.join(lines) + '\n'
+
+
+def _write_atomic(path: str, text: str):
+    """先写临时文件再替换，读取方（例如 node_exporter）不会读到写了一半的文件。"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_json_sidecar(metrics: dict, path: str) -> str:
+    """把运行指标写为JSON文件，返回文件路径。"""
+    _write_atomic(path, json.dumps(metrics, ensure_ascii=False, indent=2))
+    return path
+
+
+def write_prometheus_textfile(metrics: dict, path: str, prefix: str = METRIC_PREFIX) -> str:
+    """
+    把运行指标写为 Prometheus textfile（文件名应以 .prom 结尾，放在 node_exporter 的 --collector.textfile.directory 中），
+    返回文件路径。每次运行覆盖同一个文件。
+    """
+    _write_atomic(path, prometheus_text(metrics, prefix))
+    return path
@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import re
+import threading
+from collections import namedtuple
+
+from PdfBackend import open_pdf_backend
+from ThaiNormalizer import normalize_thai
+
+
+# 报关单首页标题中的类型标记：进口报关单 / 出口报关单
+DOC_TYPE_MARKERS = {'import': 'ใบขนสินค้าขาเข้า', 'export': 'ใบขนสินค้าขาออก'}
+# 文本特征词：英文词（至少3个字母）和泰文词段（至少4个字符）
+_TOKEN = re.compile(r'[A-Za-z][A-Za-z&./-]{2,}|[\u0E00-\u0E7F]{4,}')
+_WHITESPACE = re.compile(r'\s+')
+# 自动选择模板的默认最低置信度
+MIN_CONFIDENCE = 0.2
+# 最高得分低于此值时置信度记为0：只有一个候选模板时没有可比较的对象，得分差无法说明匹配是否可靠
+MIN_SCORE = 0.6
+
+# 识别结果：template 为None表示没有可比较的参考指纹（doc_type 仍可能由标题标记确定）
+TemplateMatch = namedtuple('TemplateMatch', ['doc_type', 'template', 'confidence', 'score'])
+
+
+def cluster_positions(values, tolerance: float) -> list:
+    """把相差不超过容差的坐标合并为一个位置（取每组的平均值），与 TemplateGridCache 的合并规则一致。"""
+    positions = []
+    group = []
+    for value in sorted(values):
+        if group and value - group[-1] > tolerance:
+            positions.append(sum(group) / len(group))
+            group = []
+        group.append(value)
+    if group:
+        positions.append(sum(group) / len(group))
+    return positions
+
+
+def detect_doc_type(text: str):
+    """按标题标记判断报关单类型，返回 'import'、'export'，两种标记都没有（或都有）时返回None。"""
+    compact = _WHITESPACE.sub('', normalize_thai(text))
+    found = [doc_type for doc_type, marker in DOC_TYPE_MARKERS.items() if marker in compact]
+    return found[0] if len(found) == 1 else None
+
+
+def positions_similarity(a: list, b: list, tolerance: float) -> float:
+    """两组已排序位置的相似度：容差内一一配对的位置数的F1值（0~1）。"""
+    if not a or not b:
+        return 0.0
+    matched = i = j = 0
+    while i < len(a) and j < len(b):
+        if abs(a[i] - b[j]) <= tolerance:
+            matched += 1
+            i += 1
+            j += 1
+        elif a[i] < b[j]:
+            i += 1
+        else:
+            j += 1
+    return 2.0 * matched / (len(a) + len(b))
+
+
+def page_fingerprint(pdf_path: str, backend: str = 'pymupdf', tolerance: float = 1.0) -> dict:
+    """
+    读取PDF首页的文本层和表格线，返回指纹（不渲染页面，也不查找表格）：
+    {'doc_type': 标题标记确定的类型或None, 'page_size': [宽, 高], 'xs': 合并后的竖线位置,
+     'tokens': 文本特征词列表}
+    """
+    with open_pdf_backend(backend, pdf_path) as document:
+        page = document.page(0)
+        text = page.text()
+        xs, _ = page.rulings()
+        page_size = page.size()
+    tokens = {token.upper() for token in _TOKEN.findall(normalize_thai(text))}
+    return {
+        'doc_type': detect_doc_type(text),
+        'page_size': [round(value, 2) for value in page_size],
+        'xs': [round(x, 2) for x in cluster_positions(xs, tolerance)],
+        'tokens': sorted(tokens),
+    }
+
+
+class TemplateClassifier:
+    """
+    按PDF首页的指纹识别报关单模板，用于批量处理时自动选择模板。
+
+    参考指纹有两个来源：
+    1. learn() 从已知模板的样本PDF学习的指纹（表格线 + 文本特征词），指定 path 时持久化到JSON文件；
+    2. 可选的 TemplateGridCache 中各模板已学习的网格（只有表格线），提取过的模板无需另外学习。
+
+    得分 = 表格竖线位置的相似度与文本特征词覆盖率的加权平均（只有网格时只用表格线）。
+    首页标题中有进口/出口标记时只比较该类型的模板。置信度为最高得分与其他模板最高得分之差，
+    两个模板无法区分时置信度接近0。只有一个候选模板时差值就是它自己的得分，
+    因此同时要求最高得分的绝对值不低于 MIN_SCORE，否则置信度记为0（得分仍如实返回）。
+    """
+    GRID_WEIGHT = 0.5
+
+    def __init__(self, path: str = None, grid_cache=None, backend: str = 'pymupdf', tolerance: float = 2.0,
+                 max_references: int = 4):
+        """
+        :param path: 参考指纹的持久化文件路径（JSON）。为None时只在内存中保存。
+        :param grid_cache: 可选的 TemplateGridCache，其中已学习的网格作为只有表格线的参考指纹。
+        :param backend: 读取首页使用的PDF后端，默认 'pymupdf'（只解析矢量路径，速度最快）。
+        :param tolerance: 比较表格线位置时允许的误差（PDF点）。
+        :param max_references: 每个模板最多保留的参考指纹数。
+        """
+        self.path = path
+        self.grid_cache = grid_cache
+        self.backend = backend
+        self.tolerance = tolerance
+        self.max_references = max_references
+        self._lock = threading.Lock()
+        self._references = {}  # 模板键 'import/TianShi' -> [指纹, ...]，最新的排在前面
+        self._common_tokens = {}  # 模板键 -> 所有参考指纹共有的特征词
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._references = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logging.getLogger("TemplateClassifier").error(f"读取参考指纹文件 {path} 时出错，将从空的参考指纹开始: {e}")
+                self._references = {}
+
+    def fingerprint(self, pdf_path: str) -> dict:
+        """返回PDF首页的指纹。"""
+        return page_fingerprint(pdf_path, self.backend)
+
+    def learn(self, pdf_path: str, template_key: str) -> dict:
+        """
+        把样本PDF的首页指纹记为模板的参考指纹，返回该指纹。
+        同一模板学习多个样本后，只有所有样本共有的特征词参与比较（随项目变化的文字不影响得分）。
+        :param template_key: 模板键，格式为 '类型/模板'，例如 'import/TianShi'。
+        """
+        fingerprint = self.fingerprint(pdf_path)
+        with self._lock:
+            references = self._references.setdefault(template_key, [])
+            references.insert(0, fingerprint)
+            del references[self.max_references:]
+            self._common_tokens.pop(template_key, None)
+            if self.path:
+                self._save()
+        return fingerprint
+
+    def _save(self):
+        """原子地写入持久化文件。"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._references, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _common(self, template_key: str, references: list) -> set:
+        common = self._common_tokens.get(template_key)
+        if common is None:
+            common = set(references[0]['tokens']).intersection(*(r['tokens'] for r in references[1:]))
+            self._common_tokens[template_key] = common
+        return common
+
+    def _grid_score(self, fingerprint: dict, reference: dict) -> float:
+        if any(abs(a - b) > self.tolerance for a, b in zip(fingerprint['page_size'], reference['page_size'])):
+            return 0.0
+        return positions_similarity(fingerprint['xs'], reference['xs'], self.tolerance)
+
+    def scores(self, fingerprint: dict) -> dict:
+        """返回指纹与每个候选模板的得分 {模板键: 得分}，标题标记确定了类型时只包含该类型的模板。"""
+        with self._lock:
+            references = {key: list(refs) for key, refs in self._references.items()}
+            common_tokens = {key: self._common(key, refs) for key, refs in references.items() if refs}
+        grids = self.grid_cache.grids() if self.grid_cache is not None else {}
+        doc_type = fingerprint.get('doc_type')
+        tokens = set(fingerprint['tokens'])
+
+        scores = {}
+        for key in list(references) + [key for key in grids if key not in references]:
+            if doc_type is not None and key.split('/', 1)[0] != doc_type:
+                continue
+            candidates = references.get(key, []) + grids.get(key, [])
+            if not candidates:
+                continue
+            grid_score = max(self._grid_score(fingerprint, reference) for reference in candidates)
+            common = common_tokens.get(key)
+            if common:
+                text_score = len(common & tokens) / len(common)
+                scores[key] = self.GRID_WEIGHT * grid_score + (1 - self.GRID_WEIGHT) * text_score
+            else:
+                scores[key] = grid_score
+        return scores
+
+    def classify_fingerprint(self, fingerprint: dict) -> TemplateMatch:
+        """按指纹识别模板。"""
+        ranked = sorted(self.scores(fingerprint).items(), key=lambda kv: kv[1], reverse=True)
+        if not ranked:
+            return TemplateMatch(fingerprint.get('doc_type'), None, 0.0, 0.0)
+        best_key, best_score = ranked[0]
+        second_score = ranked[1][1] if len(ranked) > 1 else 0.0
+        doc_type, template = best_key.split('/', 1)
+        # 部分匹配的得分再高于其他模板也不可靠，尤其是没有其他候选模板可比较时
+        confidence = best_score - second_score if best_score >= MIN_SCORE else 0.0
+        return TemplateMatch(doc_type, template, confidence, best_score)
+
+    def classify(self, pdf_path: str) -> TemplateMatch:
+        """读取PDF首页并识别模板，返回 TemplateMatch(类型, 模板, 置信度, 得分)。"""
+        return self.classify_fingerprint(self.fingerprint(pdf_path))
+
+
+def main():
+    import argparse
+    import glob
+    import time
+    parser = argparse.ArgumentParser(description="按PDF首页的文本层和表格线识别报关单模板，或从样本学习模板的参考指纹。")
+    parser.add_argument("pdfs", nargs='+', help="PDF文件或通配符。")
+    parser.add_argument("--references", help="参考指纹JSON文件（学习时写入，识别时读取）。")
+    parser.add_argument("--grid-cache", help="表格网格缓存JSON文件，其中的网格也作为参考指纹。")
+    parser.add_argument("--learn", metavar="TEMPLATE", help="把所有PDF学习为该模板的样本，格式为 '类型/模板'，例如 'import/TianShi'。")
+    parser.add_argument("--backend", choices=['pymupdf', 'pdfplumber'], default='pymupdf', help="读取首页的PDF后端。默认: 'pymupdf'。")
+    args = parser.parse_args()
+
+    grid_cache = None
+    if args.grid_cache:
+        from PageLayout import TemplateGridCache
+        grid_cache = TemplateGridCache(args.grid_cache)
+    classifier = TemplateClassifier(args.references, grid_cache=grid_cache, backend=args.backend)
+    pdf_paths = sorted({path for pattern in args.pdfs for path in (glob.glob(pattern) or [pattern])})
+    for pdf_path in pdf_paths:
+        start = time.perf_counter()
+        if args.learn:
+            fingerprint = classifier.learn(pdf_path, args.learn)
+            print(f"{pdf_path}: 已学习为 {args.learn} ({len(fingerprint['xs'])} 条竖线, "
+                  f"{len(fingerprint['tokens'])} 个特征词)")
+        else:
+            match = classifier.classify(pdf_path)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            template = f"{match.doc_type}/{match.template}" if match.template else f"{match.doc_type or '?'}/?"
+            print(f"{pdf_path}: {template} 置信度 {match.confidence:.2f} 得分 {match.score:.2f} ({elapsed_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
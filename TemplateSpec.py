@@ -0,0 +1,276 @@
+import re
+
+
+# 泰文字符
+THAI_CHAR = re.compile(r'[\u0E00-\u0E7F]')
+THAI_RUN = re.compile(r'[\u0E00-\u0E7F]+')
+# 数字（可带千分位、小数点和百分号）
+NUMBER = re.compile(r'([0-9,.%]+)')
+# 数值 + 单位，例如 '12.50 KGM'、'100 C62'
+NET_WEIGHT = re.compile(r'([0-9,.]+)\s*([A-Z]+)', re.IGNORECASE)
+QTY_WITH_UNIT = re.compile(r'([0-9,.]+)\s*([A-Z]+[0-9]*)', re.IGNORECASE)
+# 恰好包含一个 '/' 的单位代码，例如 'C62/C62'
+UNIT_CODES = re.compile(r'([^/]*)/([^/]*)\Z')
+INVOICE_T8 = re.compile(r'(T8\S*)')
+
+
+# --- 常用的后处理函数 ---
+
+def first_line(text):
+    """取第一行。"""
+    return text.split('\n')[0]
+
+
+def strip_currency(code):
+    """返回去掉币种前缀（例如 'USD\\n1,234.50' 中的 'USD'）的后处理函数。"""
+    def strip(text):
+        return text.replace(f'{code}\n', '').replace(f'{code} ', '').strip()
+    return strip
+
+
+def number_in_lines(text):
+    """返回第一个含有数字的行中的数字部分，没有时返回原文本。"""
+    for value in text.split('\n'):
+        match = NUMBER.search(value)
+        if match:
+            return match.group(1)
+    return text
+
+
+def leading_number(text):
+    """返回第一个以数字开头的行开头的数字部分，没有时返回原文本。"""
+    for value in text.split('\n'):
+        match = NUMBER.match(value)
+        if match:
+            return match.group(0)
+    return text
+
+
+def strip_pair(match):
+    """把正则的两个分组分别去掉首尾空白。"""
+    return match.group(1).strip(), match.group(2).strip()
+
+
+def net_weight(match):
+    """(总净重, 重量单位)，OCR常把 KGM 识别为 KGV。"""
+    return match.group(1), match.group(2).replace('KGV', 'KGM')
+
+
+def invoice_t8(text):
+    """从文本层的发票单元格中取出 T8 开头的发票号，没有时返回None（不覆盖已有的值）。"""
+    invoice = None
+    for line in text.split('\n'):
+        if THAI_CHAR.search(line):
+            line = THAI_RUN.sub('', line).strip()
+        if 'T8' in line:
+            inv_match = INVOICE_T8.search(line)
+            if inv_match:
+                invoice = inv_match.group(0).strip()
+            else:
+                invoice = line.strip()
+    return invoice
+
+
+def hs_code_and_unit_codes(text):
+    """出口报关单的HS编码单元格：(HS编码, 单位代码1, 单位代码2)，HS编码之后的第一行为 '单位1/单位2'。"""
+    cell_values = text.split('\n')
+    hs_code = leading_number(text)
+    unit_code_1 = unit_code_2 = None
+    if hs_code:
+        cell_values.remove(hs_code)
+    if len(cell_values) > 0:
+        unit_codes = cell_values[0].strip().split('/')
+        if len(unit_codes) == 2:
+            unit_code_1 = unit_codes[0].strip()
+            unit_code_2 = unit_codes[1].strip()
+    return hs_code, unit_code_1, unit_code_2
+
+
+def package_qty_and_type(text):
+    """出口报关单的包装单元格：(包装数量, 包装类型)，忽略泰文行。"""
+    cell_values = text.split('\n')
+    for line in cell_values:
+        if THAI_CHAR.search(line):
+            cell_values.remove(line)
+    package_qty = leading_number(text)
+    if package_qty:
+        cell_values.remove(package_qty)
+    package_type = cell_values[0].strip() if len(cell_values) > 0 else None
+    return package_qty, package_type
+
+
+class FieldSpec:
+    """
+    一个字段（或一组字段）的声明：从哪个单元格取值、用什么正则拆分、取值后如何处理。
+
+    :param fields: 字段名，或多个字段名的元组（此时 pattern/post 产出同样长度的值元组）。
+    :param cell: 单元格在组内的位置 (行, 列)。
+    :param source: 'rows' 取OCR结果，'original_rows' 取PDF文本层。
+    :param pattern: 从单元格文本开头匹配的正则（字符串或已编译），分组依次对应 fields。
+    :param post: 后处理函数。有 pattern 时接收匹配对象，否则接收单元格文本；
+                 也可以是函数元组，依次调用。返回None的值不写入字段。
+    :param fallback: pattern 不匹配时接收单元格原文本的字段名。
+    """
+    def __init__(self, fields, cell, source: str = 'rows', pattern=None, post=None, fallback: str = None):
+        if source not in ('rows', 'original_rows'):
+            raise ValueError(f"未知的单元格来源: {source}")
+        self.fields = fields
+        self.cell = cell
+        self.source = source
+        self.pattern = pattern
+        self.post = post
+        self.fallback = fallback
+
+    def compile(self):
+        """
+        预编译为 apply(tables, item) 函数，tables 为 (rows, original_rows)。
+        按声明的形式生成专用的函数，解析时不再判断声明的类型。
+        """
+        table_idx = 0 if self.source == 'rows' else 1
+        row_idx, col_idx = self.cell
+        fields = self.fields
+        fallback = self.fallback
+        pattern = re.compile(self.pattern) if isinstance(self.pattern, str) else self.pattern
+        posts = self.post if isinstance(self.post, tuple) else ((self.post,) if self.post else ())
+        many = isinstance(fields, tuple)
+
+        def assign_many(item, values):
+            for field, value in zip(fields, values):
+                if value is not None:
+                    setattr(item, field, value)
+
+        if pattern is not None:
+            post = posts[0] if posts else None
+            def apply(tables, item):
+                try:
+                    text = tables[table_idx][row_idx][col_idx].strip()
+                except (IndexError, AttributeError):
+                    text = ''
+                match = pattern.match(text)
+                if match:
+                    values = post(match) if post else match.groups()
+                    if many:
+                        assign_many(item, values)
+                    elif values is not None:
+                        setattr(item, fields, values)
+                elif fallback:
+                    setattr(item, fallback, text)
+        elif not posts:
+            def apply(tables, item):
+                try:
+                    setattr(item, fields, tables[table_idx][row_idx][col_idx].strip())
+                except (IndexError, AttributeError):
+                    setattr(item, fields, '')
+        else:
+            def apply(tables, item):
+                try:
+                    value = tables[table_idx][row_idx][col_idx].strip()
+                except (IndexError, AttributeError):
+                    value = ''
+                for post in posts:
+                    value = post(value)
+                if many:
+                    assign_many(item, value)
+                elif value is not None:
+                    setattr(item, fields, value)
+        return apply
+
+
+class TemplateSpec:
+    """
+    一个报关行模板的声明式描述。
+
+    :param name: 模板名称 (例如 'TianShi')。
+    :param doc_type: 'import' 或 'export'。
+    :param fields: FieldSpec 列表，在解析描述块之前按顺序应用。
+    :param late_fields: 在解析描述块之后应用的 FieldSpec（可以覆盖描述块中得到的值）。
+    :param description_row: 描述块所在的组内行号：取该行文本层中含泰文的最长单元格。
+    :param description_cell: 传给描述块解析的OCR单元格 (行, 列)。
+    :param options: 创建提取器时附加的参数，例如 {'use_corrector': True}。
+    """
+    def __init__(self, name: str, doc_type: str, fields, late_fields=(), description_row: int = 2,
+                 description_cell=(2, 3), options: dict = None):
+        self.name = name
+        self.doc_type = doc_type
+        self.fields = list(fields)
+        self.late_fields = list(late_fields)
+        self.description_row = description_row
+        self.description_cell = description_cell
+        self.options = dict(options or {})
+        self._compiled = None
+
+    def derive(self, name: str, fields=(), late_fields=(), **changes):
+        """
+        以当前模板为基础派生新模板：fields/late_fields 中与已有声明字段相同的项替换原声明，其余追加在后面。
+        changes 可以覆盖 description_row、description_cell、options。
+        """
+        def merge(base, overrides):
+            merged = list(base)
+            for spec in overrides:
+                for idx, existing in enumerate(merged):
+                    if existing.fields == spec.fields:
+                        merged[idx] = spec
+                        break
+                else:
+                    merged.append(spec)
+            return merged
+        return TemplateSpec(
+            name, changes.get('doc_type', self.doc_type),
+            merge(self.fields, fields), merge(self.late_fields, late_fields),
+            description_row=changes.get('description_row', self.description_row),
+            description_cell=changes.get('description_cell', self.description_cell),
+            options=changes.get('options', self.options),
+        )
+
+    @property
+    def ocr_cells(self):
+        """需要OCR的单元格：所有从OCR结果取值的字段所在的单元格。"""
+        return frozenset(spec.cell for spec in self.fields + self.late_fields if spec.source == 'rows')
+
+    def compile(self):
+        """编译为 CompiledTemplate。结果会被缓存，同一个模板只编译一次。"""
+        if self._compiled is None:
+            self._compiled = CompiledTemplate(self)
+        return self._compiled
+
+
+class CompiledTemplate:
+    """编译后的模板：字段声明已转换为预编译的取值函数。"""
+    def __init__(self, spec: TemplateSpec):
+        self.spec = spec
+        self.name = spec.name
+        self.description_row = spec.description_row
+        self.description_cell = spec.description_cell
+        self.ocr_cells = spec.ocr_cells
+        self._appliers = [field.compile() for field in spec.fields]
+        self._late_appliers = [field.compile() for field in spec.late_fields]
+
+    def apply(self, group_data: dict, item):
+        """按 fields 填充 item。"""
+        tables = (group_data.get('rows', []), group_data.get('original_rows', []))
+        for apply in self._appliers:
+            apply(tables, item)
+
+    def apply_late(self, group_data: dict, item):
+        """按 late_fields 填充 item。"""
+        tables = (group_data.get('rows', []), group_data.get('original_rows', []))
+        for apply in self._late_appliers:
+            apply(tables, item)
+
+    @staticmethod
+    def cell_text(group_data: dict, cell, source: str = 'rows'):
+        """返回单元格去掉首尾空白后的文本，单元格不存在或为空时返回空字符串。"""
+        try:
+            return group_data.get(source, [])[cell[0]][cell[1]].strip()
+        except (IndexError, AttributeError):
+            return ''
+
+    def description_block(self, group_data: dict):
+        """返回描述块：description_row 行文本层中含泰文的最长单元格，没有时返回None。"""
+        max_length = 0
+        max_length_row = None
+        for text in group_data.get('original_rows', [])[self.description_row]:
+            if text is not None and len(text) > max_length and THAI_CHAR.search(text):
+                max_length = len(text)
+                max_length_row = text
+        return max_length_row
@@ -0,0 +1,124 @@
+import re
+
+
+# PDF文本层中泰文字体的私有区(PUA)字形和旧编码字符 -> 标准泰文字符。
+# 顺序与原来逐项替换的顺序一致。
+THAI_REPLACEMENT_MAP = {
+    '\uf700': 'ำ',    # sara am
+    '\uf701': '์',    # thanthakhat
+    '\uf702': '้',    # mai tho
+    '\uf706': '้',    # mai tho
+    '\uf707': '๊',    # mai tri
+    '\uf712': 'เ',    # sara e
+    '\uf713': 'ใ',    # sara ai maimuan
+    '\uf714': 'ไ',    # sara ai maimalai
+    '\uf715': '์',    # thanthakhat
+    '\uf716': '่',    # mai ek
+    '\uf717': '๊',    # mai tri
+    '\uf718': '๋',    # mai chattawa
+    '\uf70a': '่',    # mai ek (声调符号)
+    '\uf70e': '์',    # thanthakhat (静音符号)
+    '\uf70b': '้',    # mai tho (声调符号)
+    '\x0b': '(',
+    '\x0c': ')',
+    '\x9e': 'ป',
+    '\x9f': 'ผ',
+    '\x9a': 'ท',
+    '\x8d': 'ช',
+    'Ã': 'โ',
+}
+
+# 泰语辅音字母，包含所有辅音
+THAI_CONSONANTS = 'กขฃคฅฆงจฉชซฌญฎฏฐฑฒณดตถทธนบปผฝพฟภมยรฤลฦวศษสหฬอฮ'
+THANTHAKHAT = '์'
+# 辅音 + 空白(0个或多个) + 音杀符(์ U+0E4C)
+THANTHAKHAT_GAP = re.compile(f'([{THAI_CONSONANTS}])\\s*{THANTHAKHAT}')
+# 参与音杀符修正的字符：键为这些字符的替换项会改变修正的结果，必须在修正之后单独进行
+_FIX_SENSITIVE = re.compile(f'[{THAI_CONSONANTS}{THANTHAKHAT}]|\\s')
+# 批量处理时连接单元格的分隔符：不是空白、不在替换表中，修正正则不会跨过它
+_CELL_SEPARATOR = '\x00'
+
+
+def fix_thanthakhat(text: str) -> str:
+    """去掉辅音和音杀符之间的空白。"""
+    if THANTHAKHAT not in text:
+        return text
+    return THANTHAKHAT_GAP.sub(r'\1' + THANTHAKHAT, text)
+
+
+class ThaiNormalizer:
+    """
+    泰文规范化：把PDF文本层中的PUA字形和旧编码字符替换为标准泰文字符，并修正音杀符前的空白。
+
+    结果与按替换表顺序逐项执行 str.replace 并在每次替换后修正音杀符完全相同。
+    替换表在构造时被划分为若干阶段，每个阶段合并为一个 str.translate 表，阶段之间做一次修正：
+    只有键为空白、辅音或音杀符（会影响修正结果），或者键出现在同阶段之前的替换值中（链式替换）时，
+    才需要开始新的阶段。默认替换表划分为3个阶段。
+    """
+    def __init__(self, replacement_map: dict = None):
+        if replacement_map is None:
+            replacement_map = THAI_REPLACEMENT_MAP
+        self.replacement_map = dict(replacement_map)
+        self._stages = []
+        stage = {}
+        for key, value in self.replacement_map.items():
+            if len(key) != 1:
+                raise ValueError(f"替换表的键必须是单个字符: {key!r}")
+            if stage and (_FIX_SENSITIVE.match(key) or any(key in v for v in stage.values())):
+                self._stages.append(str.maketrans(stage))
+                stage = {}
+            stage[key] = value
+        if stage:
+            self._stages.append(str.maketrans(stage))
+
+    def normalize(self, text: str) -> str:
+        """规范化一段文本。"""
+        for table in self._stages:
+            text = fix_thanthakhat(text.translate(table))
+        return text
+
+    __call__ = normalize
+
+    def normalize_cells(self, cells: list) -> list:
+        """
+        一次规范化多个单元格（None保持不变），返回新列表。
+        所有单元格连接成一个字符串，只做一遍 translate 和正则替换。
+        """
+        texts = [cell for cell in cells if cell is not None]
+        if not texts:
+            return list(cells)
+        if any(_CELL_SEPARATOR in text for text in texts):
+            # 单元格中本身含有分隔符，逐个处理
+            normalized = [self.normalize(text) for text in texts]
+        else:
+            normalized = self.normalize(_CELL_SEPARATOR.join(texts)).split(_CELL_SEPARATOR)
+        it = iter(normalized)
+        return [None if cell is None else next(it) for cell in cells]
+
+    def normalize_groups(self, all_pages_groups: dict, key: str = 'original_rows') -> dict:
+        """
+        规范化整个文档所有分组的 key（默认 original_rows）中的每个单元格，原地修改并返回 all_pages_groups。
+        整个文档的单元格在一遍处理中完成。
+        """
+        rows_list = [group[key] for page_groups in all_pages_groups.values()
+                     for group in page_groups if group.get(key)]
+        cells = [cell for rows in rows_list for row in rows for cell in row]
+        normalized = iter(self.normalize_cells(cells))
+        for rows in rows_list:
+            for row in rows:
+                row[:] = [next(normalized) for _ in row]
+        return all_pages_groups
+
+
+# 默认替换表的共享实例
+DEFAULT_NORMALIZER = ThaiNormalizer()
+
+
+def normalize_thai(text: str) -> str:
+    """用默认替换表规范化一段文本。"""
+    return DEFAULT_NORMALIZER.normalize(text)
+
+
+def normalize_groups(all_pages_groups: dict, key: str = 'original_rows') -> dict:
+    """用默认替换表原地规范化整个文档所有分组的 original_rows 单元格。"""
+    return DEFAULT_NORMALIZER.normalize_groups(all_pages_groups, key)
@@ -0,0 +1,98 @@
+"""
+单元格定位微基准：比较 CustomsFormCorrector 原来的嵌套循环与 CellSpatialIndex 的二分查找。
+
+在合成的密集网格（含跨列合并的单元格）上随机生成文本块中心点，
+先校验两种方法的结果完全一致，再分别计时。
+
+用法:
+    python benchmarks/bench_cell_lookup.py --rows 120 --cols 24 --points 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PageLayout import CellSpatialIndex, TableLayout
+
+
+def build_synthetic_tables(rows, cols, tables=2, merge_ratio=0.15, seed=0):
+    """生成若干上下排列的密集表格，部分单元格向右合并（被合并的位置为None，与 pdfplumber 一致）。"""
+    rng = random.Random(seed)
+    layouts = []
+    cell_w, cell_h = 20.0, 6.5
+    top = 20.0
+    for _ in range(tables):
+        table_rows = []
+        for r in range(rows):
+            y0, y1 = top + r * cell_h, top + (r + 1) * cell_h
+            row = []
+            c = 0
+            while c < cols:
+                span = 2 if c + 1 < cols and rng.random() < merge_ratio else 1
+                row.append((10.0 + c * cell_w, y0, 10.0 + (c + span) * cell_w, y1))
+                row.extend([None] * (span - 1))
+                c += span
+            table_rows.append(row)
+        layouts.append(TableLayout(None, table_rows, None))
+        top += rows * cell_h + 15.0
+    return layouts
+
+
+def nested_loop_lookup(tables, x, y):
+    """CustomsFormCorrector.correct 原来的定位方式：按 表格→行→列 逐个比较。"""
+    for t_idx, table in enumerate(tables):
+        for r_idx, row in enumerate(table.rows):
+            for c_idx, cell_bbox in enumerate(row):
+                if (cell_bbox and
+                        cell_bbox[0] <= x < cell_bbox[2] and
+                        cell_bbox[1] <= y < cell_bbox[3]):
+                    return (t_idx, r_idx, c_idx)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="单元格定位微基准：嵌套循环 vs 空间索引。")
+    parser.add_argument("--rows", type=int, default=120, help="每个表格的行数 (默认: 120)。")
+    parser.add_argument("--cols", type=int, default=24, help="每个表格的列数 (默认: 24)。")
+    parser.add_argument("--tables", type=int, default=2, help="表格数 (默认: 2)。")
+    parser.add_argument("--points", type=int, default=5000, help="查询点数 (默认: 5000)。")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子。")
+    args = parser.parse_args()
+
+    tables = build_synthetic_tables(args.rows, args.cols, args.tables, seed=args.seed)
+    rng = random.Random(args.seed + 1)
+    max_x = 10.0 + args.cols * 20.0 + 10.0
+    max_y = 20.0 + args.tables * (args.rows * 6.5 + 15.0)
+    points = [(rng.uniform(0, max_x), rng.uniform(0, max_y)) for _ in range(args.points)]
+    # 加入恰好落在边界上的点，检验半开区间的处理
+    points += [(cell[0], cell[1]) for table in tables for row in table.rows[:3] for cell in row if cell]
+
+    start = time.perf_counter()
+    index = CellSpatialIndex(tables)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = [nested_loop_lookup(tables, x, y) for x, y in points]
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [index.lookup(x, y) for x, y in points]
+    index_seconds = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+    cell_count = sum(1 for table in tables for row in table.rows for cell in row if cell)
+    print(f"单元格数: {cell_count}, 查询点数: {len(points)}, 结果不一致: {mismatches}")
+    print(f"嵌套循环: {loop_seconds * 1000:.1f}ms ({loop_seconds / len(points) * 1e6:.1f}us/次)")
+    print(f"空间索引: 构建 {build_seconds * 1000:.1f}ms, 查询 {index_seconds * 1000:.1f}ms "
+          f"({index_seconds / len(points) * 1e6:.2f}us/次)")
+    if index_seconds > 0:
+        print(f"查询加速: {loop_seconds / index_seconds:.0f}x")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
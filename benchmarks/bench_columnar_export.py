@@ -0,0 +1,113 @@
+"""
+列式导出基准：比较分析任务重新加载 xlsx 结果和读取 Parquet 数据集后按HS编码汇总金额的用时。
+
+生成合成的 ImportFields 项目，分成若干个“文档”分别写出 xlsx 文件和分区的 Parquet 数据集，
+然后分别用 openpyxl 逐行读取全部 xlsx 后汇总、用 pyarrow.dataset 读取后 group_by 汇总，并校验两者结果一致。
+
+用法:
+    python benchmarks/bench_columnar_export.py --items 50000 --documents 50
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pyarrow.dataset as ds
+from openpyxl import load_workbook
+
+from FieldsExtractor import ImportFields, ImportFieldsExtractor
+from OutputSinks import ExcelSink, ParquetSink, parse_number, partition_path
+
+
+def make_item(rng, i):
+    item = ImportFields()
+    item.NO = str(i + 1)
+    item.MODEL = f"MDL-{i}"
+    item.DESCRIPTION = 'SAMPLE GOODS'
+    item.DESCRIPTION_TH = 'สินค้าตัวอย่าง'
+    item.HS_CODE = f"8471.{rng.randint(10, 60)}.00"
+    item.QTY = f"{rng.randint(1, 5000):,}"
+    item.QTY_UNIT = rng.choice(['C62', 'PCE', 'SET'])
+    item.AMOUNT_USD = f"{rng.uniform(1, 100000):,.2f}"
+    item.AMOUNT_THB = f"{rng.uniform(30, 3500000):,.2f}"
+    item.TOTAL_N_W = f"{rng.uniform(0.1, 900):.3f}"
+    item.WEIGHT_UNIT = 'KGM'
+    item.INV = f"T8INV{rng.randint(0, 999):03d}"
+    item.COUNTRY_OF_ORIGIN = rng.choice(['CN', 'TH', 'JP'])
+    return item
+
+
+def write_outputs(root, items, documents):
+    excel_paths = []
+    per_document = (len(items) + documents - 1) // documents
+    for doc_idx in range(documents):
+        chunk = items[doc_idx * per_document:(doc_idx + 1) * per_document]
+        excel_path = os.path.join(root, 'xlsx', f"doc{doc_idx}.xlsx")
+        with ExcelSink(excel_path, ImportFieldsExtractor.EXCEL_HEADERS,
+                       lambda item: ImportFieldsExtractor._excel_row(None, item)) as sink:
+            for item in chunk:
+                sink.write(item)
+        excel_paths.append(excel_path)
+        parquet_path = partition_path(os.path.join(root, 'dataset', 'import'),
+                                      [('template', 'TianShi'), ('date', '2025-07-10')], f"doc{doc_idx}.parquet")
+        with ParquetSink(parquet_path, extra_columns={'SOURCE_FILE': f"doc{doc_idx}.pdf"}) as sink:
+            for item in chunk:
+                sink.write(item)
+    return excel_paths
+
+
+def aggregate_excel(excel_paths):
+    headers = ImportFieldsExtractor.EXCEL_HEADERS
+    hs_idx, amount_idx = headers.index('HS CODE'), headers.index('AMOUNT(USD)')
+    totals = defaultdict(float)
+    for path in excel_paths:
+        workbook = load_workbook(path, read_only=True)
+        for row in workbook.active.iter_rows(min_row=2, values_only=True):
+            totals[row[hs_idx]] += parse_number(row[amount_idx]) or 0.0
+        workbook.close()
+    return dict(totals)
+
+
+def aggregate_parquet(root):
+    dataset = ds.dataset(os.path.join(root, 'dataset', 'import'), format='parquet', partitioning='hive')
+    # 各文件的字典编码各自独立，汇总前先统一字典
+    table = dataset.to_table(columns=['HS_CODE', 'AMOUNT_USD']).unify_dictionaries()
+    result = table.group_by('HS_CODE').aggregate([('AMOUNT_USD', 'sum')]).to_pydict()
+    return dict(zip(result['HS_CODE'], result['AMOUNT_USD_sum']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列式导出基准：xlsx 重新加载 vs Parquet 数据集。")
+    parser.add_argument("--items", type=int, default=20000, help="项目总数 (默认: 20000)。")
+    parser.add_argument("--documents", type=int, default=20, help="文档数 (默认: 20)。")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    items = [make_item(rng, i) for i in range(args.items)]
+    with tempfile.TemporaryDirectory() as root:
+        start = time.perf_counter()
+        excel_paths = write_outputs(root, items, args.documents)
+        print(f"写出 {args.items} 个项目 ({args.documents} 个文档, xlsx + parquet): {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        excel_totals = aggregate_excel(excel_paths)
+        excel_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parquet_totals = aggregate_parquet(root)
+        parquet_seconds = time.perf_counter() - start
+
+        same = excel_totals.keys() == parquet_totals.keys() and all(
+            abs(excel_totals[key] - parquet_totals[key]) < 1e-6 * max(1.0, abs(excel_totals[key]))
+            for key in excel_totals)
+        print(f"按HS编码汇总金额: xlsx {excel_seconds:.2f}s, parquet {parquet_seconds:.3f}s, "
+              f"加速 {excel_seconds / parquet_seconds:.0f}x, 结果一致: {same}")
+
+
+if __name__ == "__main__":
+    main()
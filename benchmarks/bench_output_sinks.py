@@ -0,0 +1,92 @@
+"""
+结果输出基准：比较原来的一次性写出（openpyxl 普通工作簿、json.dump 整个列表）
+与 OutputSinks 中逐条写出的各格式在不同项目数下的用时和内存峰值。
+
+项目为合成的 ImportFields 对象，内存峰值用 tracemalloc 统计（只计写出过程中的新分配）。
+
+用法:
+    python benchmarks/bench_output_sinks.py --counts 1000 10000 50000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook
+
+from FieldsExtractor import ImportFields, ImportFieldsExtractor
+from OutputSinks import ITEM_SINKS, open_item_sink
+
+
+def make_item(i):
+    item = ImportFields()
+    for idx, key in enumerate(item.__dict__):
+        item.__dict__[key] = f"{key[:6]}-{i}-{idx}"
+    item.DESCRIPTION_TH = 'สินค้าตัวอย่าง'
+    return item
+
+
+def iter_items(count):
+    # 项目按需生成，模拟批处理中边解析边写出的情况
+    return (make_item(i) for i in range(count))
+
+
+def legacy_excel(path, count):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(ImportFieldsExtractor.EXCEL_HEADERS)
+    for item in iter_items(count):
+        sheet.append(ImportFieldsExtractor._excel_row(None, item))
+    workbook.save(path)
+
+
+def legacy_json(path, count):
+    items = list(iter_items(count))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([item.__dict__ for item in items], f, ensure_ascii=False, indent=2)
+
+
+def sink_writer(fmt):
+    def write(path, count):
+        with open_item_sink(fmt, path, ImportFieldsExtractor.EXCEL_HEADERS,
+                            lambda item: ImportFieldsExtractor._excel_row(None, item)) as sink:
+            for item in iter_items(count):
+                sink.write(item)
+    return write
+
+
+def measure(func, path, count):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(path, count)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="结果输出基准：一次性写出 vs 逐条写出。")
+    parser.add_argument("--counts", type=int, nargs='+', default=[1000, 10000], help="项目数 (默认: 1000 10000)。")
+    args = parser.parse_args()
+
+    writers = [('xlsx (普通工作簿)', 'xlsx', legacy_excel), ('json (json.dump)', 'json', legacy_json)]
+    writers += [(f"{fmt} (逐条写出)", fmt, sink_writer(fmt)) for fmt in ITEM_SINKS]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'输出':<22}{'项目数':>10}{'用时(s)':>10}{'内存峰值(MB)':>14}{'文件(MB)':>10}")
+        for count in args.counts:
+            for label, ext, func in writers:
+                path = os.path.join(tmp_dir, f"items.{ext}")
+                seconds, peak = measure(func, path, count)
+                size = os.path.getsize(path)
+                print(f"{label:<22}{count:>10}{seconds:>10.2f}{peak / 1e6:>14.1f}{size / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+PDF后端基准：比较 pdfplumber 与 PyMuPDF 后端的表格查找、文本层和页面渲染耗时，
+并逐页校验两个后端找到的表格是否等价（单元格坐标在容差内一致、单元格文本相同）。
+
+用法:
+    python benchmarks/bench_pdf_backend.py 报关单.pdf [更多PDF ...] --resolution 300
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PdfBackend import PDF_BACKENDS, open_pdf_backend
+from RunMetrics import StageTimer
+
+
+def run_backend(name, pdf_path, resolution, rasterize):
+    """用指定后端处理整个文档，返回 (各页布局, StageTimer)。"""
+    timer = StageTimer()
+    layouts = []
+    with timer.stage('open'):
+        document = open_pdf_backend(name, pdf_path)
+    with document:
+        for page_num in range(document.page_count()):
+            page = document.page(page_num)
+            layouts.append(page.layout(timer=timer))
+            with timer.stage('text'):
+                page.text()
+            if rasterize:
+                with timer.stage('rasterize'):
+                    page.rasterize(resolution)
+    return layouts, timer
+
+
+def compare_layouts(reference, candidate, tolerance):
+    """返回两个后端布局之间的差异描述列表，空列表表示等价。"""
+    differences = []
+    for page_num, (ref_page, cand_page) in enumerate(zip(reference, candidate)):
+        if len(ref_page.tables) != len(cand_page.tables):
+            differences.append(f"第 {page_num + 1} 页: 表格数 {len(ref_page.tables)} != {len(cand_page.tables)}")
+            continue
+        for t_idx, (ref_table, cand_table) in enumerate(zip(ref_page.tables, cand_page.tables)):
+            ref_cells = [cell for row in ref_table.rows for cell in row]
+            cand_cells = [cell for row in cand_table.rows for cell in row]
+            if len(ref_cells) != len(cand_cells) or any(
+                (a is None) != (b is None) or (a is not None and any(abs(x - y) > tolerance for x, y in zip(a, b)))
+                for a, b in zip(ref_cells, cand_cells)
+            ):
+                differences.append(f"第 {page_num + 1} 页表格 {t_idx}: 单元格坐标不一致")
+            text_diffs = sum(
+                1 for ref_row, cand_row in zip(ref_table.texts, cand_table.texts)
+                for a, b in zip(ref_row, cand_row) if (a or '') != (b or '')
+            )
+            if text_diffs:
+                differences.append(f"第 {page_num + 1} 页表格 {t_idx}: {text_diffs} 个单元格文本不一致")
+    if len(reference) != len(candidate):
+        differences.append(f"页数 {len(reference)} != {len(candidate)}")
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较 pdfplumber 与 PyMuPDF 后端的速度和表格输出。")
+    parser.add_argument("pdf_paths", nargs="+", help="PDF文件路径。")
+    parser.add_argument("--resolution", type=int, default=300, help="渲染分辨率 (默认: 300)。")
+    parser.add_argument("--no-rasterize", action="store_true", help="不测试页面渲染。")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="单元格坐标比较容差 (默认: 0.5)。")
+    args = parser.parse_args()
+
+    names = sorted(PDF_BACKENDS)
+    mismatched = False
+    for pdf_path in args.pdf_paths:
+        print(f"== {pdf_path}")
+        results = {name: run_backend(name, pdf_path, args.resolution, not args.no_rasterize) for name in names}
+        for name in names:
+            layouts, timer = results[name]
+            total = sum(entry['seconds'] for entry in timer.stages.values())
+            print(f"[{name}] {len(layouts)} 页, 总计 {total:.3f}s")
+            print("  " + timer.report().replace("\n", "\n  "))
+        differences = compare_layouts(results['pdfplumber'][0], results['pymupdf'][0], args.tolerance)
+        if differences:
+            mismatched = True
+            print("表格输出不等价:")
+            for line in differences:
+                print(f"  {line}")
+        else:
+            print("表格输出等价。")
+    if mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+分阶段基准：用合成报关单PDF和桩OCR引擎，按页数、工作进程数和渲染dpi分别测量提取流程各阶段的耗时。
+
+测量的阶段:
+    generate     生成合成PDF（不计入提取流程）
+    pool_start   启动进程池并在每个进程中初始化OCR引擎
+    extract      OcrParser.extract_group_text 的总耗时（页面准备、渲染、预处理、OCR）
+    find_tables / extract_table_text / grid_validate / correct
+                 父进程中页面准备各阶段的耗时（来自 OcrParser.stage_timer）
+    rasterize    工作进程中渲染页面的累计耗时（各进程之和）
+    preprocess   工作进程中单元格裁剪和预处理的累计耗时（各进程之和，不含渲染）
+    ocr          工作进程中检测和识别的累计耗时（各进程之和）
+    parse        把所有分组解析为字段对象的耗时
+
+OCR引擎替换为 stub_ocr.StubOcrEngine（结果只由图像决定，没有模型推理），因此各阶段的耗时是确定的，
+不受模型加载和推理波动的影响；需要模拟推理耗时时设置环境变量 STUB_OCR_LATENCY_MS。
+桩引擎的识别结果没有意义，解析阶段用各分组的文本层（original_rows）代替OCR结果，使字段解析走真实的分支。
+
+用法:
+    python benchmarks/bench_stages.py --types import export --pages 1 5 20 --workers 1 4 --dpi 150 300
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)  # 工作进程按 '模块:类' 导入桩引擎
+
+from synthetic_customs import make_declaration
+
+STUB_ENGINE = 'stub_ocr:StubOcrEngine'
+LAYOUT_STAGES = ('find_tables', 'extract_table_text', 'grid_validate', 'correct')
+
+
+def extractor_class(doc_type):
+    from FieldsExtractor import ExportFieldsExtractor, ImportFieldsExtractor
+    return ImportFieldsExtractor if doc_type == 'import' else ExportFieldsExtractor
+
+
+def text_layer_groups(all_pages_groups: dict) -> dict:
+    """用文本层代替OCR结果的分组副本（桩引擎的识别结果不能用于字段解析）。"""
+    return {
+        page: [dict(group, rows=group['original_rows']) for group in groups]
+        for page, groups in all_pages_groups.items()
+    }
+
+
+def run_case(pdf_path, doc_type, workers, dpi, args, output_dir):
+    """用一组参数处理一个PDF，返回该次运行各阶段的耗时和计数。"""
+    from OcrParser import OcrWorkerPool
+    result = {'workers': workers, 'dpi': dpi}
+    start = time.perf_counter()
+    pool = OcrWorkerPool(max_workers=workers, langs=('en',), ocr_engine=STUB_ENGINE)
+    result['pool_start'] = time.perf_counter() - start
+    try:
+        extractor = extractor_class(doc_type)(
+            pdf_path, output_dir=output_dir, output_formats=[], use_corrector=args.corrector, ocr_pool=pool,
+            ocr_engine=STUB_ENGINE, resolution=dpi, pdf_backend=args.backend, ocr_mode=args.ocr_mode,
+            raster_mode=args.raster_mode)
+        parser = extractor.ocr_parser
+        start = time.perf_counter()
+        all_pages_groups = parser.extract_group_text(pdf_path, save_json=False, group_size=extractor.GROUP_SIZE)
+        result['extract'] = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+
+    run_stats = parser.last_run_stats
+    stages = run_stats.get('stages', {}).get('stages', {})
+    for name in LAYOUT_STAGES:
+        if name in stages:
+            result[name] = stages[name]['seconds']
+    result['rasterize'] = run_stats.get('rasterize_seconds', 0.0)
+    result['preprocess'] = run_stats.get('preprocess_seconds', 0.0)
+    result['ocr'] = run_stats.get('ocr_seconds', 0.0)
+    result['worker_utilization'] = run_stats.get('worker_utilization', 0.0)
+    result['pages_processed'] = run_stats.get('pages', 0)
+    for key in ('cells_ocr', 'cells_blank', 'cells_text_layer'):
+        result[key] = run_stats.get(key, 0)
+
+    groups = text_layer_groups(all_pages_groups or {})
+    start = time.perf_counter()
+    items = extractor.build_items(groups)
+    result['parse'] = time.perf_counter() - start
+    result['items'] = len(items)
+    result['pages_per_second'] = result['pages_processed'] / result['extract'] if result['extract'] else 0.0
+    return result
+
+
+def format_row(doc_type, pages, result):
+    def ms(key):
+        return f"{result[key] * 1000:>9.1f}" if key in result else f"{'-':>9}"
+    return (f"{doc_type:<8}{pages:>6}{result['workers']:>6}{result['dpi']:>6}"
+            f"{ms('pool_start')}{ms('extract')}{ms('find_tables')}{ms('extract_table_text')}"
+            f"{ms('correct')}{ms('rasterize')}{ms('preprocess')}{ms('ocr')}{ms('parse')}"
+            f"{result['pages_per_second']:>8.1f}{result['cells_ocr']:>8}{result['cells_blank']:>7}{result['items']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分阶段基准：合成报关单PDF + 桩OCR引擎。")
+    parser.add_argument("--types", nargs='+', choices=['import', 'export'], default=['import', 'export'], help="报关单类型。")
+    parser.add_argument("--pages", type=int, nargs='+', default=[1, 5, 20], help="页数 (默认: 1 5 20)。")
+    parser.add_argument("--workers", type=int, nargs='+', default=[1, 4], help="工作进程数 (默认: 1 4)。")
+    parser.add_argument("--dpi", type=int, nargs='+', default=[150, 300], help="渲染dpi (默认: 150 300)。")
+    parser.add_argument("--backend", choices=['pdfplumber', 'pymupdf'], default='pdfplumber', help="PDF后端 (默认: pdfplumber)。")
+    parser.add_argument("--ocr-mode", choices=['cell', 'batch', 'rec_only'], default='cell', help="OCR模式 (默认: cell)。")
+    parser.add_argument("--raster-mode", choices=['page', 'clip'], default='page', help="渲染模式 (默认: page)。")
+    parser.add_argument("--corrector", action="store_true", help="同时测量 CustomsFormCorrector 的修正阶段。")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子 (默认: 0)。")
+    parser.add_argument("--json", help="把所有结果写入该JSON文件。")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'类型':<6}{'页数':>4}{'进程':>4}{'dpi':>6}{'启动ms':>7}{'提取ms':>7}{'找表ms':>7}{'表文本ms':>6}"
+          f"{'修正ms':>7}{'渲染ms':>7}{'预处理ms':>6}{'OCRms':>8}{'解析ms':>7}{'页/秒':>6}{'OCR格':>6}{'空白格':>4}{'项目':>5}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for doc_type in args.types:
+            for pages in args.pages:
+                pdf_path = os.path.join(tmp_dir, f"synthetic_{doc_type}_{pages}p.pdf")
+                start = time.perf_counter()
+                info = make_declaration(pdf_path, doc_type, pages, seed=args.seed)
+                generate_seconds = time.perf_counter() - start
+                for workers in args.workers:
+                    for dpi in args.dpi:
+                        result = run_case(pdf_path, doc_type, workers, dpi, args, tmp_dir)
+                        result.update({'doc_type': doc_type, 'pages': pages, 'generate': generate_seconds,
+                                       'expected_items': info['items']})
+                        results.append(result)
+                        print(format_row(doc_type, pages, result))
+                        if result['items'] != info['items']:
+                            print(f"  警告: 解析出 {result['items']} 个项目，合成PDF中有 {info['items']} 个")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
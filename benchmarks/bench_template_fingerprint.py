@@ -0,0 +1,125 @@
+"""
+模板识别基准：生成各模板的合成报关单PDF，从少量样本学习参考指纹后识别其余文件，统计准确率和每个文件的用时。
+
+每个模板的合成PDF有自己的列布局和报关行抬头，首页标题为进口/出口报关单标记；
+部分模板共用同一列布局（只能靠抬头文字区分），进口和出口的同名模板也共用列布局（只能靠标题标记区分）。
+每个文件的项目数、页数和项目文字随机变化。另外统计只使用网格缓存（不学习文本特征）时的准确率。
+
+用法:
+    python benchmarks/bench_template_fingerprint.py --files 20 --train 2
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+
+from TemplateFingerprint import DOC_TYPE_MARKERS, TemplateClassifier, page_fingerprint
+
+THAI_FONT = fitz.Font(script=19).buffer  # 19: 泰文
+
+COLUMNS_A = [30, 90, 170, 250, 330, 410, 490, 570, 650, 730, 810]
+COLUMNS_B = [30, 70, 160, 260, 360, 450, 540, 630, 720, 810]
+COLUMNS_C = [25, 100, 200, 280, 380, 480, 560, 660, 740, 815]
+# 模板键 -> (列布局, 报关行抬头, 每个项目的行数)
+LAYOUTS = {
+    'import/LSS': (COLUMNS_B, 'LSS LOGISTICS SERVICE CO., LTD.', 4),
+    'import/HLS': (COLUMNS_A, 'HLS SHIPPING AGENCY CO., LTD.', 4),
+    'import/SNP': (COLUMNS_C, 'SNP INTERNATIONAL TRANSPORT', 4),
+    'import/OLC': (COLUMNS_C, 'OLC CUSTOMS CLEARANCE', 4),
+    'import/TianShi': (COLUMNS_A, 'TIANSHI INTERNATIONAL FORWARDING', 4),
+    'export/TianShi': (COLUMNS_A, 'TIANSHI INTERNATIONAL FORWARDING', 8),
+    'export/HLS': (COLUMNS_B, 'HLS SHIPPING AGENCY CO., LTD.', 8),
+}
+GOODS = ['PLASTIC BOX', 'STEEL SCREW', 'COPPER WIRE', 'LED PANEL', 'CARTON LABEL', 'RUBBER SEAL']
+
+
+def make_fixture(path, template_key, rng, items, pages):
+    columns, header, group_size = LAYOUTS[template_key]
+    doc_type = template_key.split('/', 1)[0]
+    doc = fitz.open()
+    for page_idx in range(pages):
+        page = doc.new_page(width=842, height=595)
+        page.insert_font(fontname='th', fontbuffer=THAI_FONT)
+        page.insert_text((30, 22), DOC_TYPE_MARKERS[doc_type], fontsize=10, fontname='th')
+        page.insert_text((300, 22), header, fontsize=9)
+        page.insert_text((640, 22), f"DECLARATION NO A{rng.randint(100000, 999999)}", fontsize=7)
+        row_height = 480 / (1 + items * group_size)
+        top = 40
+        rows = 1 + items * group_size
+        for r in range(rows + 1):
+            page.draw_line((columns[0], top + r * row_height), (columns[-1], top + r * row_height))
+        for x in columns:
+            page.draw_line((x, top), (x, top + rows * row_height))
+        for item in range(items):
+            y = top + (1 + item * group_size) * row_height + 8
+            page.insert_text((columns[0] + 2, y), str(page_idx * items + item + 1), fontsize=6)
+            page.insert_text((columns[2] + 2, y), rng.choice(GOODS), fontsize=6)
+            page.insert_text((columns[3] + 2, y), f"{rng.uniform(1, 99999):,.2f}", fontsize=6)
+            page.insert_text((columns[3] + 2, y + row_height), 'สินค้าตัวอย่าง', fontsize=6, fontname='th')
+    doc.save(path)
+    doc.close()
+
+
+def evaluate(classifier, files):
+    correct = 0
+    elapsed = []
+    for path, template_key in files:
+        start = time.perf_counter()
+        match = classifier.classify(path)
+        elapsed.append((time.perf_counter() - start) * 1000)
+        if match.template is not None and f"{match.doc_type}/{match.template}" == template_key:
+            correct += 1
+    return correct / len(files), statistics.mean(elapsed), sorted(elapsed)[int(0.95 * (len(elapsed) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模板识别基准：准确率和每个文件的识别用时。")
+    parser.add_argument("--files", type=int, default=20, help="每个模板的测试文件数 (默认: 20)。")
+    parser.add_argument("--train", type=int, default=2, help="每个模板学习的样本数 (默认: 2)。")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子 (默认: 0)。")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        train, test = [], []
+        for template_key in LAYOUTS:
+            for idx in range(args.train + args.files):
+                path = os.path.join(tmp_dir, f"{template_key.replace('/', '_')}_{idx}.pdf")
+                make_fixture(path, template_key, rng, items=rng.randint(1, 6), pages=rng.randint(1, 3))
+                (train if idx < args.train else test).append((path, template_key))
+        print(f"{len(LAYOUTS)} 个模板, 每个模板学习 {args.train} 个样本, 测试 {len(test)} 个文件")
+        print(f"{'参考指纹':<22}{'后端':<12}{'准确率':>8}{'平均(ms)':>10}{'P95(ms)':>10}")
+
+        for backend in ('pymupdf', 'pdfplumber'):
+            classifier = TemplateClassifier(backend=backend)
+            for path, template_key in train:
+                classifier.learn(path, template_key)
+            accuracy, mean_ms, p95_ms = evaluate(classifier, test)
+            print(f"{'表格线 + 文本':<22}{backend:<12}{accuracy:>8.1%}{mean_ms:>10.1f}{p95_ms:>10.1f}")
+
+        # 只有网格缓存中的网格（提取过的模板）：列布局相同的模板只能靠标题标记区分
+        class GridsOnly:
+            def __init__(self, grids):
+                self._grids = grids
+
+            def grids(self):
+                return self._grids
+
+        grids = {}
+        for path, template_key in train:
+            fingerprint = page_fingerprint(path)
+            grids.setdefault(template_key, []).append(
+                {'page_size': fingerprint['page_size'], 'xs': fingerprint['xs']})
+        accuracy, mean_ms, p95_ms = evaluate(TemplateClassifier(grid_cache=GridsOnly(grids)), test)
+        print(f"{'只有表格线(网格缓存)':<22}{'pymupdf':<12}{accuracy:>8.1%}{mean_ms:>10.1f}{p95_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+泰文规范化基准：比较原来按替换表逐项 str.replace 并在每次替换后做音杀符正则修正的实现，
+与 ThaiNormalizer 的 str.translate 分阶段实现（逐个单元格、批量处理整个文档）的吞吐量，并校验结果一致。
+
+单元格为合成的文本层内容：泰文描述中混有PUA字形、旧编码字符、音杀符前的空白，以及纯英文/数字单元格。
+
+用法:
+    python benchmarks/bench_thai_normalizer.py --cells 100000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ThaiNormalizer import DEFAULT_NORMALIZER, THAI_CONSONANTS, THAI_REPLACEMENT_MAP
+
+
+def legacy_replace_pua_thai(text):
+    # 原来 FieldsExtractor.replace_pua_thai 的实现（每次替换后都重新编译并执行修正正则）
+    for pua_char, std_char in THAI_REPLACEMENT_MAP.items():
+        text = text.replace(pua_char, std_char)
+        pattern = re.compile(f'([{THAI_CONSONANTS}])\\s*์')
+        text = pattern.sub(r'\1์', text)
+    return text
+
+
+def make_cell(rng):
+    if rng.random() < 0.5:
+        # 英文、数字单元格
+        return f"{rng.randint(1, 99999):,}.{rng.randint(0, 99):02d}\nMODEL-{rng.randint(0, 999)} KGM"
+    thai = 'สินค้าตัวอย่างกล่องพลาสติก'
+    pieces = []
+    for _ in range(rng.randint(5, 40)):
+        r = rng.random()
+        if r < 0.15:
+            pieces.append(rng.choice(list(THAI_REPLACEMENT_MAP)))
+        elif r < 0.2:
+            pieces.append(rng.choice(THAI_CONSONANTS) + ' ์')
+        elif r < 0.3:
+            pieces.append(' ')
+        else:
+            pieces.append(rng.choice(thai))
+    return ''.join(pieces)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="泰文规范化基准：逐项替换 vs str.translate。")
+    parser.add_argument("--cells", type=int, default=50000, help="单元格数 (默认: 50000)。")
+    parser.add_argument("--rows-per-group", type=int, default=4, help="每个分组的行数 (默认: 4)。")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    cells = [make_cell(rng) for _ in range(args.cells)]
+    size_mb = sum(len(cell.encode('utf-8')) for cell in cells) / 1e6
+
+    start = time.perf_counter()
+    legacy = [legacy_replace_pua_thai(cell) for cell in cells]
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    per_cell = [DEFAULT_NORMALIZER.normalize(cell) for cell in cells]
+    per_cell_seconds = time.perf_counter() - start
+
+    # 按文档的分组结构批量处理：{页码: [{'original_rows': [[单元格, ...], ...]}, ...]}
+    row_size = 4
+    rows = [cells[i:i + row_size] for i in range(0, len(cells), row_size)]
+    groups = {1: [{'original_rows': rows[i:i + args.rows_per_group]}
+                  for i in range(0, len(rows), args.rows_per_group)]}
+    start = time.perf_counter()
+    DEFAULT_NORMALIZER.normalize_groups(groups)
+    batch_seconds = time.perf_counter() - start
+    batched = [cell for group in groups[1] for row in group['original_rows'] for cell in row]
+
+    print(f"{args.cells} 个单元格 ({size_mb:.1f} MB)")
+    print(f"{'实现':<24}{'用时(s)':>10}{'单元格/秒':>14}{'MB/秒':>10}")
+    for label, seconds in (('逐项 replace + 正则', legacy_seconds),
+                           ('translate (逐个单元格)', per_cell_seconds),
+                           ('translate (整个文档)', batch_seconds)):
+        print(f"{label:<24}{seconds:>10.3f}{args.cells / seconds:>14,.0f}{size_mb / seconds:>10.1f}")
+    print(f"结果一致: {legacy == per_cell == batched}")
+
+
+if __name__ == "__main__":
+    main()
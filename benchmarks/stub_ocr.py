@@ -0,0 +1,58 @@
+"""
+确定性的桩OCR引擎，接口与 OcrParser 使用的 PaddleOCR 部分相同（ocr、text_detector、text_recognizer），
+用于在不加载模型的情况下测量表格解析、页面渲染和字段解析的耗时。
+
+识别结果只由图像尺寸和墨迹像素数决定，同一图像总是得到同样的文本。
+环境变量 STUB_OCR_LATENCY_MS 可以为每次检测/识别调用加上固定延迟，模拟模型推理的耗时（工作进程会继承环境变量）。
+
+用法:
+    OcrParser(ocr_engine='stub_ocr:StubOcrEngine')  # benchmarks 目录需要在 sys.path 中
+"""
+import os
+import time
+
+import numpy as np
+
+LATENCY_SECONDS = float(os.environ.get('STUB_OCR_LATENCY_MS', '0')) / 1000
+
+
+def _stub_text(img) -> str:
+    ink = int(np.count_nonzero(np.asarray(img) < 128))
+    return f"S{img.shape[0]}x{img.shape[1]}:{ink}"
+
+
+class _StubDetector:
+    """把图像按高度切成两行文本框，返回 (文本框数组, 耗时)。"""
+    def __call__(self, img):
+        if LATENCY_SECONDS:
+            time.sleep(LATENCY_SECONDS)
+        h, w = img.shape[:2]
+        middle = max(h // 2, 1)
+        boxes = np.array([
+            [[0, 0], [w - 1, 0], [w - 1, middle], [0, middle]],
+            [[0, middle], [w - 1, middle], [w - 1, h - 1], [0, h - 1]],
+        ], dtype=np.float32)
+        return boxes, 0.0
+
+
+class _StubRecognizer:
+    """逐个文本行图像返回 (文本, 置信度)，返回 (结果列表, 耗时)。"""
+    def __call__(self, img_list):
+        if LATENCY_SECONDS:
+            time.sleep(LATENCY_SECONDS)
+        return [(_stub_text(img), 1.0) for img in img_list], 0.0
+
+
+class StubOcrEngine:
+    def __init__(self, lang: str = 'en', **kwargs):
+        self.lang = lang
+        self.drop_score = 0.5
+        self.text_detector = _StubDetector()
+        self.text_recognizer = _StubRecognizer()
+
+    def ocr(self, img, det=True, rec=True, cls=True):
+        """与 PaddleOCR.ocr 相同的返回格式：[[ [文本框, (文本, 置信度)], ... ]]，整个图像作为一行。"""
+        if LATENCY_SECONDS:
+            time.sleep(LATENCY_SECONDS)
+        h, w = img.shape[:2]
+        return [[[[[0, 0], [w, 0], [w, h], [0, h]], (_stub_text(img), 1.0)]]]
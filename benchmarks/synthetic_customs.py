@@ -0,0 +1,204 @@
+"""
+合成报关单PDF生成器：离线生成多页的进口（每个项目4行）和出口（每个项目8行）报关单，用于基准测试和回归比较。
+
+每页有进口/出口报关单标题和一个带完整表格线的项目表，第一行为表头，之后每个项目占 GROUP_SIZE 行，
+单元格内容按 FieldsExtractor 的字段布局填写（编号、HS编码、金额、重量、数量、单位、描述块、发票号等）。
+描述块中的泰文一部分使用标准字符，一部分使用旧式泰文字体的私有区(PUA)字形：
+第二份嵌入的泰文字体的 ToUnicode 表把声调符号等字形映射到PUA码位，文本层中得到的就是 '\\uf70b' 这类字符。
+
+生成结果由随机种子决定，同样的参数总是生成同样的PDF。
+
+用法:
+    python benchmarks/synthetic_customs.py fixtures/ --types import export --pages 1 5 20
+"""
+import argparse
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+
+from TemplateFingerprint import DOC_TYPE_MARKERS
+from ThaiNormalizer import THAI_REPLACEMENT_MAP
+
+PAGE_WIDTH, PAGE_HEIGHT = 842, 595
+TABLE_TOP = 50
+TABLE_BOTTOM = 570
+FONT_SIZE = 6
+LINE_HEIGHT = 7
+THAI_FONT_BUFFER = fitz.Font(script=19).buffer  # 19: 泰文
+
+# 标准泰文字符 -> PUA码位（取替换表中第一个映射到该字符的PUA字形）
+PUA_CODES = {}
+for _pua, _std in THAI_REPLACEMENT_MAP.items():
+    if '\ue000' <= _pua <= '\uf8ff':
+        PUA_CODES.setdefault(_std, _pua)
+
+# 报关单类型 -> (每个项目的行数, 列的x坐标, 每页项目数)
+LAYOUTS = {
+    'import': (4, [20, 95, 175, 255, 420, 490, 560, 630, 700, 770, 822], 5),
+    'export': (8, [20, 150, 250, 330, 420, 510, 600, 700, 822], 2),
+}
+
+GOODS = [
+    ('PLASTIC STORAGE BOX', 'กล่องพลาสติกสำหรับเก็บของ'),
+    ('STEEL HEX SCREW M6', 'สกรูเหล็กหกเหลี่ยม'),
+    ('COPPER WIRE 2.5MM', 'สายไฟทองแดง'),
+    ('LED PANEL LIGHT 40W', 'โคมไฟแอลอีดีแบบแผง'),
+    ('PRINTED CARTON LABEL', 'ฉลากกล่องกระดาษที่พิมพ์แล้ว'),
+    ('RUBBER SEAL RING', 'แหวนยางกันรั่ว'),
+]
+COUNTRIES = ['CN', 'TH', 'JP', 'VN', 'US', 'DE']
+UNITS = ['C62', 'PCE', 'SET', 'KGM']
+
+
+def _money(rng, low, high):
+    return f"{rng.uniform(low, high):,.2f}"
+
+
+def import_cells(rng, no):
+    """进口报关单一个项目的单元格 {(组内行号, 列号): [(文本行, 字体), ...]}。"""
+    english, thai = rng.choice(GOODS)
+    unit = rng.choice(UNITS)
+    return {
+        (0, 0): [(str(no), 'helv'), (f"A{rng.randint(100, 999)}", 'helv')],
+        (0, 1): [(f"{rng.randint(3900, 9900)}.{rng.randint(10, 99)}.{rng.randint(10, 99)}", 'helv')],
+        (0, 2): [('USD', 'helv'), (_money(rng, 10, 90000), 'helv')],
+        (0, 3): [(f"{rng.choice([0, 5, 10, 20])}%", 'helv')],
+        (0, 4): [('ONLINE', 'helv'), (_money(rng, 0, 9000), 'helv')],
+        (0, 5): [('FEE', 'helv'), (_money(rng, 0, 100), 'helv')],
+        (0, 6): [('-', 'helv')],
+        (0, 7): [('0.00', 'helv')],
+        (0, 8): [(_money(rng, 100, 3000000), 'helv')],
+        (1, 0): [(f"{unit}/{rng.choice(UNITS)}", 'helv')],
+        (1, 1): [(_money(rng, 300, 3000000), 'helv')],
+        (1, 2): [(_money(rng, 0, 9000), 'helv')],
+        (1, 3): [('0.00', 'helv')],
+        (1, 4): [('0%', 'helv')],
+        (1, 5): [('0.00', 'helv')],
+        (1, 6): [(_money(rng, 0, 200000), 'helv')],
+        (2, 0): [(rng.choice(['', '001', '019']), 'helv')],
+        (2, 1): [(f"{rng.uniform(0.1, 900):.3f} KGM", 'helv')],
+        (2, 2): [(f"{rng.randint(1, 5000):,} {unit}", 'helv')],
+        (2, 3): [(english, 'helv'), (thai, 'thai'), (rng.choice(COUNTRIES), 'helv'),
+                 (f"MDL-{rng.randint(100, 9999)}", 'helv'), ('Origin Criteria WO', 'helv')],
+        (3, 0): [(f"T8INV{rng.randint(1000, 9999)}", 'helv'), ('ใบกำกับสินค้า', 'thai')],
+    }
+
+
+def export_cells(rng, no):
+    """出口报关单一个项目的单元格 {(组内行号, 列号): [(文本行, 字体), ...]}。"""
+    english, thai = rng.choice(GOODS)
+    unit = rng.choice(UNITS)
+    return {
+        (0, 0): [(str(no), 'helv'), (f"E{rng.randint(100, 999)}", 'helv')],
+        (0, 1): [('-', 'helv')],
+        (0, 2): [(str(rng.randint(1, 500)), 'helv'), ('CT', 'helv'), ('กล่อง', 'thai')],
+        (0, 3): [(f"{rng.uniform(0.1, 900):.3f} KGM", 'helv')],
+        (0, 4): [('USD', 'helv'), (_money(rng, 10, 90000), 'helv')],
+        (0, 5): [(rng.choice(['', '002', '019']), 'helv')],
+        (1, 0): [(f"{rng.randint(1, 5000):,} {unit}", 'helv')],
+        (2, 0): [('THB', 'helv'), (_money(rng, 300, 3000000), 'helv')],
+        (3, 0): [(english, 'helv'), (thai, 'thai'), (f"Origin : {rng.choice(COUNTRIES)}", 'helv'),
+                 (f"Pur.Country : {rng.choice(COUNTRIES)}", 'helv'), (f"MDL-{rng.randint(100, 9999)}", 'helv'),
+                 (f"INV{rng.randint(1000, 9999)}-BOI", 'helv')],
+        (4, 0): [(f"{rng.choice([0, 5])}%", 'helv')],
+        (5, 0): [('0.00', 'helv')],
+        (6, 0): [(f"{rng.randint(3900, 9900)}.{rng.randint(10, 99)}.{rng.randint(10, 99)}", 'helv'),
+                 (f"{unit}/{rng.choice(UNITS)}", 'helv')],
+        (6, 1): [('0.00', 'helv')],
+    }
+
+
+def _use_pua_font(doc, font_xref):
+    """把字体的 ToUnicode 表中映射到 PUA_CODES 中标准字符的字形改为映射到PUA码位（只处理单个字形的 bfchar 项）。"""
+    tounicode = re.search(r'/ToUnicode (\d+) 0 R', doc.xref_object(font_xref))
+    if tounicode is None:
+        return
+    xref = int(tounicode.group(1))
+
+    def to_pua(match):
+        char = chr(int(match.group(2), 16))
+        return f"<{match.group(1)}> <{ord(PUA_CODES[char]):04x}>" if char in PUA_CODES else match.group(0)
+    cmap = doc.xref_stream(xref).decode('latin-1')
+    doc.update_stream(xref, re.sub(r'<([0-9a-fA-F]{4})> <([0-9a-fA-F]{4})>(?=\s)', to_pua, cmap).encode('latin-1'))
+
+
+def make_declaration(path: str, doc_type: str = 'import', pages: int = 3, items_per_page: int = None,
+                     seed: int = 0, pua_ratio: float = 0.5) -> dict:
+    """
+    生成一份合成报关单PDF。
+
+    :param doc_type: 'import'（每个项目4行）或 'export'（每个项目8行）。
+    :param items_per_page: 每页项目数，默认使用 LAYOUTS 中的值。
+    :param pua_ratio: 泰文行使用PUA字形字体的比例。
+    :return: {'path', 'doc_type', 'pages', 'items', 'group_size'}
+    """
+    group_size, columns, default_items = LAYOUTS[doc_type]
+    items_per_page = items_per_page or default_items
+    make_cells = import_cells if doc_type == 'import' else export_cells
+    rng = random.Random(seed)
+    doc = fitz.open()
+    pua_font_xref = None
+    item_no = 0
+    for _ in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_font(fontname='thai', fontbuffer=THAI_FONT_BUFFER)
+        # 与标准字体内容相同但 ToUnicode 表不同的第二份字体（末尾多一个字节，PyMuPDF 会单独嵌入）
+        pua_font_xref = page.insert_font(fontname='thaipua', fontbuffer=THAI_FONT_BUFFER + b'\0')
+        page.insert_text((20, 28), DOC_TYPE_MARKERS[doc_type], fontsize=11, fontname='thaipua')
+        page.insert_text((300, 28), f"SYNTHETIC CUSTOMS DECLARATION {doc_type.upper()}", fontsize=9)
+
+        rows = 1 + items_per_page * group_size
+        row_height = (TABLE_BOTTOM - TABLE_TOP) / rows
+        for r in range(rows + 1):
+            y = TABLE_TOP + r * row_height
+            page.draw_line((columns[0], y), (columns[-1], y), width=0.5)
+        for x in columns:
+            page.draw_line((x, TABLE_TOP), (x, TABLE_TOP + rows * row_height), width=0.5)
+        page.insert_text((columns[0] + 2, TABLE_TOP + 8), 'ITEM', fontsize=FONT_SIZE)
+
+        for item_idx in range(items_per_page):
+            item_no += 1
+            first_row = 1 + item_idx * group_size
+            for (row, col), lines in make_cells(rng, item_no).items():
+                # 行数多的单元格缩小行距和字号，文字不超出单元格
+                line_height = min(LINE_HEIGHT, (row_height - 2) / len(lines))
+                font_size = min(FONT_SIZE, line_height * 0.85)
+                x = columns[col] + 2
+                y = TABLE_TOP + (first_row + row) * row_height + line_height
+                for line_idx, (text, font) in enumerate(lines):
+                    if not text:
+                        continue
+                    if font == 'thai' and rng.random() < pua_ratio:
+                        font = 'thaipua'
+                    page.insert_text((x, y + line_idx * line_height), text, fontsize=font_size, fontname=font)
+    if pua_font_xref:
+        _use_pua_font(doc, pua_font_xref)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+    return {'path': path, 'doc_type': doc_type, 'pages': pages, 'items': item_no, 'group_size': group_size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成报关单PDF。")
+    parser.add_argument("output_dir", help="输出目录。")
+    parser.add_argument("--types", nargs='+', choices=sorted(LAYOUTS), default=['import', 'export'], help="报关单类型。")
+    parser.add_argument("--pages", type=int, nargs='+', default=[1, 5], help="页数，每个值生成一份PDF (默认: 1 5)。")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子 (默认: 0)。")
+    parser.add_argument("--pua-ratio", type=float, default=0.5, help="泰文行使用PUA字形的比例 (默认: 0.5)。")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for doc_type in args.types:
+        for pages in args.pages:
+            path = os.path.join(args.output_dir, f"synthetic_{doc_type}_{pages}p.pdf")
+            info = make_declaration(path, doc_type, pages, seed=args.seed, pua_ratio=args.pua_ratio)
+            print(f"{path}: {info['pages']} 页, {info['items']} 个项目")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,9 @@ a = Analysis(['ui.py'],
      ('C:/Users/redmiG/anaconda3/envs/pdfOCR/Lib/site-packages/pypdfium2_raw', 'pypdfium2_raw'),
      ('C:/Users/redmiG/anaconda3/envs/pdfOCR/Lib/site-packages/paddleocr/ppocr', 'ppocr'),
      ('C:/Users/redmiG/anaconda3/envs/pdfOCR/Lib/site-packages/paddleocr/tools', 'tools')],
-     hiddenimports=['pdfplumber', 'pypdfium2', 'pypdfium2_raw'],
+     hiddenimports=['pdfplumber', 'pypdfium2', 'pypdfium2_raw',
+                    # 模板模块按名称注册（见 ExtractorFactory.BUILTIN_TEMPLATES），静态分析找不到
+                    'ExtractorImportTemplate', 'ExtractorExportTemplate'],
      hookspath=['.'],
      runtime_hooks=[],
      excludes=['matplotlib'],
@@ -0,0 +1,16 @@
+"""BatchExtractor 跳过无法创建提取器的文档，其余文档不受影响。"""
+import json
+
+from BatchExtractor import BatchExtractor
+
+
+def test_unknown_doc_type_is_skipped(tmp_path):
+    pdf_path = tmp_path / 'a.pdf'
+    pdf_path.write_bytes(b'%PDF-1.4')
+    batch = BatchExtractor({'*': 'bogus/TianShi'}, output_dir=str(tmp_path / 'out'))
+    summary = batch.run([str(pdf_path)])
+    assert summary['skipped'] == 1 and summary['failed'] == 0
+    assert summary['documents'][0]['status'] == 'skipped'
+    assert 'bogus' in summary['documents'][0]['error']
+    saved = json.loads((tmp_path / 'out' / BatchExtractor.SUMMARY_FILENAME).read_text(encoding='utf-8'))
+    assert saved['skipped'] == 1
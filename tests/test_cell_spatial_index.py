@@ -0,0 +1,99 @@
+"""CellSpatialIndex 与 CustomsFormCorrector 原来的嵌套循环给出完全相同的单元格。"""
+import random
+
+import pytest
+
+from PageLayout import CellSpatialIndex, TableLayout
+
+
+def nested_loop_lookup(tables, x, y):
+    """CustomsFormCorrector.correct 原来的定位方式：按 表格→行→列 逐个比较，返回第一个匹配的单元格。"""
+    for t_idx, table in enumerate(tables):
+        for r_idx, row in enumerate(table.rows):
+            for c_idx, cell_bbox in enumerate(row):
+                if (cell_bbox and
+                        cell_bbox[0] <= x < cell_bbox[2] and
+                        cell_bbox[1] <= y < cell_bbox[3]):
+                    return (t_idx, r_idx, c_idx)
+    return None
+
+
+def grid_tables(rng, tables=2, rows=12, cols=8, merge_ratio=0.2):
+    """上下排列的规则表格，部分单元格向右合并（被合并的位置为None）。"""
+    layouts = []
+    top = 20.0
+    for _ in range(tables):
+        table_rows = []
+        for r in range(rows):
+            y0, y1 = top + r * 6.5, top + (r + 1) * 6.5
+            row = []
+            c = 0
+            while c < cols:
+                span = 2 if c + 1 < cols and rng.random() < merge_ratio else 1
+                row.append((10.0 + c * 20.0, y0, 10.0 + (c + span) * 20.0, y1))
+                row.extend([None] * (span - 1))
+                c += span
+            table_rows.append(row)
+        layouts.append(TableLayout(None, table_rows, None))
+        top += rows * 6.5 + 15.0
+    return layouts
+
+
+def overlapping_tables(rng, tables=3, rows=5, cols=5):
+    """坐标取自少量整数的随机矩形：单元格之间大量重叠、嵌套和共享边界，也有空单元格和零宽单元格。"""
+    coords = [float(v) for v in range(0, 60, 6)]
+    layouts = []
+    for _ in range(tables):
+        table_rows = []
+        for _ in range(rows):
+            row = []
+            for _ in range(cols):
+                if rng.random() < 0.1:
+                    row.append(None)
+                    continue
+                x0, x1 = sorted(rng.sample(coords, 2))
+                y0, y1 = sorted(rng.sample(coords, 2))
+                if rng.random() < 0.05:
+                    x1 = x0
+                row.append((x0, y0, x1, y1))
+            table_rows.append(row)
+        layouts.append(TableLayout(None, table_rows, None))
+    return layouts
+
+
+def query_points(rng, tables, count=2000):
+    cells = [cell for table in tables for row in table.rows for cell in row if cell]
+    max_x = max(cell[2] for cell in cells) + 5
+    max_y = max(cell[3] for cell in cells) + 5
+    points = [(rng.uniform(-5, max_x), rng.uniform(-5, max_y)) for _ in range(count)]
+    # 恰好落在单元格边界和角上的点，检验半开区间的处理
+    for x0, y0, x1, y1 in cells:
+        points += [(x0, y0), (x1, y1), (x0, y1), (x1, y0), ((x0 + x1) / 2, y0), (x0, (y0 + y1) / 2)]
+    return points
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('make_tables', [grid_tables, overlapping_tables])
+def test_lookup_matches_nested_loop(make_tables, seed):
+    rng = random.Random(seed)
+    tables = make_tables(rng)
+    index = CellSpatialIndex(tables)
+    for x, y in query_points(rng, tables):
+        assert index.lookup(x, y) == nested_loop_lookup(tables, x, y), (x, y)
+
+
+def test_nested_cells_resolve_to_the_first_in_loop_order():
+    outer = (0.0, 0.0, 100.0, 100.0)
+    inner = (10.0, 10.0, 20.0, 20.0)
+    tables = [TableLayout(None, [[inner, outer]], None), TableLayout(None, [[outer]], None)]
+    index = CellSpatialIndex(tables)
+    assert index.lookup(15, 15) == (0, 0, 0)
+    assert index.lookup(50, 50) == (0, 0, 1)
+    tables = [TableLayout(None, [[outer], [inner]], None)]
+    assert CellSpatialIndex(tables).lookup(15, 15) == (0, 0, 0)
+
+
+def test_empty_page():
+    index = CellSpatialIndex([])
+    assert index.lookup(10, 10) is None
+    assert CellSpatialIndex([TableLayout(None, [[None, None]], None)]).lookup(0, 0) is None
@@ -0,0 +1,55 @@
+"""CustomsFormCorrector 的后台预取与按需提取结果一致。"""
+import time
+
+import pytest
+
+fitz = pytest.importorskip('fitz')
+from CustomsFormCorrector import CustomsFormCorrector
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / 'doc.pdf'
+    doc = fitz.open()
+    for page_idx in range(12):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"PAGE {page_idx} USD 1,\x15{page_idx}5.00")
+        page.insert_text((72, 300), f"KGM {page_idx}.\x15\x150")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def test_prefetched_blocks_match_in_process_extraction(pdf_path):
+    with CustomsFormCorrector(pdf_path) as reference:
+        expected = {page_num: reference._get_fitz_blocks(page_num) for page_num in range(12)}
+    assert any('2' in block['text'] for block in expected[0])
+
+    corrector = CustomsFormCorrector(pdf_path)
+    corrector.prefetch(range(12))
+    futures = set(corrector._prefetch_futures.values())
+    deadline = time.monotonic() + 60
+    while not all(future.done() for future in futures) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert {page_num: corrector._get_fitz_blocks(page_num) for page_num in range(12)} == expected
+    assert corrector.prefetch_hits == 12
+    # 使用过的预取结果不再保留
+    assert not corrector._prefetch_futures
+    corrector.close()
+    assert corrector._prefetch_executor is None
+
+
+def test_pages_not_yet_prefetched_are_extracted_in_process(pdf_path):
+    corrector = CustomsFormCorrector(pdf_path)
+    corrector.prefetch(range(12))
+    # 不等待后台进程：尚未就绪的页面立即在当前进程中提取
+    blocks = corrector._get_fitz_blocks(0)
+    corrector.close()
+    with CustomsFormCorrector(pdf_path) as reference:
+        assert blocks == reference._get_fitz_blocks(0)
+
+
+def test_small_documents_do_not_start_a_prefetch_process(pdf_path):
+    with CustomsFormCorrector(pdf_path) as corrector:
+        corrector.prefetch(range(CustomsFormCorrector.PREFETCH_MIN_PAGES - 1))
+        assert corrector._prefetch_executor is None
@@ -0,0 +1,146 @@
+"""OcrCache 的键、LRU淘汰以及多线程/多进程并发读写。"""
+import itertools
+import multiprocessing
+import threading
+import types
+
+import numpy as np
+import pytest
+
+import OcrCache as ocr_cache_module
+from OcrCache import OcrCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """单调递增的假时钟，避免同一时刻写入的条目访问时间相同。"""
+    ticks = itertools.count(1)
+    monkeypatch.setattr(ocr_cache_module, 'time', types.SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def test_make_key_depends_on_pixels_shape_dtype_and_settings():
+    image = np.zeros((4, 6), dtype=np.uint8)
+    key = OcrCache.make_key(image, 'lang=en')
+    assert key == OcrCache.make_key(image.copy(), 'lang=en')
+    assert key != OcrCache.make_key(image, 'lang=th')
+    assert key != OcrCache.make_key(image.reshape(6, 4), 'lang=en')
+    assert key != OcrCache.make_key(image.astype(np.uint16), 'lang=en')
+    changed = image.copy()
+    changed[0, 0] = 1
+    assert key != OcrCache.make_key(changed, 'lang=en')
+
+
+def test_round_trip_and_stats(tmp_path):
+    cache = OcrCache(str(tmp_path))
+    cache.put_many({'a': 'USD', 'b': ''})
+    assert cache.get_many(['a', 'b', 'c']) == {'a': 'USD', 'b': ''}
+    assert cache.get('c') is None
+    stats = cache.stats()
+    assert (stats['entries'], stats['hits'], stats['misses']) == (2, 2, 2)
+    cache.close()
+    # 重新打开后数据仍在
+    reopened = OcrCache(str(tmp_path))
+    assert reopened.get('a') == 'USD'
+    reopened.close()
+
+
+def test_evicts_least_recently_used_down_to_90_percent(tmp_path, clock):
+    entry_size = len('k0') + 8
+    cache = OcrCache(str(tmp_path), max_bytes=entry_size * 10)
+    for i in range(10):
+        cache.put(f"k{i}", 'x' * 8)
+    assert cache.stats()['entries'] == 10
+    # 读取最早写入的条目，使它成为最近访问的条目
+    assert cache.get('k0') == 'x' * 8
+    cache.put('k10', 'y' * 8)
+    remaining = set(cache.get_many([f"k{i}" for i in range(11)]))
+    # 超过上限后删除最久未访问的条目，直到不超过上限的90%
+    assert cache.stats()['bytes'] <= entry_size * 9
+    assert {'k0', 'k10'} <= remaining
+    assert 'k1' not in remaining and 'k2' not in remaining
+    cache.close()
+
+
+def test_threads_share_one_instance(tmp_path):
+    cache = OcrCache(str(tmp_path))
+    errors = []
+
+    def work(thread_idx):
+        try:
+            for i in range(50):
+                cache.put_many({f"t{thread_idx}-{i}": str(i)})
+                assert cache.get(f"t{thread_idx}-{i}") == str(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(t,)) for t in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert cache.stats()['entries'] == 8 * 50
+    cache.close()
+
+
+def _write_from_process(args):
+    cache_dir, worker_idx = args
+    cache = OcrCache(cache_dir)
+    for start in range(0, 200, 20):
+        cache.put_many({f"p{worker_idx}-{i}": f"text {worker_idx} {i}" for i in range(start, start + 20)})
+        cache.get_many([f"p{(worker_idx + 1) % 4}-{i}" for i in range(start, start + 20)])
+    cache.close()
+    return worker_idx
+
+
+def test_processes_share_one_cache_file(tmp_path):
+    cache_dir = str(tmp_path)
+    OcrCache(cache_dir).close()
+    with multiprocessing.get_context('spawn').Pool(4) as pool:
+        assert sorted(pool.map(_write_from_process, [(cache_dir, i) for i in range(4)])) == [0, 1, 2, 3]
+    cache = OcrCache(cache_dir)
+    keys = [f"p{w}-{i}" for w in range(4) for i in range(200)]
+    found = cache.get_many(keys)
+    assert len(found) == len(keys)
+    assert found['p3-199'] == 'text 3 199'
+    cache.close()
+
+
+
+def test_put_does_not_scan_the_table(tmp_path):
+    cache = OcrCache(str(tmp_path), max_bytes=10_000)
+    cache.put_many({f"k{i}": 'x' * 8 for i in range(20)})
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+    for i in range(20):
+        # 覆盖已有条目只计入新旧大小之差
+        cache.put(f"k{i}", 'y' * 9 if i < 10 else 'y' * 8)
+    cache._conn.set_trace_callback(None)
+    assert not [sql for sql in statements if 'SUM(' in sql]
+    actual = cache._conn.execute("SELECT SUM(size) FROM entries").fetchone()[0]
+    assert cache.stats()['bytes'] == actual == 210 + 10
+    cache.close()
+
+
+def test_total_size_survives_reopen_and_clear(tmp_path):
+    cache = OcrCache(str(tmp_path))
+    cache.put_many({f"k{i}": 'x' * 8 for i in range(5)})
+    cache.close()
+    cache = OcrCache(str(tmp_path))
+    assert cache.stats()['bytes'] == 5 * 10
+    cache.clear()
+    assert cache.stats()['bytes'] == 0
+    cache.close()
+
+
+def test_writes_from_other_instances_count_toward_the_limit(tmp_path, clock):
+    entry_size = len('a0') + 8
+    first = OcrCache(str(tmp_path), max_bytes=entry_size * 10)
+    second = OcrCache(str(tmp_path), max_bytes=entry_size * 10)
+    first.put_many({f"a{i}": 'x' * 8 for i in range(6)})
+    second.put_many({f"b{i}": 'x' * 8 for i in range(6)})
+    # second 自己只写入了6条，但总大小包含 first 的写入，因此同样会淘汰
+    assert second.stats()['bytes'] <= entry_size * 9
+    assert first.get('a0') is None
+    first.close()
+    second.close()
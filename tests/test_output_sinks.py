@@ -0,0 +1,68 @@
+"""逐条写出的输出格式与一次性写出整个列表的结果一致。"""
+import csv
+import json
+
+import pytest
+
+from FieldsExtractor import ExportFields, ImportFields
+from OutputSinks import CsvSink, JsonArraySink, NdjsonSink
+
+
+def make_items(count):
+    items = []
+    for i in range(count):
+        item = ImportFields() if i % 2 == 0 else ExportFields()
+        item.NO = str(i + 1)
+        item.DESCRIPTION = f'"GLASS" BOTTLE 500ML\\{i}\nMODEL: MDL-{i}'
+        item.DESCRIPTION_TH = 'ขวดแก้ว ์ ่ ้ 中文'
+        item.HS_CODE = '3923.10.90'
+        item.AMOUNT_USD = '1,234.50'
+        items.append(item)
+    return items
+
+
+def reference_json(items):
+    """原来一次性写出的实现。"""
+    return json.dumps([item.__dict__ for item in items], ensure_ascii=False, indent=2)
+
+
+@pytest.mark.parametrize('count', [0, 1, 2, 7])
+def test_json_array_sink_is_byte_identical_to_json_dump(tmp_path, count):
+    items = make_items(count)
+    path = tmp_path / 'out.json'
+    with JsonArraySink(str(path)) as sink:
+        sink.open()
+        for item in items:
+            sink.write(item)
+            sink.flush()
+    assert path.read_bytes() == reference_json(items).encode('utf-8')
+
+
+def test_sink_without_items_creates_no_file(tmp_path):
+    path = tmp_path / 'sub' / 'out.json'
+    with JsonArraySink(str(path)):
+        pass
+    assert not path.exists()
+
+
+def test_ndjson_sink_is_readable_after_each_flush(tmp_path):
+    items = make_items(3)
+    path = tmp_path / 'out.ndjson'
+    with NdjsonSink(str(path)) as sink:
+        for count, item in enumerate(items, 1):
+            sink.write(item)
+            sink.flush()
+            lines = path.read_text(encoding='utf-8').splitlines()
+            assert [json.loads(line) for line in lines] == [item.__dict__ for item in items[:count]]
+
+
+def test_csv_sink_writes_header_and_rows(tmp_path):
+    items = make_items(3)
+    path = tmp_path / 'out.csv'
+    headers = ['NO', 'DESCRIPTION', 'DESCRIPTION_TH']
+    with CsvSink(str(path), headers, lambda item: [getattr(item, name) for name in headers]) as sink:
+        for item in items:
+            sink.write(item)
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows == [headers] + [[getattr(item, name) for name in headers] for item in items]
@@ -0,0 +1,57 @@
+"""TemplateClassifier 的置信度规则。"""
+from TemplateFingerprint import MIN_CONFIDENCE, MIN_SCORE, TemplateClassifier
+
+XS = [30.0, 90.0, 170.0, 250.0, 330.0, 410.0, 490.0, 570.0, 650.0, 730.0]
+
+
+class StubGridCache:
+    """只提供 grids() 的网格缓存，网格作为只有表格线的参考指纹。"""
+    def __init__(self, grids):
+        self._grids = grids
+
+    def grids(self):
+        return self._grids
+
+
+def fingerprint(xs, doc_type='import'):
+    return {'doc_type': doc_type, 'page_size': [842.0, 595.0], 'xs': xs, 'tokens': []}
+
+
+def classifier(*templates):
+    return TemplateClassifier(grid_cache=StubGridCache({
+        key: [{'page_size': [842.0, 595.0], 'xs': xs}] for key, xs in templates
+    }))
+
+
+def test_single_candidate_with_a_full_match_is_confident():
+    match = classifier(('import/TianShi', XS)).classify_fingerprint(fingerprint(XS))
+    assert (match.doc_type, match.template) == ('import', 'TianShi')
+    assert match.confidence == match.score == 1.0
+
+
+def test_single_candidate_with_a_weak_match_has_zero_confidence():
+    # 只有一半的竖线对得上：没有其他候选模板时得分差等于得分本身，不能据此自动选择
+    match = classifier(('import/TianShi', XS)).classify_fingerprint(fingerprint(XS[:5] + [x + 7 for x in XS[5:]]))
+    assert match.template == 'TianShi'
+    assert MIN_CONFIDENCE <= match.score < MIN_SCORE
+    assert match.confidence == 0.0
+
+
+def test_import_export_marker_leaves_one_candidate():
+    match = classifier(('import/TianShi', XS), ('export/TianShi', XS[:4])).classify_fingerprint(
+        fingerprint(XS[:4] + [x + 7 for x in XS[4:]], doc_type='import'))
+    assert match.doc_type == 'import'
+    assert match.score < MIN_SCORE
+    assert match.confidence == 0.0
+
+
+def test_confidence_is_the_margin_over_the_runner_up():
+    other = XS[:8] + [x + 7 for x in XS[8:]]
+    match = classifier(('import/TianShi', XS), ('import/LSS', other)).classify_fingerprint(fingerprint(XS))
+    assert match.template == 'TianShi'
+    assert match.confidence == match.score - 0.8
+
+
+def test_no_references():
+    match = classifier().classify_fingerprint(fingerprint(XS, doc_type='export'))
+    assert match == ('export', None, 0.0, 0.0)
@@ -0,0 +1,155 @@
+"""TemplateGridCache 的命中、未命中、失效回退和持久化。"""
+import json
+
+import pytest
+
+fitz = pytest.importorskip('fitz')
+pdfplumber = pytest.importorskip('pdfplumber')
+from PageLayout import PageLayout, TemplateGridCache
+from RunMetrics import StageTimer
+
+XS = [50, 150, 300, 450]
+YS = [100, 130, 160, 190, 220]
+
+
+def draw_grid(page, xs, ys, missing=(), label=''):
+    """
+    画表格线并在每个单元格中写入文字。
+    :param missing: 不画的竖线段 {(竖线序号, 行号)}，用来合并同一行中相邻的两个单元格。
+    """
+    for y in ys:
+        page.draw_line((xs[0], y), (xs[-1], y))
+    for i, x in enumerate(xs):
+        for row in range(len(ys) - 1):
+            if (i, row) not in missing:
+                page.draw_line((x, ys[row]), (x, ys[row + 1]))
+    for row in range(len(ys) - 1):
+        for col in range(len(xs) - 1):
+            page.insert_text((xs[col] + 4, ys[row] + 18), f"{label}R{row}C{col}", fontsize=9)
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    def make(pages, name='doc.pdf'):
+        path = tmp_path / name
+        doc = fitz.open()
+        for spec in pages:
+            draw_grid(doc.new_page(), **spec)
+        doc.save(str(path))
+        doc.close()
+        return str(path)
+    return make
+
+
+def layout_pages(cache, pdf_path, key='import/TianShi', timer=None):
+    with pdfplumber.open(pdf_path) as pdf:
+        return [cache.layout_for_page(key, page_num, page, timer=timer) for page_num, page in enumerate(pdf.pages)]
+
+
+def reference_layouts(pdf_path):
+    with pdfplumber.open(pdf_path) as pdf:
+        return [PageLayout.from_plumber_page(page_num, page) for page_num, page in enumerate(pdf.pages)]
+
+
+def assert_same_layout(actual, expected):
+    assert len(actual.tables) == len(expected.tables)
+    for table, expected_table in zip(actual.tables, expected.tables):
+        assert table.rows == expected_table.rows
+        assert table.texts == expected_table.texts
+
+
+def test_hit_extracts_the_same_text_as_find_tables(make_pdf):
+    pdf_path = make_pdf([dict(xs=XS, ys=YS, label=f"P{i}") for i in range(3)])
+    cache = TemplateGridCache()
+    timer = StageTimer()
+    layouts = layout_pages(cache, pdf_path, timer=timer)
+    assert (cache.misses, cache.hits) == (1, 2)
+    assert timer.calls('find_tables') == 1
+    for layout, expected in zip(layouts, reference_layouts(pdf_path)):
+        assert_same_layout(layout, expected)
+    assert layouts[2].tables[0].texts[0][0] == 'P2R0C0'
+
+
+@pytest.mark.parametrize('changed', [
+    dict(xs=[50, 150, 320, 450], ys=YS),            # 竖线位置移动
+    dict(xs=XS, ys=[100, 130, 160, 190, 220, 250]),  # 多一条横线
+    dict(xs=XS, ys=YS, missing={(2, 1)}),            # 线条位置相同，但第2行合并了两个单元格
+])
+def test_changed_grid_falls_back_to_find_tables(make_pdf, changed):
+    pdf_path = make_pdf([dict(xs=XS, ys=YS), dict(changed, label='X'), dict(xs=XS, ys=YS)])
+    cache = TemplateGridCache()
+    timer = StageTimer()
+    layouts = layout_pages(cache, pdf_path, timer=timer)
+    # 变化的页面重新执行 find_tables 并学习新变体，之后原网格仍然命中
+    assert (cache.misses, cache.hits) == (2, 1)
+    assert timer.calls('find_tables') == 2
+    assert cache.stats()['templates'] == {'import/TianShi': 2}
+    for layout, expected in zip(layouts, reference_layouts(pdf_path)):
+        assert_same_layout(layout, expected)
+
+
+def test_merged_cell_is_not_served_from_the_unmerged_grid(make_pdf):
+    pdf_path = make_pdf([dict(xs=XS, ys=YS), dict(xs=XS, ys=YS, missing={(2, 1)})])
+    cache = TemplateGridCache()
+    merged = layout_pages(cache, pdf_path)[1]
+    expected = reference_layouts(pdf_path)[1]
+    assert_same_layout(merged, expected)
+    assert None in merged.tables[0].rows[1]
+
+
+def test_keeps_at_most_max_variants(make_pdf):
+    grids = [dict(xs=[50, 150 + 10 * i, 300, 450], ys=YS) for i in range(6)]
+    pdf_path = make_pdf(grids + [grids[0], grids[5]])
+    cache = TemplateGridCache(max_variants=4)
+    layout_pages(cache, pdf_path)
+    assert cache.stats()['templates'] == {'import/TianShi': 4}
+    # 最早学习的变体已被淘汰，再次出现时重新学习；最近的变体仍然命中
+    assert (cache.misses, cache.hits) == (7, 1)
+
+
+def test_templates_do_not_share_grids(make_pdf):
+    pdf_path = make_pdf([dict(xs=XS, ys=YS)])
+    cache = TemplateGridCache()
+    layout_pages(cache, pdf_path, key='import/TianShi')
+    layout_pages(cache, pdf_path, key='import/LSS')
+    assert (cache.misses, cache.hits) == (2, 0)
+
+
+def test_grids_persist_across_instances(make_pdf, tmp_path):
+    pdf_path = make_pdf([dict(xs=XS, ys=YS)])
+    path = tmp_path / 'cache' / 'grids.json'
+    layout_pages(TemplateGridCache(str(path)), pdf_path)
+    assert path.exists()
+    assert not (tmp_path / 'cache' / 'grids.json.tmp').exists()
+
+    reloaded = TemplateGridCache(str(path))
+    timer = StageTimer()
+    layout = layout_pages(reloaded, pdf_path, timer=timer)[0]
+    assert (reloaded.misses, reloaded.hits) == (0, 1)
+    assert timer.calls('find_tables') == 0
+    assert_same_layout(layout, reference_layouts(pdf_path)[0])
+
+
+def test_grids_without_spans_are_relearned(make_pdf, tmp_path):
+    pdf_path = make_pdf([dict(xs=XS, ys=YS)])
+    path = tmp_path / 'grids.json'
+    layout_pages(TemplateGridCache(str(path)), pdf_path)
+    grids = json.loads(path.read_text())
+    for grid in grids['import/TianShi']:
+        del grid['x_spans'], grid['y_spans']
+    path.write_text(json.dumps(grids))
+
+    cache = TemplateGridCache(str(path))
+    layout_pages(cache, pdf_path)
+    assert (cache.misses, cache.hits) == (1, 0)
+
+
+@pytest.mark.parametrize('content', ['{"import/TianShi": [', ''])
+def test_corrupt_file_starts_empty(make_pdf, tmp_path, content):
+    pdf_path = make_pdf([dict(xs=XS, ys=YS)])
+    path = tmp_path / 'grids.json'
+    path.write_text(content)
+    cache = TemplateGridCache(str(path))
+    assert cache.grids() == {}
+    layout_pages(cache, pdf_path)
+    assert 'import/TianShi' in json.loads(path.read_text())
@@ -0,0 +1,40 @@
+"""
+模板字段解析的回归测试：golden/template_groups.json 中的分组（OCR结果 + 文本层）由声明式模板重构之前的
+逐模板解析代码解析，记录了每个内置模板的全部字段值（解析出错的分组记录异常类型）。
+声明式模板 (TemplateSpec) 和泰文规范化 (ThaiNormalizer) 的输出必须与之完全相同。
+"""
+import copy
+import json
+import os
+
+import pytest
+
+from ExtractorFactory import BUILTIN_TEMPLATES, ExtractorFactory
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden', 'template_groups.json')
+
+with open(GOLDEN_PATH, 'r', encoding='utf-8') as f:
+    GOLDEN = json.load(f)
+
+
+@pytest.mark.parametrize('doc_type,name', [(doc_type, name) for doc_type, name, _ in BUILTIN_TEMPLATES])
+def test_builtin_template_matches_golden(doc_type, name, tmp_path):
+    extractor = ExtractorFactory.create_extractor(name, str(tmp_path / 'golden.pdf'), output_dir=str(tmp_path), type=doc_type)
+    groups = GOLDEN['groups'][doc_type]
+    expected = GOLDEN['expected'][f"{doc_type}/{name}"]
+    assert len(groups) == len(expected)
+    for index, (group, fields) in enumerate(zip(groups, expected)):
+        try:
+            result = extractor._parse_group_to_fields(copy.deepcopy(group)).__dict__
+        except Exception as e:
+            result = {'error': type(e).__name__}
+        assert result == fields, f"{doc_type}/{name} 第 {index} 个分组的解析结果与 golden 不一致"
+
+
+def test_golden_covers_all_builtin_templates():
+    assert set(GOLDEN['expected']) == {f"{doc_type}/{name}" for doc_type, name, _ in BUILTIN_TEMPLATES}
+
+
+def test_derived_spec_is_compiled_once():
+    _, spec = ExtractorFactory.resolve_template('import', 'TianShi')
+    assert spec.compile() is spec.compile()
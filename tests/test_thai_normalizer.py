@@ -0,0 +1,74 @@
+"""ThaiNormalizer 与原来逐项 str.replace + 每次替换后修正音杀符的实现必须完全等价。"""
+import random
+import re
+
+import pytest
+
+from ThaiNormalizer import THAI_CONSONANTS, THAI_REPLACEMENT_MAP, ThaiNormalizer, normalize_thai
+
+_OLD_THANTHAKHAT_GAP = re.compile(f'([{THAI_CONSONANTS}])\\s*์')
+
+
+def reference_normalize(text, replacement_map=THAI_REPLACEMENT_MAP):
+    """重构前 FieldsExtractor.replace_pua_thai 的实现。"""
+    for pua_char, std_char in replacement_map.items():
+        text = text.replace(pua_char, std_char)
+        text = _OLD_THANTHAKHAT_GAP.sub(r'\1์', text)
+    return text
+
+
+# 随机字符串的字符集：替换表的键和值、辅音、音杀符、各种空白、普通泰文和ASCII
+ALPHABET = (list(THAI_REPLACEMENT_MAP) + list(THAI_REPLACEMENT_MAP.values()) + list(THAI_CONSONANTS[:12]) +
+            ['์', '์', ' ', ' ', '\n', '\t', ' ', 'า', 'ิ', 'A', '1', '/', '\x00'])
+
+
+def random_strings(seed, count, max_length=24, alphabet=ALPHABET):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length))) for _ in range(count)]
+
+
+def test_normalize_matches_reference():
+    normalizer = ThaiNormalizer()
+    for text in random_strings(0, 20000):
+        assert normalizer.normalize(text) == reference_normalize(text), repr(text)
+
+
+def test_default_helper_uses_default_map():
+    text = 'ก  \x9e ์'
+    assert normalize_thai(text) == reference_normalize(text)
+
+
+def test_normalize_cells_matches_per_cell():
+    normalizer = ThaiNormalizer()
+    rng = random.Random(1)
+    texts = random_strings(2, 3000)
+    for start in range(0, len(texts), 30):
+        cells = [None if rng.random() < 0.1 else text for text in texts[start:start + 30]]
+        expected = [None if cell is None else reference_normalize(cell) for cell in cells]
+        assert normalizer.normalize_cells(cells) == expected
+
+
+def test_normalize_groups_in_place():
+    normalizer = ThaiNormalizer()
+    texts = iter(random_strings(3, 200))
+    pages = {page: [{'original_rows': [[next(texts), None, next(texts)], [next(texts)]]} for _ in range(5)]
+             for page in range(4)}
+    expected = {page: [{'original_rows': [[None if cell is None else reference_normalize(cell) for cell in row]
+                                          for row in group['original_rows']]} for group in groups]
+                for page, groups in pages.items()}
+    assert normalizer.normalize_groups(pages) is pages
+    assert pages == expected
+
+
+def test_chained_custom_map_matches_reference():
+    # 后面的键出现在前面的替换值中（链式替换），键中也有辅音和空白
+    replacement_map = {'a': 'bก', 'b': 'c', 'ก': 'ข', ' ': '', 'x': '์', 'c': 'a'}
+    normalizer = ThaiNormalizer(replacement_map)
+    alphabet = list('abcxก ข์') + ['\n']
+    for text in random_strings(4, 5000, alphabet=alphabet):
+        assert normalizer.normalize(text) == reference_normalize(text, replacement_map), repr(text)
+
+
+def test_multi_character_key_rejected():
+    with pytest.raises(ValueError):
+        ThaiNormalizer({'ab': 'c'})
@@ -9,6 +9,9 @@ import sys
 # 导入我们后端逻辑的工厂类
 from ExtractorFactory import ExtractorFactory
 
+# 自动识别模板使用的参考指纹文件：每次提取成功后，把该PDF记为操作员所选模板的参考指纹
+TEMPLATE_REFERENCES_PATH = os.path.join(os.path.expanduser('~'), '.customs_extractor', 'template_references.json')
+
 class TkinterLogHandler(logging.Handler):
     """一个将日志记录发送到线程安全队列的处理器。"""
     def __init__(self, queue):
@@ -28,11 +31,13 @@ class MainWindow(tk.Tk):
         self.log_queue = queue.Queue()
         self.progress_queue = queue.Queue()
         self.thread = None
+        self.ocr_pool = None  # 在多次提取之间共享的常驻OCR进程池，首次提取时创建
+        self.classifier = None  # 选择PDF时自动识别模板，首次使用时加载参考指纹文件
 
         # --- 数据模型 ---
         self.template_options = {
-            'import': ("LSS", "HLS", "SNP", "OLC", "TianShi"),
-            'export': ("TianShi", "HLS")
+            'import': tuple(ExtractorFactory.template_names('import')),
+            'export': tuple(ExtractorFactory.template_names('export'))
         }
 
         # --- UI组件 ---
@@ -113,8 +118,23 @@ class MainWindow(tk.Tk):
         # 配置main_frame的行权重，使日志区域能够垂直拉伸
         main_frame.rowconfigure(5, weight=1)
 
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         self.process_queues()
 
+    def _get_ocr_pool(self):
+        """返回共享的OCR进程池，首次调用时创建（模型只加载一次）。"""
+        if self.ocr_pool is None:
+            from OcrParser import OcrWorkerPool
+            self.ocr_pool = OcrWorkerPool()
+        return self.ocr_pool
+
+    def on_close(self):
+        """关闭窗口前显式关闭OCR进程池。"""
+        if self.ocr_pool is not None:
+            self.ocr_pool.shutdown()
+            self.ocr_pool = None
+        self.destroy()
+
     def _update_template_options(self, event=None):
         """当模板类型改变时，更新PDF模板的下拉选项。"""
         selected_type = self.template_type_var.get()
@@ -129,12 +149,40 @@ class MainWindow(tk.Tk):
         file_name = filedialog.askopenfilename(title="Select PDF File", filetypes=[("PDF Files", "*.pdf")])
         if file_name:
             self.pdf_path_var.set(file_name)
+            self._detect_template(file_name)
             if not self.output_path_var.get():
                 pdf_dir = os.path.dirname(file_name)
                 self.output_path_var.set(os.path.join(pdf_dir, "output"))
                 if not os.path.exists(self.output_path_var.get()):
                     os.makedirs(self.output_path_var.get())
 
+    def _get_classifier(self):
+        """返回模板识别器，首次调用时加载 TEMPLATE_REFERENCES_PATH 中已学习的参考指纹。"""
+        if self.classifier is None:
+            from TemplateFingerprint import TemplateClassifier
+            self.classifier = TemplateClassifier(TEMPLATE_REFERENCES_PATH, grid_cache=ExtractorFactory.grid_cache)
+        return self.classifier
+
+    def _detect_template(self, pdf_path):
+        """
+        按首页自动识别模板并预先选中（只读取文本层和表格线，耗时几毫秒），操作员仍可手动修改。
+        某个模板还没有成功提取过时没有参考指纹，只能预先选中标题标记给出的类型。
+        """
+        from TemplateFingerprint import MIN_CONFIDENCE
+        try:
+            match = self._get_classifier().classify(pdf_path)
+        except Exception as e:
+            self.update_log(f"Template detection failed: {e}")
+            return
+        if match.doc_type in self.template_options:
+            self.template_type_var.set(match.doc_type)
+            self._update_template_options()
+            if match.template in self.template_options[match.doc_type] and match.confidence >= MIN_CONFIDENCE:
+                self.template_var.set(match.template)
+                self.update_log(f"Detected template: {match.template} (Type: {match.doc_type}, confidence {match.confidence:.2f})")
+            else:
+                self.update_log(f"Detected type: {match.doc_type}")
+
     def browse_output_dir(self):
         dir_name = filedialog.askdirectory(title="Select Output Directory")
         if dir_name:
@@ -163,7 +211,7 @@ class MainWindow(tk.Tk):
         finally:
             self.after(100, self.process_queues)
 
-    def _extraction_task(self, pdf_path, output_dir, template_type, type_name):
+    def _extraction_task(self, pdf_path, output_dir, template_type, type_name, classifier):
         try:
             self.after(0, self.update_log, f"Processing: {os.path.basename(pdf_path)}")
             self.after(0, self.update_log, f"Using Template: {template_type} (Type: {type_name})")
@@ -173,6 +221,7 @@ class MainWindow(tk.Tk):
                 pdf_path=pdf_path,
                 output_dir=output_dir,
                 type=type_name,
+                ocr_pool=self._get_ocr_pool(),
             )
             
             # 将进度队列传递给提取器
@@ -189,10 +238,17 @@ class MainWindow(tk.Tk):
             extractor.logger.setLevel(logging.INFO)
 
             extractor.extract_items()
+            try:
+                # 提取成功说明操作员选择的模板正确，记为参考指纹供之后自动识别
+                classifier.learn(pdf_path, f"{type_name}/{template_type}")
+            except Exception as e:
+                self.after(0, self.update_log, f"Failed to save template reference: {e}")
             
             final_message = f"Processing completed!\nResults saved to: {output_dir}"
             self.after(0, lambda: messagebox.showinfo("Completed", final_message))
             self.after(0, self.update_log, f"{os.path.basename(pdf_path)} Processing completed!")
+            pool_stats = self.ocr_pool.stats()
+            self.after(0, self.update_log, f"OCR pool: {pool_stats['model_inits']} model initializations, {pool_stats['saved_model_inits']} saved by reuse")
         
         except Exception as e:
             error_message = f"Error: {e}"
@@ -230,7 +286,7 @@ class MainWindow(tk.Tk):
         
         self.thread = threading.Thread(
             target=self._extraction_task,
-            args=(pdf_path, output_dir, template_type, type_name)
+            args=(pdf_path, output_dir, template_type, type_name, self._get_classifier())
         )
         self.thread.daemon = True
         self.thread.start()